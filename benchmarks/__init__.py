@@ -0,0 +1 @@
+# benchmarks: scripts de medición de rendimiento (no se cargan en la app)
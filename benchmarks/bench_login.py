@@ -0,0 +1,85 @@
+# benchmarks/bench_login.py
+"""
+Mide el throughput de /auth/login bajo concurrencia contra un servidor corriendo.
+
+    uvicorn main:app --port 8000
+    python -m benchmarks.bench_login --url http://localhost:8000 --concurrencia 32 --total 500
+
+Registra (si no existe) un usuario de prueba y lanza logins en paralelo.
+Reporta logins/s, latencias p50/p95/p99 y cuántos recibieron 503 (cola llena).
+"""
+import argparse
+import json
+import statistics
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+CORREO = "bench_login@belleza.com"
+CONTRASENA = "bench12345"
+
+
+def _post(url: str, cuerpo: bytes, content_type: str) -> int:
+    req = urllib.request.Request(url, data=cuerpo, headers={"Content-Type": content_type})
+    try:
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            resp.read()
+            return resp.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def registrar(base: str):
+    cuerpo = json.dumps({"nombre": "Bench", "correo": CORREO, "contrasena": CONTRASENA}).encode()
+    _post(f"{base}/auth/register", cuerpo, "application/json")  # 400 si ya existe
+
+
+def login(base: str) -> tuple[int, float]:
+    cuerpo = urllib.parse.urlencode({"username": CORREO, "password": CONTRASENA}).encode()
+    inicio = time.perf_counter()
+    codigo = _post(f"{base}/auth/login", cuerpo, "application/x-www-form-urlencoded")
+    return codigo, time.perf_counter() - inicio
+
+
+def percentil(valores: list[float], p: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    k = min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))
+    return ordenados[k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--concurrencia", type=int, default=16)
+    parser.add_argument("--total", type=int, default=200)
+    args = parser.parse_args()
+
+    registrar(args.url)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrencia) as pool:
+        resultados = list(pool.map(lambda _: login(args.url), range(args.total)))
+    duracion = time.perf_counter() - inicio
+
+    ok = [t for codigo, t in resultados if codigo == 200]
+    rechazados = sum(1 for codigo, _ in resultados if codigo == 503)
+    print(json.dumps({
+        "concurrencia": args.concurrencia,
+        "total": args.total,
+        "ok": len(ok),
+        "rechazados_503": rechazados,
+        "otros_errores": args.total - len(ok) - rechazados,
+        "logins_por_segundo": round(len(ok) / duracion, 2),
+        "p50_ms": round(percentil(ok, 50) * 1000, 1),
+        "p95_ms": round(percentil(ok, 95) * 1000, 1),
+        "p99_ms": round(percentil(ok, 99) * 1000, 1),
+        "media_ms": round(statistics.mean(ok) * 1000, 1) if ok else 0.0,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+# benchmarks/carga.py
+"""
+Benchmark de punta a punta: levanta main.app con uvicorn (en un hilo de este
+mismo proceso) sobre una base local sembrada, recorre los endpoints más
+usados con la concurrencia indicada y guarda un JSON para comparar versiones.
+
+    python -m benchmarks.carga --db sqlite:///bench.sqlite --salida base.json
+    python -m benchmarks.carga --db postgresql://localhost/belleza_bench \\
+        --concurrencia 32 --peticiones 500 --salida nueva.json --comparar base.json
+
+Por endpoint reporta peticiones/s, latencia p50/p95/p99 y cuántas consultas
+SQL hace una petición. Las consultas se cuentan en una pasada previa, de a
+una petición (en frío y ya con las cachés calientes), escuchando los eventos
+del motor de core.db: con concurrencia no se podría saber de qué petición es
+cada consulta.
+
+Si la base no tiene el usuario de benchmark, se siembra con
+benchmarks.datos_sinteticos (--spas spas, --resenas reseñas, misma semilla).
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from benchmarks.bench_login import percentil
+
+CORREO = "bench_carga@belleza.com"
+CONTRASENA = "bench12345"
+
+
+# ---------------- DATOS ----------------
+def sembrar(spas: int, resenas: int, semilla: int = 42):
+    """Usuario de benchmark (admin_principal) y datos de benchmarks.datos_sinteticos."""
+    from sqlmodel import Session, select
+
+    from benchmarks.datos_sinteticos import Escala, generar
+    from core.auth import hash_password
+    from core.db import engine
+    from models.models import Usuario
+
+    with Session(engine) as session:
+        if session.exec(select(Usuario.id).where(Usuario.correo == CORREO)).first():
+            return
+        session.add(Usuario(nombre="Bench", correo=CORREO, contrasena=hash_password(CONTRASENA),
+                            rol="admin_principal"))
+        session.commit()
+        escala = Escala(usuarios=max(100, spas), spas=spas, servicios=40, materiales=20, resenas=resenas)
+        generar(session, escala, semilla, prefijo="Bench")
+
+
+def ids_de_spas() -> list[int]:
+    from sqlmodel import Session, select
+
+    from core.db import engine
+    from models.models import Spa
+
+    with Session(engine) as session:
+        return session.exec(select(Spa.id).where(Spa.activo == True)).all()
+
+
+# ---------------- SERVIDOR ----------------
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def levantar_servidor():
+    """Inicia uvicorn en un hilo; devuelve (servidor, url base)."""
+    import uvicorn
+
+    import main
+
+    puerto = _puerto_libre()
+    servidor = uvicorn.Server(uvicorn.Config(main.app, host="127.0.0.1", port=puerto, log_level="warning"))
+    threading.Thread(target=servidor.run, daemon=True).start()
+    limite = time.monotonic() + 30
+    while not servidor.started:
+        if time.monotonic() > limite:
+            raise RuntimeError("uvicorn no arrancó en 30 s")
+        time.sleep(0.05)
+    return servidor, f"http://127.0.0.1:{puerto}"
+
+
+# ---------------- PETICIONES ----------------
+def pedir(metodo: str, url: str, cuerpo: bytes | None = None, encabezados: dict | None = None) -> tuple[int, float]:
+    req = urllib.request.Request(url, data=cuerpo, method=metodo, headers=encabezados or {})
+    inicio = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            resp.read()
+            codigo = resp.status
+    except urllib.error.HTTPError as e:
+        e.read()
+        codigo = e.code
+    return codigo, time.perf_counter() - inicio
+
+
+def obtener_token(base: str) -> str:
+    cuerpo = urllib.parse.urlencode({"username": CORREO, "password": CONTRASENA}).encode()
+    req = urllib.request.Request(f"{base}/auth/login", data=cuerpo)
+    with urllib.request.urlopen(req, timeout=60) as resp:
+        return json.loads(resp.read())["access_token"]
+
+
+def escenarios(spa_ids: list[int], token: str, semilla: int) -> dict:
+    """nombre -> función(rng) que devuelve (método, ruta, cuerpo, encabezados)."""
+    auth = {"Authorization": f"Bearer {token}"}
+    login = urllib.parse.urlencode({"username": CORREO, "password": CONTRASENA}).encode()
+    formulario = {"Content-Type": "application/x-www-form-urlencoded"}
+    terminos = ["relax", "zen", "glam", "aqua", "bella", "oasis", "chapinero", "suba"]
+    return {
+        "login": lambda rng: ("POST", "/auth/login", login, formulario),
+        "listar_spas": lambda rng: ("GET", "/spas/?limite=20", None, auth),
+        "obtener_spa": lambda rng: ("GET", f"/spas/{rng.choice(spa_ids)}", None, {}),
+        "buscar_spa": lambda rng: ("GET", f"/spas/buscar/?q={rng.choice(terminos)}", None, {}),
+        "resenas_por_spa": lambda rng: ("GET", f"/resenas/por_spa/{rng.choice(spa_ids)}", None, auth),
+        "reporte_promedios": lambda rng: ("GET", "/reportes/promedio_por_spa", None, auth),
+        "reporte_resenas": lambda rng: ("GET", "/reportes/resenas_por_spa", None, auth),
+    }
+
+
+def consultas_frio_caliente(base: str, escenario, rng) -> tuple[int, int]:
+    """Consultas de una petición en frío y de otra igual ya con cachés calientes."""
+    from core.instrumentacion import contar_consultas
+
+    metodo, ruta, cuerpo, encabezados = escenario(rng)
+    conteos = []
+    for _ in range(2):
+        with contar_consultas() as contador:
+            pedir(metodo, base + ruta, cuerpo, encabezados)
+        conteos.append(contador.total)
+    return conteos[0], conteos[1]
+
+
+def medir(base: str, escenario, peticiones: int, concurrencia: int, semilla: int) -> dict:
+    rngs = [random.Random(semilla + i) for i in range(peticiones)]
+
+    def una(rng):
+        metodo, ruta, cuerpo, encabezados = escenario(rng)
+        return pedir(metodo, base + ruta, cuerpo, encabezados)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as pool:
+        resultados = list(pool.map(una, rngs))
+    duracion = time.perf_counter() - inicio
+
+    ok = [t for codigo, t in resultados if codigo < 400]
+    return {
+        "peticiones": peticiones,
+        "ok": len(ok),
+        "errores": peticiones - len(ok),
+        "codigos": {str(c): sum(1 for r in resultados if r[0] == c) for c in sorted({r[0] for r in resultados})},
+        "peticiones_por_segundo": round(len(ok) / duracion, 2),
+        "p50_ms": round(percentil(ok, 50) * 1000, 2),
+        "p95_ms": round(percentil(ok, 95) * 1000, 2),
+        "p99_ms": round(percentil(ok, 99) * 1000, 2),
+        "media_ms": round(statistics.mean(ok) * 1000, 2) if ok else 0.0,
+    }
+
+
+# ---------------- COMPARACIÓN ----------------
+def comparar(actual: dict, anterior: dict) -> list[str]:
+    """Cambio de p95, throughput y consultas por endpoint respecto a otra corrida."""
+    lineas = []
+    for nombre, datos in actual["endpoints"].items():
+        previo = anterior.get("endpoints", {}).get(nombre)
+        if previo is None:
+            continue
+
+        def cambio(clave):
+            a, b = previo.get(clave) or 0, datos.get(clave) or 0
+            return f"{b - a:+.1f} ({(b - a) / a * 100:+.0f}%)" if a else f"{b - a:+.1f}"
+
+        lineas.append(
+            f"{nombre:<20} p95 {cambio('p95_ms')} ms  rps {cambio('peticiones_por_segundo')}"
+            f"  consultas {previo.get('consultas')} -> {datos.get('consultas')}"
+        )
+    return lineas
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="URL de la base (por defecto DATABASE_URL)")
+    parser.add_argument("--spas", type=int, default=1000)
+    parser.add_argument("--resenas", type=int, default=20000)
+    parser.add_argument("--concurrencia", type=int, default=16)
+    parser.add_argument("--peticiones", type=int, default=300, help="por endpoint")
+    parser.add_argument("--endpoints", help="lista separada por comas (por defecto todos)")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--salida", default="benchmark.json")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior")
+    args = parser.parse_args()
+
+    # core.db lee DATABASE_URL al importarse
+    if args.db:
+        os.environ["DATABASE_URL"] = args.db
+
+    from core.db import create_db_and_tables
+
+    create_db_and_tables()
+    sembrar(args.spas, args.resenas, args.semilla)
+    spa_ids = ids_de_spas()
+
+    servidor, base = levantar_servidor()
+    try:
+        todos = escenarios(spa_ids, obtener_token(base), args.semilla)
+        nombres = args.endpoints.split(",") if args.endpoints else list(todos)
+
+        resultado = {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "commit": _commit(),
+            "config": {
+                "base_de_datos": os.environ["DATABASE_URL"].split("://")[0],
+                "spas": len(spa_ids),
+                "concurrencia": args.concurrencia,
+                "peticiones": args.peticiones,
+                "semilla": args.semilla,
+                "db_async": os.getenv("DB_ASYNC", "false"),
+            },
+            "endpoints": {},
+        }
+        for nombre in nombres:
+            rng = random.Random(args.semilla)
+            frio, caliente = consultas_frio_caliente(base, todos[nombre], rng)
+            datos = medir(base, todos[nombre], args.peticiones, args.concurrencia, args.semilla)
+            datos.update(consultas_frio=frio, consultas=caliente)
+            resultado["endpoints"][nombre] = datos
+            print(f"{nombre:<20} {datos['peticiones_por_segundo']:>8} req/s  p50 {datos['p50_ms']:>7} ms"
+                  f"  p95 {datos['p95_ms']:>7} ms  p99 {datos['p99_ms']:>7} ms"
+                  f"  consultas {frio}/{caliente}  errores {datos['errores']}")
+    finally:
+        servidor.should_exit = True
+
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, ensure_ascii=False, indent=2)
+    print(f"\nResultados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anterior = json.load(f)
+        print(f"\nComparado con {args.comparar} ({anterior.get('commit')}):")
+        print("\n".join(comparar(resultado, anterior)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+# benchmarks/datos_sinteticos.py
+"""
+Generador determinista de datos sintéticos para pruebas de escala.
+
+    python -m benchmarks.datos_sinteticos --escala mediana          # 10k spas, 1M reseñas
+    python -m benchmarks.datos_sinteticos --spas 2000 --resenas 100000 --semilla 7
+
+Llena Usuario, Spa, Servicio, Material, SpaServicio, SpaMaterial, Resena y
+SpaImage en la base de DATABASE_URL con inserts por lotes (executemany),
+confirmando cada LOTE filas para no acumular memoria. Con la misma semilla
+y la misma escala los datos son siempre los mismos.
+
+La distribución imita producción: pocos spas concentran la mayoría de las
+reseñas y unos pocos usuarios escriben muchas (Zipf), los servicios más
+comunes aparecen en casi todos los spas y las calificaciones se cargan
+hacia 4 y 5. Todos los usuarios comparten una contraseña (se hashea una vez).
+"""
+import argparse
+import itertools
+import random
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import func, insert
+from sqlmodel import Session, select
+
+from core.auth import hash_password
+from core.calificaciones import recalcular_calificaciones
+from models.models import Material, Resena, Servicio, Spa, SpaImage, SpaMaterial, SpaServicio, Usuario
+
+LOTE = 5000
+CONTRASENA = "sintetico123"
+PREFIJO = "Sintético"
+# Las filas de SpaImage apuntan a la imagen de ejemplo del repositorio
+IMAGEN_MUESTRA = "/static/img/spas/1/20251203_uñas1.jpeg_1.jpeg"
+
+ZONAS = ["Chapinero", "Usaquén", "Suba", "Kennedy", "Fontibón", "Teusaquillo", "Engativá",
+         "Bosa", "Cedritos", "Salitre", "La Candelaria", "Modelia"]
+NOMBRES = ["Relax", "Zen", "Glam", "Aqua", "Bella", "Lumina", "Oasis", "Natura", "Loto", "Esencia"]
+SERVICIOS = ["Manicure", "Pedicure", "Uñas acrílicas", "Uñas en gel", "Masaje relajante",
+             "Masaje de piedras", "Limpieza facial", "Depilación", "Cejas", "Pestañas",
+             "Maquillaje", "Corte", "Tinte", "Alisado", "Spa de pies"]
+MATERIALES = ["Esmalte", "Gel", "Acrílico", "Aceite", "Crema", "Cera", "Tinte", "Mascarilla"]
+COMENTARIOS = ["Excelente atención", "Muy recomendado", "Buen servicio", "Regular",
+               "Volveré pronto", "Precio justo", "Tardaron un poco", "No me gustó"]
+
+
+class Escala:
+    def __init__(self, usuarios: int, spas: int, servicios: int, materiales: int, resenas: int,
+                 servicios_por_spa: int = 8, materiales_por_spa: int = 4, imagenes_por_spa: int = 3):
+        self.usuarios = usuarios
+        self.spas = spas
+        self.servicios = servicios
+        self.materiales = materiales
+        self.resenas = resenas
+        self.servicios_por_spa = min(servicios_por_spa, servicios)
+        self.materiales_por_spa = min(materiales_por_spa, materiales)
+        self.imagenes_por_spa = imagenes_por_spa
+
+
+ESCALAS = {
+    "pequena": Escala(usuarios=2_000, spas=500, servicios=60, materiales=40, resenas=20_000),
+    "mediana": Escala(usuarios=50_000, spas=10_000, servicios=200, materiales=100, resenas=1_000_000),
+    "grande": Escala(usuarios=500_000, spas=100_000, servicios=500, materiales=200, resenas=10_000_000),
+}
+
+
+# ---------------- DISTRIBUCIONES ----------------
+def pesos_zipf(n: int, s: float = 1.1) -> list[float]:
+    """Pesos acumulados: el elemento k tiene peso 1 / (k+1)^s."""
+    return list(itertools.accumulate(1 / (k + 1) ** s for k in range(n)))
+
+
+def _por_lotes(filas, tamano: int = LOTE):
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) == tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _insertar(session: Session, modelo, filas) -> int:
+    total = 0
+    for lote in _por_lotes(filas):
+        session.exec(insert(modelo), params=lote)
+        session.commit()
+        total += len(lote)
+    return total
+
+
+def _ids_nuevos(session: Session, columna, desde: int) -> list[int]:
+    return session.exec(select(columna).where(columna > desde).order_by(columna)).all()
+
+
+def _max_id(session: Session, columna) -> int:
+    return session.exec(select(func.max(columna))).one() or 0
+
+
+# ---------------- GENERACIÓN ----------------
+def generar(session: Session, escala: Escala, semilla: int = 42, prefijo: str = PREFIJO,
+            informar=print) -> dict:
+    """Inserta los datos y devuelve cuántas filas van por tabla."""
+    if session.exec(select(Spa.id).where(Spa.nombre == f"{prefijo} Spa 0")).first():
+        raise ValueError(f"La base ya tiene datos con el prefijo '{prefijo}' (usa otro --prefijo)")
+
+    rng = random.Random(semilla)
+    conteo = {}
+    hoy = date.today()
+
+    def paso(tabla, filas, modelo):
+        inicio = time.perf_counter()
+        conteo[tabla] = _insertar(session, modelo, filas)
+        informar(f"{tabla:<12} {conteo[tabla]:>10} filas  {time.perf_counter() - inicio:7.1f} s")
+
+    # Usuarios
+    desde = _max_id(session, Usuario.id)
+    contrasena = hash_password(CONTRASENA)
+    etiqueta = prefijo.lower().replace(" ", "_")
+    paso("usuario", (
+        {"nombre": f"{prefijo} Usuario {i}", "correo": f"{etiqueta}{i}@belleza.com",
+         "contrasena": contrasena, "rol": "admin_spa" if i % 50 == 0 else "usuario", "activo": True}
+        for i in range(escala.usuarios)
+    ), Usuario)
+    usuario_ids = _ids_nuevos(session, Usuario.id, desde)
+    admins = [u for i, u in enumerate(usuario_ids) if i % 50 == 0]
+
+    # Spas (~2% inactivos)
+    desde = _max_id(session, Spa.id)
+    paso("spa", (
+        {"nombre": f"{prefijo} Spa {i}" if i == 0 else f"{prefijo} {rng.choice(NOMBRES)} {rng.choice(ZONAS)} {i}",
+         "direccion": f"Calle {rng.randint(1, 200)} # {rng.randint(1, 99)}-{rng.randint(1, 99)}",
+         "zona": rng.choice(ZONAS), "horario": rng.choice(["8-18", "9-19", "10-20"]),
+         "latitud": round(4.55 + rng.random() * 0.25, 6), "longitud": round(-74.2 + rng.random() * 0.15, 6),
+         "activo": rng.random() > 0.02, "ultima_actualizacion": hoy - timedelta(days=rng.randint(0, 365)),
+         "admin_spa_id": rng.choice(admins) if admins and rng.random() < 0.3 else None}
+        for i in range(escala.spas)
+    ), Spa)
+    spa_ids = _ids_nuevos(session, Spa.id, desde)
+
+    # Catálogos
+    desde = _max_id(session, Servicio.id)
+    paso("servicio", (
+        {"nombre": f"{prefijo} {SERVICIOS[i % len(SERVICIOS)]} {i}", "descripcion": "Servicio sintético",
+         "duracion_ref": f"{rng.choice([30, 45, 60, 90])} min", "precio_ref": rng.randint(20, 250) * 1000}
+        for i in range(escala.servicios)
+    ), Servicio)
+    servicio_ids = _ids_nuevos(session, Servicio.id, desde)
+
+    desde = _max_id(session, Material.id)
+    paso("material", (
+        {"nombre": f"{prefijo} {MATERIALES[i % len(MATERIALES)]} {i}", "tipo": MATERIALES[i % len(MATERIALES)]}
+        for i in range(escala.materiales)
+    ), Material)
+    material_ids = _ids_nuevos(session, Material.id, desde)
+
+    # Asociaciones: los primeros del catálogo son los más comunes
+    acumulados_servicios = pesos_zipf(len(servicio_ids), 0.8)
+    acumulados_materiales = pesos_zipf(len(material_ids), 0.8)
+
+    def muestra(ids, acumulados, k):
+        elegidos = set()
+        while len(elegidos) < k:
+            elegidos.update(rng.choices(ids, cum_weights=acumulados, k=k - len(elegidos)))
+        return sorted(elegidos)
+
+    paso("spaservicio", (
+        {"spa_id": spa_id, "servicio_id": servicio_id, "precio": rng.randint(15, 300) * 1000,
+         "duracion": f"{rng.choice([30, 45, 60, 90, 120])} min", "activo": True}
+        for spa_id in spa_ids
+        for servicio_id in muestra(servicio_ids, acumulados_servicios, escala.servicios_por_spa)
+    ), SpaServicio)
+    paso("spamaterial", (
+        {"spa_id": spa_id, "material_id": material_id, "activo": True}
+        for spa_id in spa_ids
+        for material_id in muestra(material_ids, acumulados_materiales, escala.materiales_por_spa)
+    ), SpaMaterial)
+
+    paso("spaimage", (
+        {"spa_id": spa_id, "url": IMAGEN_MUESTRA, "es_principal": n == 0}
+        for spa_id in spa_ids
+        for n in range(rng.randint(0, escala.imagenes_por_spa))
+    ), SpaImage)
+
+    # Reseñas: spas y usuarios en orden de popularidad aleatorio pero fijo
+    populares = spa_ids[:]
+    rng.shuffle(populares)
+    activos = usuario_ids[:]
+    rng.shuffle(activos)
+    acumulados_spas = pesos_zipf(len(populares))
+    acumulados_usuarios = pesos_zipf(len(activos), 0.7)
+
+    def resenas():
+        restantes = escala.resenas
+        while restantes:
+            n = min(LOTE, restantes)
+            restantes -= n
+            spas = rng.choices(populares, cum_weights=acumulados_spas, k=n)
+            usuarios = rng.choices(activos, cum_weights=acumulados_usuarios, k=n)
+            for spa_id, usuario_id in zip(spas, usuarios):
+                yield {
+                    "spa_id": spa_id, "usuario_id": usuario_id,
+                    "calificacion": rng.choices((1, 2, 3, 4, 5), weights=(4, 6, 15, 35, 40))[0],
+                    "comentario": rng.choice(COMENTARIOS),
+                    "fecha_creacion": hoy - timedelta(days=rng.randint(0, 730)),
+                    "activo": rng.random() > 0.03,
+                }
+
+    paso("resena", resenas(), Resena)
+
+    inicio = time.perf_counter()
+    recalcular_calificaciones(session)
+    session.commit()
+    informar(f"{'calificaciones':<12} {'':>10}       {time.perf_counter() - inicio:7.1f} s")
+    return conteo
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escala", choices=ESCALAS, default="pequena")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--prefijo", default=PREFIJO, help="prefijo de nombres (permite varias siembras)")
+    for campo in ("usuarios", "spas", "servicios", "materiales", "resenas"):
+        parser.add_argument(f"--{campo}", type=int, help=f"reemplaza {campo} de la escala")
+    args = parser.parse_args()
+
+    base = ESCALAS[args.escala]
+    escala = Escala(**{
+        campo: getattr(args, campo) if getattr(args, campo) is not None else getattr(base, campo)
+        for campo in ("usuarios", "spas", "servicios", "materiales", "resenas")
+    })
+
+    from core.db import create_db_and_tables, engine
+
+    create_db_and_tables()
+    inicio = time.perf_counter()
+    with Session(engine) as session:
+        generar(session, escala, args.semilla, args.prefijo)
+    print(f"Listo en {time.perf_counter() - inicio:.1f} s (contraseña de los usuarios: {CONTRASENA})")
+
+
+if __name__ == "__main__":
+    main()
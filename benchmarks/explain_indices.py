@@ -0,0 +1,137 @@
+# benchmarks/explain_indices.py
+"""
+Revisa el plan (EXPLAIN) de las consultas más frecuentes y falla si alguna
+no usa el índice esperado o recorre la tabla completa.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.explain_indices
+    python -m benchmarks.explain_indices --json
+
+Usa la base de DATABASE_URL tal como está (no crea tablas ni aplica
+migraciones): sirve para comprobar que la migración 6 llegó a producción.
+La prueba tests/test_explain_indices.py usa las mismas funciones sobre una
+base sembrada con benchmarks.datos_sinteticos (SQLite y, si TEST_POSTGRES_URL
+está definida, Postgres).
+
+En Postgres se desactiva enable_seqscan durante la revisión: con tablas
+chicas el planificador prefiere un Seq Scan aunque exista el índice, pero
+con enable_seqscan=off solo lo elige si no hay un índice que sirva. Así el
+resultado no depende de cuántos datos tenga la base. En SQLite se usa
+EXPLAIN QUERY PLAN ("SCAN tabla" = recorrido completo).
+
+Código de salida: 0 si todas usan su índice, 1 si alguna no.
+"""
+import argparse
+import json
+import sys
+
+from sqlalchemy import text
+from sqlmodel import select
+
+from models.models import Resena, Spa, SpaImage, SpaServicio, Usuario
+
+# (nombre, tabla, índice esperado, consulta)
+CONSULTAS = [
+    ("login por correo", "usuario", "ix_usuario_correo",
+     select(Usuario).where(Usuario.correo == "bench@belleza.com")),
+    ("spa por nombre", "spa", "ix_spa_nombre", select(Spa).where(Spa.nombre == "Spa Bench")),
+    ("spas activos", "spa", "ix_spa_activo", select(Spa.id).where(Spa.activo == True)),
+    ("reseñas activas del spa", "resena", "ix_resena_spa_id_activo",
+     select(Resena).where(Resena.spa_id == 1, Resena.activo == True)),
+    ("reseñas del usuario", "resena", "ix_resena_usuario_id", select(Resena).where(Resena.usuario_id == 1)),
+    ("servicio de un spa", "spaservicio", "ix_spaservicio_spa_servicio",
+     select(SpaServicio).where(SpaServicio.spa_id == 1, SpaServicio.servicio_id == 1)),
+    ("servicios del spa", "spaservicio", "ix_spaservicio_spa_servicio",
+     select(SpaServicio).where(SpaServicio.spa_id == 1)),
+    ("imágenes del spa", "spaimage", "ix_spaimage_spa_hash", select(SpaImage).where(SpaImage.spa_id == 1)),
+]
+
+
+def _motor(motor):
+    if motor is not None:
+        return motor
+    from core.db import engine
+    return engine
+
+
+def _sql(consulta, motor) -> str:
+    return str(consulta.compile(dialect=motor.dialect, compile_kwargs={"literal_binds": True}))
+
+
+def _nodos_postgres(nodo: dict):
+    yield nodo
+    for hijo in nodo.get("Plans", []):
+        yield from _nodos_postgres(hijo)
+
+
+def plan(conn, consulta) -> list[str]:
+    """Plan como lista de líneas legibles."""
+    motor = conn.engine
+    sql = _sql(consulta, motor)
+    if motor.dialect.name == "postgresql":
+        crudo = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+        if isinstance(crudo, str):
+            crudo = json.loads(crudo)
+        return [
+            f"{n['Node Type']} {n.get('Relation Name', '')} {n.get('Index Name', '')}".strip()
+            for n in _nodos_postgres(crudo[0]["Plan"])
+        ]
+    return [fila[-1] for fila in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()]
+
+
+def recorre_tabla(lineas: list[str], tabla: str, dialecto: str) -> bool:
+    """True si el plan lee 'tabla' completa (Seq Scan / SCAN sin índice)."""
+    for linea in lineas:
+        partes = linea.split()
+        if dialecto == "postgresql":
+            if linea.startswith("Seq Scan") and partes[2:3] == [tabla]:
+                return True
+        elif partes[:2] == ["SCAN", tabla] and "INDEX" not in partes:
+            return True
+    return False
+
+
+def usa_indice(lineas: list[str], indice: str) -> bool:
+    """True si algún nodo del plan lee el índice indicado."""
+    return any(indice in linea.split() for linea in lineas)
+
+
+def revisar(motor=None) -> list[dict]:
+    motor = _motor(motor)
+    resultados = []
+    with motor.connect() as conn:
+        if motor.dialect.name == "postgresql":
+            conn.execute(text("SET enable_seqscan = off"))
+        for nombre, tabla, indice, consulta in CONSULTAS:
+            lineas = plan(conn, consulta)
+            resultados.append({
+                "consulta": nombre,
+                "tabla": tabla,
+                "indice": indice,
+                "usa_indice": usa_indice(lineas, indice) and not recorre_tabla(lineas, tabla, motor.dialect.name),
+                "plan": lineas,
+            })
+        conn.rollback()
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--json", action="store_true", help="salida en JSON")
+    args = parser.parse_args()
+
+    resultados = revisar()
+    if args.json:
+        print(json.dumps(resultados, ensure_ascii=False, indent=2))
+    else:
+        for r in resultados:
+            estado = "ok   " if r["usa_indice"] else "FALLA"
+            print(f"{estado} {r['consulta']:<26} ({r['indice']}) {' | '.join(r['plan'])}")
+
+    fallidas = [r["consulta"] for r in resultados if not r["usa_indice"]]
+    if fallidas:
+        print(f"\nSin el índice esperado: {', '.join(fallidas)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+# benchmarks/presupuesto_consultas.py
+"""
+Presupuesto de consultas SQL por endpoint, para detectar N+1.
+
+    python -m benchmarks.presupuesto_consultas
+    python -m benchmarks.presupuesto_consultas --db postgresql://localhost/belleza_qc --json
+
+Pasa cada request por la app (TestClient, sin servidor) y cuenta las
+sentencias SQL. Cada endpoint se mide dos veces: con un spa/usuario que
+tiene POCAS filas relacionadas (y limite=POCAS) y con otro que tiene MUCHAS.
+Falla (código de salida 1) si:
+
+- la cantidad de consultas crece con la cantidad de filas (N+1), o
+- supera el máximo declarado en PRESUPUESTOS.
+
+Por defecto usa una base SQLite temporal; con --db se puede usar otra base
+vacía (se crean tablas y datos). tests/test_presupuesto_consultas.py corre
+la misma revisión con pytest.
+
+Cada endpoint se mide en frío y en caliente, siempre con la caché de
+respuestas vacía para que no esconda un N+1:
+
+- frío: sin usuarios en caché ni rollup de reportes (lo que paga la primera
+  petición y cada una después de que vencen sus TTL). Tiene su propio
+  máximo (maximo_frio).
+- caliente: después de una petición de calentamiento.
+
+Los índices en memoria de búsqueda y de cercanos no se vacían: se cargan una
+vez por worker con una cantidad fija de consultas, no por petición.
+
+medir_consultas() (y contar_consultas() de core.instrumentacion) sirven
+también para revisar un endpoint puntual desde la consola.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+POCAS = 2
+MUCHAS = 20
+CONTRASENA = "presupuesto123"
+
+
+class Presupuesto:
+    def __init__(self, nombre: str, ruta: str, maximo: int, maximo_frio: int, auth: str | None = None):
+        self.nombre = nombre
+        self.ruta = ruta                # admite {spa_id} y {limite}
+        self.maximo = maximo            # consultas por petición con cachés calientes
+        self.maximo_frio = maximo_frio  # consultas con cachés frías
+        self.auth = auth                # None, "admin" o "usuario"
+
+
+# Listados y lecturas frecuentes: los máximos (caliente, frío) son lo que cuestan hoy.
+# En frío se suma la carga del usuario del token y, en reportes, la del rollup.
+PRESUPUESTOS = [
+    Presupuesto("obtener_spa", "/spas/{spa_id}", 6, 6),
+    Presupuesto("servicios_por_spa", "/servicios/por_spa/{spa_id}", 2, 3, auth="usuario"),
+    Presupuesto("materiales_por_spa", "/materiales/por_spa/{spa_id}", 2, 2),
+    Presupuesto("resenas_por_spa", "/resenas/por_spa/{spa_id}?limite={limite}", 2, 3, auth="usuario"),
+    Presupuesto("resenas_mias", "/resenas/mias?limite={limite}", 1, 2, auth="usuario"),
+    Presupuesto("resenas_todas_admin", "/resenas/todas_admin?limite={limite}", 1, 2, auth="admin"),
+    Presupuesto("listar_spas", "/spas/?limite={limite}", 1, 2, auth="admin"),
+    Presupuesto("buscar_spa", "/spas/buscar/?q=presupuesto&limite={limite}", 1, 1),
+    Presupuesto("listar_servicios", "/servicios/?limite={limite}", 1, 2, auth="usuario"),
+    Presupuesto("listar_materiales", "/materiales/?limite={limite}", 1, 2, auth="usuario"),
+    Presupuesto("listar_usuarios", "/usuarios/?limite={limite}", 1, 2, auth="admin"),
+    Presupuesto("reporte_promedios", "/reportes/promedio_por_spa", 1, 2, auth="usuario"),
+]
+
+
+# ---------------- CONTEO ----------------
+def vaciar_caches():
+    """Deja frías las cachés por petición: respuestas, usuarios y rollup de reportes."""
+    from core.auth import cache_usuarios
+    from core.cache_respuestas import cache_respuestas
+    from core.reportes import rollup_reportes
+
+    cache_respuestas.limpiar()
+    cache_usuarios.limpiar()
+    rollup_reportes.marcar_desactualizado()
+
+
+def medir_consultas(cliente, metodo: str, ruta: str, frio: bool = False, **kwargs) -> tuple[int, list[str], int]:
+    """(consultas, sentencias, código HTTP) de una petición con la caché de respuestas vacía."""
+    from core.cache_respuestas import cache_respuestas
+    from core.instrumentacion import contar_consultas
+
+    if frio:
+        vaciar_caches()
+    else:
+        cache_respuestas.limpiar()
+    with contar_consultas() as contador:
+        respuesta = cliente.request(metodo, ruta, **kwargs)
+    return contador.total, contador.sentencias, respuesta.status_code
+
+
+# ---------------- DATOS ----------------
+def sembrar() -> dict:
+    """Dos spas y dos usuarios: uno con POCAS filas relacionadas y otro con MUCHAS."""
+    from sqlalchemy import insert
+    from sqlmodel import Session, select
+
+    from core.auth import hash_password
+    from core.busqueda import indice_spas
+    from core.calificaciones import recalcular_calificaciones
+    from core.db import engine
+    from core.geo import indice_geo
+    from models.models import Material, Resena, Servicio, Spa, SpaImage, SpaMaterial, SpaServicio, Usuario
+
+    contrasena = hash_password(CONTRASENA)
+    with Session(engine) as session:
+        usuarios = {}
+        for clave, rol in (("admin", "admin_principal"), ("pocas", "usuario"), ("muchas", "usuario")):
+            usuario = Usuario(nombre=f"Presupuesto {clave}", correo=f"presupuesto_{clave}@belleza.com",
+                              contrasena=contrasena, rol=rol)
+            session.add(usuario)
+            session.flush()
+            usuarios[clave] = usuario.id
+
+        # Relleno para que los listados generales tengan más de MUCHAS filas
+        session.exec(insert(Spa), params=[
+            {"nombre": f"Presupuesto relleno {i}", "direccion": "Calle 1", "zona": "Centro"}
+            for i in range(MUCHAS + 5)
+        ])
+        session.exec(insert(Servicio), params=[{"nombre": f"Presupuesto servicio {i}"} for i in range(MUCHAS)])
+        session.exec(insert(Material), params=[
+            {"nombre": f"Presupuesto material {i}", "tipo": "insumo"} for i in range(MUCHAS)
+        ])
+        servicio_ids = session.exec(select(Servicio.id).where(Servicio.nombre.startswith("Presupuesto"))).all()
+        material_ids = session.exec(select(Material.id).where(Material.nombre.startswith("Presupuesto"))).all()
+
+        spas = {}
+        for clave, n in (("pocas", POCAS), ("muchas", MUCHAS)):
+            spa = Spa(nombre=f"Presupuesto spa {clave}", direccion="Calle 2", zona="Centro")
+            session.add(spa)
+            session.flush()
+            spas[clave] = spa.id
+            session.exec(insert(SpaServicio), params=[
+                {"spa_id": spa.id, "servicio_id": s, "precio": 1000, "duracion": "30 min"} for s in servicio_ids[:n]
+            ])
+            session.exec(insert(SpaMaterial), params=[{"spa_id": spa.id, "material_id": m} for m in material_ids[:n]])
+            session.exec(insert(SpaImage), params=[
+                {"spa_id": spa.id, "url": f"/static/img/spas/{spa.id}/{i}.jpg"} for i in range(n)
+            ])
+            session.exec(insert(Resena), params=[
+                {"spa_id": spa.id, "usuario_id": usuarios[clave], "calificacion": 4, "comentario": "ok"}
+                for _ in range(n)
+            ])
+        recalcular_calificaciones(session)
+        session.commit()
+
+        # Los inserts directos no pasan por los índices en memoria
+        indice_spas.reconstruir(session)
+        indice_geo.reconstruir(session)
+
+    return {"spas": spas, "usuarios": usuarios}
+
+
+def _token(cliente, clave: str) -> dict:
+    respuesta = cliente.post("/auth/login", data={
+        "username": f"presupuesto_{clave}@belleza.com", "password": CONTRASENA,
+    })
+    return {"Authorization": f"Bearer {respuesta.json()['access_token']}"}
+
+
+# ---------------- REVISIÓN ----------------
+def revisar(cliente, presupuestos: list[Presupuesto] = PRESUPUESTOS) -> list[dict]:
+    datos = sembrar()
+    tokens = {"admin": _token(cliente, "admin")}
+
+    resultados = []
+    for p in presupuestos:
+        conteos = {}
+        for clave, limite in (("pocas", POCAS), ("muchas", MUCHAS)):
+            # Las reseñas "mias" son del usuario con pocas/muchas reseñas
+            encabezados = {}
+            if p.auth == "admin":
+                encabezados = tokens["admin"]
+            elif p.auth == "usuario":
+                if clave not in tokens:
+                    tokens[clave] = _token(cliente, clave)
+                encabezados = tokens[clave]
+            ruta = p.ruta.format(spa_id=datos["spas"][clave], limite=limite)
+
+            # La petición en frío sirve también de calentamiento para la siguiente
+            frio, sentencias_frio, codigo_frio = medir_consultas(cliente, "GET", ruta, frio=True, headers=encabezados)
+            total, sentencias, codigo = medir_consultas(cliente, "GET", ruta, headers=encabezados)
+            conteos[clave] = {
+                "consultas": total, "frio": frio, "codigos": (codigo_frio, codigo),
+                "sentencias": sentencias, "sentencias_frio": sentencias_frio,
+            }
+
+        pocas, muchas = conteos["pocas"]["consultas"], conteos["muchas"]["consultas"]
+        frio_pocas, frio_muchas = conteos["pocas"]["frio"], conteos["muchas"]["frio"]
+        problemas = []
+        codigos = conteos["pocas"]["codigos"] + conteos["muchas"]["codigos"]
+        if any(codigo >= 400 for codigo in codigos):
+            problemas.append(f"HTTP {'/'.join(str(codigo) for codigo in codigos)}")
+        if muchas > pocas:
+            problemas.append(f"crece con las filas ({pocas} -> {muchas})")
+        if frio_muchas > frio_pocas:
+            problemas.append(f"en frío crece con las filas ({frio_pocas} -> {frio_muchas})")
+        if max(pocas, muchas) > p.maximo:
+            problemas.append(f"supera el presupuesto ({max(pocas, muchas)} > {p.maximo})")
+        if max(frio_pocas, frio_muchas) > p.maximo_frio:
+            problemas.append(f"supera el presupuesto en frío ({max(frio_pocas, frio_muchas)} > {p.maximo_frio})")
+        resultados.append({
+            "endpoint": p.nombre,
+            "ruta": p.ruta,
+            "presupuesto": p.maximo,
+            "presupuesto_frio": p.maximo_frio,
+            "consultas_pocas": pocas,
+            "consultas_muchas": muchas,
+            "consultas_frio_pocas": frio_pocas,
+            "consultas_frio_muchas": frio_muchas,
+            "ok": not problemas,
+            "problemas": problemas,
+            "sentencias": conteos["muchas"]["sentencias"] if problemas else [],
+            "sentencias_frio": conteos["muchas"]["sentencias_frio"] if problemas else [],
+        })
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="URL de una base vacía (por defecto SQLite temporal)")
+    parser.add_argument("--json", action="store_true", help="salida en JSON")
+    args = parser.parse_args()
+
+    # core.db lee DATABASE_URL al importarse
+    directorio = tempfile.TemporaryDirectory()
+    os.environ["DATABASE_URL"] = args.db or f"sqlite:///{directorio.name}/presupuesto.sqlite"
+
+    from fastapi.testclient import TestClient
+
+    import main as aplicacion
+
+    with TestClient(aplicacion.app) as cliente:
+        resultados = revisar(cliente)
+
+    if args.json:
+        print(json.dumps(resultados, ensure_ascii=False, indent=2))
+    else:
+        for r in resultados:
+            estado = "ok   " if r["ok"] else "FALLA"
+            print(f"{estado} {r['endpoint']:<22} {r['consultas_pocas']:>3} / {r['consultas_muchas']:>3}"
+                  f"  (máx {r['presupuesto']})  frío {r['consultas_frio_pocas']:>3} / {r['consultas_frio_muchas']:>3}"
+                  f"  (máx {r['presupuesto_frio']})  {'; '.join(r['problemas'])}")
+            for sentencia in (r["sentencias"] or r["sentencias_frio"])[:10]:
+                print(f"        {' '.join(sentencia.split())[:160]}")
+
+    directorio.cleanup()
+    if not all(r["ok"] for r in resultados):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
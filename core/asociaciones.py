@@ -0,0 +1,134 @@
+# core/asociaciones.py
+"""
+Altas, cambios y bajas de servicios/materiales de spas en bloque.
+
+En vez de una consulta de existencia por par (spa, servicio), se lee una vez
+lo que ya existe para todos los pares y se escribe con executemany: unas
+pocas consultas sin importar cuántos pares haya. No hacen commit; las usan
+los endpoints por lote y el importador (core.importacion).
+"""
+from sqlalchemy import insert, update
+from sqlmodel import Session, select
+
+from models.models import SpaMaterial, SpaServicio
+
+
+class ResultadoLote:
+    def __init__(self):
+        self.insertados = 0
+        self.actualizados = 0
+        self.sin_cambios = 0
+        self.spas: set[int] = set()  # spas que cambiaron
+
+
+def upsert_spa_servicios(session: Session, pares: dict[tuple[int, int], dict]) -> ResultadoLote:
+    """
+    pares: {(spa_id, servicio_id): {"precio": ..., "duracion": ...}}.
+    Inserta las asociaciones nuevas, actualiza precio/duración de las que
+    cambiaron y reactiva las desactivadas.
+    """
+    resultado = ResultadoLote()
+    if not pares:
+        return resultado
+
+    existentes = {}
+    for fila in session.exec(
+        select(SpaServicio.id, SpaServicio.spa_id, SpaServicio.servicio_id,
+               SpaServicio.precio, SpaServicio.duracion, SpaServicio.activo)
+        .where(
+            SpaServicio.spa_id.in_({s for s, _ in pares}),
+            SpaServicio.servicio_id.in_({v for _, v in pares}),
+        )
+        .order_by(SpaServicio.id)
+    ).all():
+        existentes.setdefault((fila.spa_id, fila.servicio_id), fila)
+
+    nuevos, cambios = [], []
+    for (spa_id, servicio_id), datos in pares.items():
+        actual = existentes.get((spa_id, servicio_id))
+        valores = {"precio": datos["precio"], "duracion": datos["duracion"], "activo": True}
+        if actual is None:
+            nuevos.append({"spa_id": spa_id, "servicio_id": servicio_id, **valores})
+        elif (actual.precio, actual.duracion, actual.activo) != (datos["precio"], datos["duracion"], True):
+            cambios.append({"id": actual.id, **valores})
+        else:
+            resultado.sin_cambios += 1
+            continue
+        resultado.spas.add(spa_id)
+
+    if cambios:
+        session.exec(update(SpaServicio), params=cambios)
+        resultado.actualizados = len(cambios)
+    if nuevos:
+        session.exec(insert(SpaServicio), params=nuevos)
+        resultado.insertados = len(nuevos)
+    return resultado
+
+
+def upsert_spa_materiales(session: Session, pares: set[tuple[int, int]]) -> ResultadoLote:
+    """pares: {(spa_id, material_id)}. Inserta las nuevas y reactiva las desactivadas."""
+    resultado = ResultadoLote()
+    if not pares:
+        return resultado
+
+    existentes = {
+        (fila.spa_id, fila.material_id): fila.activo
+        for fila in session.exec(
+            select(SpaMaterial.spa_id, SpaMaterial.material_id, SpaMaterial.activo).where(
+                SpaMaterial.spa_id.in_({s for s, _ in pares}),
+                SpaMaterial.material_id.in_({m for _, m in pares}),
+            )
+        ).all()
+    }
+
+    nuevos, reactivar = [], []
+    for spa_id, material_id in pares:
+        activo = existentes.get((spa_id, material_id))
+        if activo is None:
+            nuevos.append({"spa_id": spa_id, "material_id": material_id, "activo": True})
+        elif not activo:
+            reactivar.append({"spa_id": spa_id, "material_id": material_id, "activo": True})
+        else:
+            resultado.sin_cambios += 1
+            continue
+        resultado.spas.add(spa_id)
+
+    if reactivar:
+        session.exec(update(SpaMaterial), params=reactivar)
+        resultado.actualizados = len(reactivar)
+    if nuevos:
+        session.exec(insert(SpaMaterial), params=nuevos)
+        resultado.insertados = len(nuevos)
+    return resultado
+
+
+def desactivar_spa_servicios(session: Session, spa_id: int, servicio_ids: list[int]) -> int:
+    """Baja lógica de los servicios indicados del spa; devuelve cuántos se desactivaron."""
+    if not servicio_ids:
+        return 0
+    return session.exec(
+        update(SpaServicio)
+        .where(
+            SpaServicio.spa_id == spa_id,
+            SpaServicio.servicio_id.in_(servicio_ids),
+            SpaServicio.activo == True,
+        )
+        .values(activo=False)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def desactivar_spa_materiales(session: Session, spa_id: int, material_ids: list[int]) -> int:
+    """Baja lógica de los materiales indicados del spa; devuelve cuántos se desactivaron."""
+    if not material_ids:
+        return 0
+    return session.exec(
+        update(SpaMaterial)
+        .where(
+            SpaMaterial.spa_id == spa_id,
+            SpaMaterial.material_id.in_(material_ids),
+            SpaMaterial.activo == True,
+        )
+        .values(activo=False)
+        .execution_options(synchronize_session=False)
+    ).rowcount
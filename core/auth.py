@@ -1,13 +1,19 @@
 # core/auth.py
+import os
+import threading
+import time
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import Depends, HTTPException, status
 from jose import JWTError, jwt
-from passlib.context import CryptContext
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
-from core.db import get_session
-from models.models import Usuario
+from sqlmodel.ext.asyncio.session import AsyncSession
+from core.db import get_async_session, get_session
+from models.models import Spa, Usuario
 from fastapi.security import OAuth2PasswordBearer 
+from starlette.concurrency import run_in_threadpool
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 
@@ -16,18 +22,11 @@ SECRET_KEY = "super_clave_secreta_nicole_2025"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24  # 24 horas
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 # ---------------- UTILIDADES ----------------
-def hash_password(password: str):
-    """Encripta una contraseña usando bcrypt (truncando a 72 bytes)."""
-    password_bytes = password.encode("utf-8")[:72]
-    return pwd_context.hash(password_bytes)
-
-def verify_password(password: str, hashed_password: str):
-    """Verifica que la contraseña ingresada coincida con la guardada (truncando a 72 bytes)."""
-    password_bytes = password.encode("utf-8")[:72]
-    return pwd_context.verify(password_bytes, hashed_password)
+# bcrypt corre en un pool dedicado (ver core/contrasenas.py)
+from core.contrasenas import (
+    hash_password, hash_password_async, necesita_rehash, verify_password, verify_password_async,
+)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Crea un token JWT con expiración."""
@@ -39,45 +38,173 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     })
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+# ---------------- CACHÉ DE USUARIOS ----------------
+AUTH_CACHE_TTL_SEGUNDOS = float(os.getenv("AUTH_CACHE_TTL_SEGUNDOS", "30"))
+AUTH_CACHE_MAX = int(os.getenv("AUTH_CACHE_MAX", "10000"))
+
+
+class CacheUsuarios:
+    """
+    Caché LRU con TTL de los datos que necesita get_current_user (id, rol, activo...).
+    Evita ir a la base de datos en cada request autenticado. Se invalida
+    explícitamente al activar/desactivar usuarios; el TTL acota cuánto tarda
+    un cambio hecho en otro worker en verse.
+    """
+
+    def __init__(self, ttl: float = AUTH_CACHE_TTL_SEGUNDOS, maximo: int = AUTH_CACHE_MAX):
+        self.ttl = ttl
+        self.maximo = maximo
+        self._datos: OrderedDict[int, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, usuario_id: int) -> dict | None:
+        with self._lock:
+            entrada = self._datos.get(usuario_id)
+            if entrada is None:
+                return None
+            expira, datos = entrada
+            if expira < time.monotonic():
+                del self._datos[usuario_id]
+                return None
+            self._datos.move_to_end(usuario_id)
+            return datos
+
+    def guardar(self, usuario: Usuario) -> dict:
+        datos = {
+            "id": usuario.id,
+            "nombre": usuario.nombre,
+            "correo": usuario.correo,
+            "rol": usuario.rol,
+            "activo": usuario.activo,
+        }
+        with self._lock:
+            self._datos[usuario.id] = (time.monotonic() + self.ttl, datos)
+            self._datos.move_to_end(usuario.id)
+            while len(self._datos) > self.maximo:
+                self._datos.popitem(last=False)
+        return datos
+
+    def invalidar(self, usuario_id: int):
+        with self._lock:
+            self._datos.pop(usuario_id, None)
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+
+cache_usuarios = CacheUsuarios()
+
+
+def invalidar_usuario(usuario_id: int):
+    """Llamar después de cambiar activo o rol de un usuario."""
+    cache_usuarios.invalidar(usuario_id)
+
+
 # ---------------- DEPENDENCIA PRINCIPAL ----------------
-def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    session: Session = Depends(get_session),
-) -> Usuario:
+_credenciales_invalidas = HTTPException(
+    status_code=status.HTTP_401_UNAUTHORIZED,
+    detail="Token inválido o no proporcionado",
+    headers={"WWW-Authenticate": "Bearer"},
+)
 
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Token inválido o no proporcionado",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
 
+def _usuario_id_del_token(token: str) -> int:
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id: str = payload.get("sub")
         if user_id is None:
-            raise credentials_exception
+            raise _credenciales_invalidas
     except JWTError:
-        raise credentials_exception
+        raise _credenciales_invalidas
+    return int(user_id)
 
-    user = session.get(Usuario, int(user_id))
-    if user is None or not user.activo:
-        raise credentials_exception
 
-    return user
+def _usuario_activo(datos: dict | None) -> Usuario:
+    if datos is None or not datos["activo"]:
+        raise _credenciales_invalidas
+    # Copia desligada de la sesión: no se comparte entre requests
+    return Usuario(**datos)
+
+
+def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    session: Session = Depends(get_session),
+) -> Usuario:
+    user_id = _usuario_id_del_token(token)
+    datos = cache_usuarios.obtener(user_id)
+    if datos is None:
+        user = session.get(Usuario, user_id)
+        if user is not None:
+            datos = cache_usuarios.guardar(user)
+    return _usuario_activo(datos)
+
+
+async def get_current_user_async(
+    token: str = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_async_session),
+) -> Usuario:
+    """Igual que get_current_user, para los routers async: no usa el threadpool ni el pool sync."""
+    user_id = _usuario_id_del_token(token)
+    datos = cache_usuarios.obtener(user_id)
+    if datos is None:
+        user = await session.get(Usuario, user_id)
+        if user is not None:
+            datos = cache_usuarios.guardar(user)
+    return _usuario_activo(datos)
 
 # ---------------- LOGIN ----------------
-def login_user(correo: str, contrasena: str, session: Session):
-    """Autentica al usuario y genera un token JWT."""
+def usuario_por_correo(session: Session, correo: str) -> Usuario | None:
+    return session.exec(select(Usuario).where(Usuario.correo == correo)).first()
+
+
+def crear_usuario(session: Session, nombre: str, correo: str, hashed_password: str, rol: str) -> Usuario:
+    """Guarda un usuario activo con la contraseña ya hasheada (400 si el correo existe)."""
+    nuevo_usuario = Usuario(
+        nombre=nombre,
+        correo=correo,
+        contrasena=hashed_password,
+        rol=rol,
+        activo=True,
+    )
+    session.add(nuevo_usuario)
+    try:
+        session.commit()
+    except IntegrityError:
+        # Otro registro con el mismo correo entró entre la verificación y el commit
+        session.rollback()
+        raise HTTPException(status_code=400, detail="El correo ya está registrado")
+    session.refresh(nuevo_usuario)
+    return nuevo_usuario
+
+
+def _guardar_hash(session: Session, usuario: Usuario, nuevo_hash: str):
+    usuario.contrasena = nuevo_hash
+    session.add(usuario)
+    session.commit()
+
 
-    usuario = session.exec(select(Usuario).where(Usuario.correo == correo)).first()
+async def login_user(correo: str, contrasena: str, session: Session):
+    """
+    Autentica al usuario y genera un token JWT.
+
+    Es async: bcrypt se espera sin ocupar un hilo del threadpool y las
+    consultas (sesión sync) van al threadpool solo mientras duran.
+    """
+    usuario = await run_in_threadpool(usuario_por_correo, session, correo)
 
     if not usuario:
         raise HTTPException(status_code=400, detail="Correo o contraseña incorrectos")
-    if not verify_password(contrasena, usuario.contrasena):
+    if not await verify_password_async(contrasena, usuario.contrasena):
         raise HTTPException(status_code=400, detail="Correo o contraseña incorrectos")
     if not usuario.activo:
         raise HTTPException(status_code=403, detail="Usuario inactivo")
 
+    # Rehash transparente si el costo de bcrypt cambió desde que se guardó
+    if necesita_rehash(usuario.contrasena):
+        nuevo_hash = await hash_password_async(contrasena)
+        await run_in_threadpool(_guardar_hash, session, usuario, nuevo_hash)
+
     access_token = create_access_token(
         data={"sub": str(usuario.id), "rol": usuario.rol}
     )
@@ -116,3 +243,12 @@ def cliente_required(user=Depends(get_current_user)):
     if user.rol != "usuario":
         raise HTTPException(status_code=403, detail="Solo usuario registrado")
     return user
+
+def spa_editable(session: Session, spa_id: int, user: Usuario) -> Spa:
+    """Spa activo que el usuario puede modificar (admin_principal o su admin_spa)."""
+    spa = session.get(Spa, spa_id)
+    if not spa or not spa.activo:
+        raise HTTPException(status_code=404, detail="Spa no encontrado o inactivo")
+    if user.rol != "admin_principal" and spa.admin_spa_id != user.id:
+        raise HTTPException(status_code=403, detail="No tienes permisos para modificar este Spa.")
+    return spa
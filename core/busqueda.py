@@ -0,0 +1,301 @@
+# core/busqueda.py
+"""
+Índice invertido en memoria para /spas/buscar/.
+
+Indexa nombre, zona y dirección del spa junto con los nombres de sus servicios
+y materiales activos. El texto se normaliza (minúsculas, sin tildes ni ñ),
+así "unas" encuentra "Uñas". Los resultados se ordenan por relevancia
+(peso del campo x idf) y los términos de 3+ letras también coinciden por prefijo.
+
+El índice se construye la primera vez que se busca y se actualiza por spa en
+cada escritura (spas, servicios, materiales). Como cada worker tiene su propia
+copia, además se reconstruye completo cada INDICE_TTL_SEGUNDOS. Cuando vence,
+una sola petición lo reconstruye y las demás siguen buscando en el anterior.
+Las actualizaciones por spa esperan a que termine una reconstrucción en curso,
+así una reconstrucción que leyó la base antes de la escritura no la pisa.
+
+Construir el índice espera a un threading.Lock: las rutas async llaman a
+asegurar() en el threadpool y después buscan con construir=False dentro de
+run_sync, que corre en el event loop y nunca debe esperar ese lock.
+"""
+import bisect
+import math
+import os
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+from sqlmodel import Session, select
+
+from core.db import engine
+from models.models import Material, Servicio, Spa, SpaMaterial, SpaServicio
+
+INDICE_TTL_SEGUNDOS = int(os.getenv("INDICE_TTL_SEGUNDOS", "300"))
+
+# Peso de cada campo en el puntaje
+PESOS = {
+    "nombre": 3.0,
+    "servicios": 2.0,
+    "zona": 1.5,
+    "materiales": 1.5,
+    "direccion": 1.0,
+}
+
+# Factor para coincidencias por prefijo ("acril" -> "acrilicas")
+FACTOR_PREFIJO = 0.8
+LARGO_MINIMO_PREFIJO = 3
+
+PALABRAS_VACIAS = {
+    "a", "al", "con", "de", "del", "el", "en", "la", "las", "lo", "los",
+    "para", "por", "un", "una", "y",
+}
+
+_NO_ALFANUMERICO = re.compile(r"[^a-z0-9]+")
+
+
+# ---------------- NORMALIZACIÓN ----------------
+def normalizar(texto: str | None) -> str:
+    """Minúsculas y sin marcas diacríticas: 'Uñas Acrílicas' -> 'unas acrilicas'."""
+    if not texto:
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", texto.lower())
+    sin_marcas = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return _NO_ALFANUMERICO.sub(" ", sin_marcas)
+
+
+def tokenizar(texto: str | None) -> list[str]:
+    return [t for t in normalizar(texto).split() if t not in PALABRAS_VACIAS]
+
+
+# ---------------- CARGA DESDE LA BASE DE DATOS ----------------
+def _cargar_documentos(session: Session, spa_ids: list[int] | None = None) -> dict[int, dict[str, Counter]]:
+    """Lee los textos a indexar (3 consultas) para todos los spas activos o solo spa_ids."""
+    q_spas = select(Spa.id, Spa.nombre, Spa.zona, Spa.direccion).where(Spa.activo == True)
+    q_servicios = (
+        select(SpaServicio.spa_id, Servicio.nombre)
+        .join(Servicio, Servicio.id == SpaServicio.servicio_id)
+        .where(SpaServicio.activo == True)
+    )
+    q_materiales = (
+        select(SpaMaterial.spa_id, Material.nombre)
+        .join(Material, Material.id == SpaMaterial.material_id)
+        .where(SpaMaterial.activo == True)
+    )
+    if spa_ids is not None:
+        q_spas = q_spas.where(Spa.id.in_(spa_ids))
+        q_servicios = q_servicios.where(SpaServicio.spa_id.in_(spa_ids))
+        q_materiales = q_materiales.where(SpaMaterial.spa_id.in_(spa_ids))
+
+    documentos = {}
+    for spa_id, nombre, zona, direccion in session.exec(q_spas).all():
+        documentos[spa_id] = {
+            "nombre": Counter(tokenizar(nombre)),
+            "zona": Counter(tokenizar(zona)),
+            "direccion": Counter(tokenizar(direccion)),
+            "servicios": Counter(),
+            "materiales": Counter(),
+        }
+    for campo, consulta in (("servicios", q_servicios), ("materiales", q_materiales)):
+        for spa_id, nombre in session.exec(consulta).all():
+            if spa_id in documentos:
+                documentos[spa_id][campo].update(tokenizar(nombre))
+    return documentos
+
+
+# ---------------- ÍNDICE ----------------
+class IndiceSpas:
+    def __init__(self, ttl: int = INDICE_TTL_SEGUNDOS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._postings: dict[str, dict[int, dict[str, int]]] = {}
+        self._vocabulario: list[str] = []  # ordenado, para buscar por prefijo
+        self._documentos: dict[int, dict[str, Counter]] = {}
+        self._construido_en: float | None = None
+        # Solo una reconstrucción o actualización a la vez (ver _asegurar)
+        self._lock_reconstruccion = threading.Lock()
+
+    # -------- mantenimiento (_quitar/_agregar se llaman con el lock tomado) --------
+    def _quitar(self, spa_id: int):
+        documento = self._documentos.pop(spa_id, None)
+        if not documento:
+            return
+        for campo, tokens in documento.items():
+            for token in tokens:
+                docs = self._postings.get(token)
+                if not docs or spa_id not in docs:
+                    continue
+                docs[spa_id].pop(campo, None)
+                if not docs[spa_id]:
+                    del docs[spa_id]
+                if not docs:
+                    del self._postings[token]
+                    i = bisect.bisect_left(self._vocabulario, token)
+                    if i < len(self._vocabulario) and self._vocabulario[i] == token:
+                        self._vocabulario.pop(i)
+
+    def _agregar(self, spa_id: int, documento: dict[str, Counter]):
+        self._documentos[spa_id] = documento
+        for campo, tokens in documento.items():
+            for token, tf in tokens.items():
+                if token not in self._postings:
+                    self._postings[token] = {}
+                    bisect.insort(self._vocabulario, token)
+                self._postings[token].setdefault(spa_id, {})[campo] = tf
+
+    def reconstruir(self, session: Session):
+        """Reconstruye el índice completo desde la base de datos."""
+        with self._lock_reconstruccion:
+            self._reconstruir(session)
+
+    def _reconstruir(self, session: Session):
+        documentos = _cargar_documentos(session)
+
+        # Se arma aparte y se reemplaza de una vez (las búsquedas no esperan)
+        postings: dict[str, dict[int, dict[str, int]]] = {}
+        for spa_id, documento in documentos.items():
+            for campo, tokens in documento.items():
+                for token, tf in tokens.items():
+                    postings.setdefault(token, {}).setdefault(spa_id, {})[campo] = tf
+        vocabulario = sorted(postings)
+
+        with self._lock:
+            self._postings, self._vocabulario, self._documentos = postings, vocabulario, documentos
+            self._construido_en = time.monotonic()
+
+    def _vencido(self) -> bool:
+        construido_en = self._construido_en
+        return construido_en is None or time.monotonic() - construido_en > self.ttl
+
+    def _asegurar(self, session: Session):
+        if not self._vencido():
+            return
+        if self._construido_en is None:
+            # Primera vez: no hay con qué responder, se espera al que construye
+            with self._lock_reconstruccion:
+                if self._construido_en is None:
+                    self._reconstruir(session)
+            return
+        # Vencido: si otro ya lo está reconstruyendo, se busca en el índice anterior
+        if self._lock_reconstruccion.acquire(blocking=False):
+            try:
+                if self._vencido():
+                    self._reconstruir(session)
+            finally:
+                self._lock_reconstruccion.release()
+
+    def asegurar(self):
+        """
+        Construye o renueva el índice con una sesión propia. Para las rutas
+        async: se llama con run_in_threadpool, nunca en el event loop.
+        """
+        if not self._vencido():
+            return
+        with Session(engine) as session:
+            self._asegurar(session)
+
+    def actualizar_spas(self, session: Session, spa_ids):
+        """
+        Reindexa los spas indicados (llamar después del commit, desde rutas sync).
+        Los inactivos o borrados se quitan del índice.
+        """
+        spa_ids = [i for i in set(spa_ids) if i is not None]
+        if not spa_ids:
+            return
+        # Si hay una reconstrucción en curso se espera: puede haber leído la
+        # base antes de este commit y, al reemplazar el índice, deshacer el cambio
+        with self._lock_reconstruccion:
+            if self._construido_en is None:
+                return  # se construirá completo en la primera búsqueda
+            documentos = _cargar_documentos(session, spa_ids)
+            with self._lock:
+                for spa_id in spa_ids:
+                    self._quitar(spa_id)
+                    if spa_id in documentos:
+                        self._agregar(spa_id, documentos[spa_id])
+
+    # -------- consulta --------
+    def _coincidencias(self, token: str, campos: set[str] | None) -> dict[int, float]:
+        candidatos = [(token, 1.0)] if token in self._postings else []
+        if len(token) >= LARGO_MINIMO_PREFIJO:
+            i = bisect.bisect_left(self._vocabulario, token)
+            while i < len(self._vocabulario) and self._vocabulario[i].startswith(token):
+                if self._vocabulario[i] != token:
+                    candidatos.append((self._vocabulario[i], FACTOR_PREFIJO))
+                i += 1
+
+        total_docs = max(len(self._documentos), 1)
+        puntajes: dict[int, float] = {}
+        for termino, factor in candidatos:
+            docs = self._postings[termino]
+            idf = math.log(1 + total_docs / len(docs))
+            for spa_id, por_campo in docs.items():
+                peso = sum(
+                    PESOS[campo] * min(tf, 3)
+                    for campo, tf in por_campo.items()
+                    if campos is None or campo in campos
+                )
+                if peso:
+                    puntaje = peso * idf * factor
+                    if puntaje > puntajes.get(spa_id, 0.0):
+                        puntajes[spa_id] = puntaje
+        return puntajes
+
+    def buscar(
+        self,
+        session: Session,
+        q: str | None = None,
+        nombre: str | None = None,
+        zona: str | None = None,
+        construir: bool = True,
+    ) -> list[tuple[int, float]]:
+        """
+        Devuelve [(spa_id, puntaje)] ordenado por relevancia.
+        Todos los términos deben coincidir: los de 'q' en cualquier campo,
+        los de 'nombre' en el nombre y los de 'zona' en la zona.
+        Con construir=False no construye ni renueva el índice (ya se llamó
+        a asegurar() fuera del event loop).
+        """
+        terminos = (
+            [(t, None) for t in tokenizar(q)]
+            + [(t, {"nombre"}) for t in tokenizar(nombre)]
+            + [(t, {"zona"}) for t in tokenizar(zona)]
+        )
+        if not terminos:
+            return []
+
+        if construir:
+            self._asegurar(session)
+        with self._lock:
+            acumulado: dict[int, float] | None = None
+            for token, campos in terminos:
+                puntajes = self._coincidencias(token, campos)
+                if acumulado is None:
+                    acumulado = puntajes
+                else:
+                    acumulado = {
+                        spa_id: acumulado[spa_id] + p
+                        for spa_id, p in puntajes.items()
+                        if spa_id in acumulado
+                    }
+                if not acumulado:
+                    return []
+
+        return sorted(acumulado.items(), key=lambda par: (-par[1], par[0]))
+
+
+indice_spas = IndiceSpas()
+
+
+# ---------------- AYUDAS PARA LOS ROUTERS ----------------
+def spas_con_servicio(session: Session, servicio_id: int) -> list[int]:
+    return list(session.exec(
+        select(SpaServicio.spa_id).where(SpaServicio.servicio_id == servicio_id)
+    ).all())
+
+
+def spas_con_material(session: Session, material_id: int) -> list[int]:
+    return list(session.exec(
+        select(SpaMaterial.spa_id).where(SpaMaterial.material_id == material_id)
+    ).all())
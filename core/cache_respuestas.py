@@ -0,0 +1,208 @@
+# core/cache_respuestas.py
+"""
+Caché de respuestas ya serializadas (JSON) para las lecturas por spa:
+detalle, servicios y materiales.
+
+La clave incluye Spa.version (core.versiones), que sube con cada escritura
+del spa, sus servicios, materiales, reseñas o imágenes. Por eso una entrada
+vieja nunca se sirve: la invalidación es exacta sin que cada escritura tenga
+que avisarle a la caché. Al guardar una versión nueva se borran las
+anteriores del mismo spa para no ocupar lugar.
+
+- Local: LRU en memoria por worker (CACHE_RESPUESTAS_MAX entradas).
+- Compartida (opcional): con CACHE_RESPUESTAS_SQLITE=/ruta/cache.sqlite los
+  workers de la misma máquina comparten lo que ya se armó.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import Response
+
+CACHE_RESPUESTAS_MAX = int(os.getenv("CACHE_RESPUESTAS_MAX", "2000"))
+CACHE_RESPUESTAS_SQLITE = os.getenv("CACHE_RESPUESTAS_SQLITE")  # None = solo local
+CACHE_RESPUESTAS_SQLITE_MAX = int(os.getenv("CACHE_RESPUESTAS_SQLITE_MAX", "20000"))
+
+# Rol usado cuando la respuesta es igual para todos (endpoints públicos)
+TODOS = "*"
+
+
+class CacheCompartida:
+    """Tabla SQLite en disco local; una conexión por hilo."""
+
+    def __init__(self, ruta: str, max_entradas: int = CACHE_RESPUESTAS_SQLITE_MAX):
+        self.ruta = ruta
+        self.max_entradas = max_entradas
+        self._local = threading.local()
+        self._escrituras = 0
+        conn = self._conexion()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS respuesta ("
+                " clave TEXT PRIMARY KEY, spa_id INTEGER NOT NULL, version INTEGER NOT NULL,"
+                " contenido BLOB NOT NULL, usado REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_respuesta_spa ON respuesta (spa_id, version)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_respuesta_usado ON respuesta (usado)")
+
+    def _conexion(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.ruta, timeout=1.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def obtener(self, clave: str) -> bytes | None:
+        conn = self._conexion()
+        fila = conn.execute("SELECT contenido FROM respuesta WHERE clave = ?", (clave,)).fetchone()
+        if fila is None:
+            return None
+        conn.execute("UPDATE respuesta SET usado = ? WHERE clave = ?", (time.time(), clave))
+        return fila[0]
+
+    def guardar(self, clave: str, spa_id: int, version: int, contenido: bytes):
+        conn = self._conexion()
+        with conn:
+            conn.execute("DELETE FROM respuesta WHERE spa_id = ? AND version < ?", (spa_id, version))
+            conn.execute(
+                "INSERT OR REPLACE INTO respuesta (clave, spa_id, version, contenido, usado) VALUES (?, ?, ?, ?, ?)",
+                (clave, spa_id, version, contenido, time.time()),
+            )
+        # Recorte cada 100 escrituras, no en cada una
+        self._escrituras += 1
+        if self._escrituras % 100 == 0:
+            self.recortar()
+
+    def recortar(self) -> int:
+        """Borra las menos usadas por encima de max_entradas; devuelve cuántas."""
+        conn = self._conexion()
+        with conn:
+            cursor = conn.execute(
+                "DELETE FROM respuesta WHERE clave IN ("
+                " SELECT clave FROM respuesta ORDER BY usado DESC LIMIT -1 OFFSET ?)",
+                (self.max_entradas,),
+            )
+        return cursor.rowcount
+
+    def entradas(self) -> int:
+        return self._conexion().execute("SELECT COUNT(*) FROM respuesta").fetchone()[0]
+
+
+class CacheRespuestas:
+    def __init__(self, max_entradas: int = CACHE_RESPUESTAS_MAX, ruta_compartida: str | None = CACHE_RESPUESTAS_SQLITE):
+        self.max_entradas = max_entradas
+        self._lock = threading.Lock()
+        self._entradas: OrderedDict[str, bytes] = OrderedDict()
+        self._por_spa: dict[int, set[str]] = {}
+        self.compartida = CacheCompartida(ruta_compartida) if ruta_compartida else None
+        self.aciertos = 0
+        self.aciertos_compartida = 0
+        self.fallos = 0
+        self.descartes = 0
+
+    @staticmethod
+    def clave(recurso: str, spa_id: int, version: int, rol: str = TODOS) -> str:
+        return f"{recurso}:{spa_id}:{version}:{rol}"
+
+    @staticmethod
+    def _spa_de(clave: str) -> int:
+        return int(clave.split(":", 2)[1])
+
+    # -------- local (se llaman con el lock tomado) --------
+    def _quitar(self, clave: str):
+        self._entradas.pop(clave, None)
+        claves = self._por_spa.get(self._spa_de(clave))
+        if claves is not None:
+            claves.discard(clave)
+            if not claves:
+                del self._por_spa[self._spa_de(clave)]
+
+    def _poner(self, clave: str, spa_id: int, version: int, contenido: bytes):
+        # Las versiones viejas de este spa ya no se van a pedir
+        for vieja in list(self._por_spa.get(spa_id, ())):
+            if int(vieja.split(":")[2]) < version:
+                self._quitar(vieja)
+        self._entradas[clave] = contenido
+        self._entradas.move_to_end(clave)
+        self._por_spa.setdefault(spa_id, set()).add(clave)
+        while len(self._entradas) > self.max_entradas:
+            self._quitar(next(iter(self._entradas)))
+            self.descartes += 1
+
+    # -------- API --------
+    def obtener(self, recurso: str, spa_id: int, version: int, rol: str = TODOS) -> bytes | None:
+        clave = self.clave(recurso, spa_id, version, rol)
+        with self._lock:
+            contenido = self._entradas.get(clave)
+            if contenido is not None:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return contenido
+
+        # La caché compartida se consulta sin el lock (es I/O)
+        if self.compartida is not None:
+            try:
+                contenido = self.compartida.obtener(clave)
+            except sqlite3.Error:
+                contenido = None
+            if contenido is not None:
+                with self._lock:
+                    self._poner(clave, spa_id, version, contenido)
+                    self.aciertos_compartida += 1
+                return contenido
+
+        with self._lock:
+            self.fallos += 1
+        return None
+
+    def guardar(self, recurso: str, spa_id: int, version: int, contenido: bytes, rol: str = TODOS):
+        clave = self.clave(recurso, spa_id, version, rol)
+        with self._lock:
+            self._poner(clave, spa_id, version, contenido)
+        if self.compartida is not None:
+            try:
+                self.compartida.guardar(clave, spa_id, version, contenido)
+            except sqlite3.Error:
+                pass  # la compartida es una optimización: si está bloqueada, se sigue
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._por_spa.clear()
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            datos = {
+                "entradas": len(self._entradas),
+                "max_entradas": self.max_entradas,
+                "bytes": sum(len(c) for c in self._entradas.values()),
+                "aciertos": self.aciertos,
+                "aciertos_compartida": self.aciertos_compartida,
+                "fallos": self.fallos,
+                "descartes": self.descartes,
+            }
+        if self.compartida is not None:
+            try:
+                datos["entradas_compartida"] = self.compartida.entradas()
+            except sqlite3.Error:
+                datos["entradas_compartida"] = None
+        return datos
+
+
+cache_respuestas = CacheRespuestas()
+
+
+def serializar(datos) -> bytes:
+    """JSON igual al que arma FastAPI para listas/dicts simples."""
+    return json.dumps(datos, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def respuesta_json(contenido: bytes, response: Response) -> Response:
+    """Respuesta con el JSON ya serializado y los headers puestos en 'response' (ETag...)."""
+    encabezados = {k: v for k, v in response.headers.items() if k != "content-length"}
+    return Response(content=contenido, media_type="application/json", headers=encabezados)
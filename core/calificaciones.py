@@ -0,0 +1,73 @@
+# core/calificaciones.py
+"""
+Mantiene Spa.total_resenas, Spa.suma_calificaciones y Spa.calificacion_promedio
+de forma incremental, dentro de la misma transacción que escribe la reseña.
+"""
+from sqlalchemy import case, text, update
+from sqlmodel import Session
+
+from models.models import Spa
+
+# Recalcula desde cero los contadores a partir de las reseñas activas.
+SQL_RECALCULAR = """
+UPDATE spa SET
+    total_resenas = (
+        SELECT COUNT(*) FROM resena r
+        WHERE r.spa_id = spa.id AND r.activo = TRUE
+    ),
+    suma_calificaciones = (
+        SELECT COALESCE(SUM(r.calificacion), 0) FROM resena r
+        WHERE r.spa_id = spa.id AND r.activo = TRUE
+    ),
+    calificacion_promedio = COALESCE((
+        SELECT AVG(r.calificacion) FROM resena r
+        WHERE r.spa_id = spa.id AND r.activo = TRUE
+    ), 0)
+"""
+
+
+def ajustar_calificacion(session: Session, spa_id: int, delta_suma: int, delta_total: int):
+    """
+    Suma los deltas a los contadores del spa con un UPDATE atómico
+    (spa.x = spa.x + delta), así dos reseñas simultáneas no se pisan.
+    También sube Spa.version (las reseñas son parte del detalle del spa).
+    No hace commit: se confirma junto con la reseña.
+    """
+    nueva_suma = Spa.suma_calificaciones + delta_suma
+    nuevo_total = Spa.total_resenas + delta_total
+
+    session.exec(
+        update(Spa)
+        .where(Spa.id == spa_id)
+        .values(
+            suma_calificaciones=nueva_suma,
+            total_resenas=nuevo_total,
+            version=Spa.version + 1,
+            calificacion_promedio=case(
+                (nuevo_total > 0, nueva_suma * 1.0 / nuevo_total),
+                else_=0.0,
+            ),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def recalcular_calificaciones(session: Session, spa_id: int | None = None):
+    """Reconstruye los contadores desde la tabla resena (reparación)."""
+    if spa_id is None:
+        session.exec(text(SQL_RECALCULAR))
+        session.exec(text("UPDATE spa SET version = version + 1"))
+    else:
+        session.exec(text(SQL_RECALCULAR + " WHERE spa.id = :spa_id"), params={"spa_id": spa_id})
+        session.exec(text("UPDATE spa SET version = version + 1 WHERE id = :spa_id"), params={"spa_id": spa_id})
+    session.commit()
+
+
+if __name__ == "__main__":
+    # python -m core.calificaciones [spa_id]
+    import sys
+    from core.db import engine
+
+    with Session(engine) as session:
+        recalcular_calificaciones(session, int(sys.argv[1]) if len(sys.argv) > 1 else None)
+    print("Calificaciones recalculadas.")
@@ -0,0 +1,138 @@
+# core/contrasenas.py
+"""
+Hashing de contraseñas con bcrypt fuera del hilo del request.
+
+bcrypt tarda ~100-300ms por llamada; si corre directo en el threadpool de
+Starlette, una ráfaga de logins deja sin hilos al resto de endpoints. Aquí
+se ejecuta en un ejecutor propio de tamaño fijo (hilos o procesos) y con
+una cola acotada: si se llena, se responde 503 en vez de acumular requests.
+
+Este módulo no importa la base de datos para que los procesos del pool
+arranquen livianos.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from core.instrumentacion import medir_bcrypt
+
+# ---------------- CONFIGURACIÓN ----------------
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(os.cpu_count() or 2)))
+BCRYPT_COLA_MAX = int(os.getenv("BCRYPT_COLA_MAX", "16"))
+BCRYPT_EJECUTOR = os.getenv("BCRYPT_EJECUTOR", "hilos")  # "hilos" | "procesos"
+
+# min/max = rounds: los hashes con otro costo quedan marcados para rehash
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+
+# ---------------- FUNCIONES PURAS (corren en el pool) ----------------
+def _a_bytes(password: str) -> bytes:
+    # bcrypt solo usa los primeros 72 bytes
+    return password.encode("utf-8")[:72]
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(_a_bytes(password))
+
+
+def _verificar(password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(_a_bytes(password), hashed_password)
+
+
+def necesita_rehash(hashed_password: str) -> bool:
+    """True si el hash guardado usa un costo distinto a BCRYPT_ROUNDS."""
+    return pwd_context.needs_update(hashed_password)
+
+
+# ---------------- EJECUTOR ----------------
+_ejecutor: Executor | None = None
+_ejecutor_lock = threading.Lock()
+# Trabajos en ejecución + en espera; más allá de esto se rechaza
+_cupos = threading.BoundedSemaphore(BCRYPT_WORKERS + BCRYPT_COLA_MAX)
+
+
+def _obtener_ejecutor() -> Executor:
+    global _ejecutor
+    if _ejecutor is None:
+        with _ejecutor_lock:
+            if _ejecutor is None:
+                if BCRYPT_EJECUTOR == "procesos":
+                    _ejecutor = ProcessPoolExecutor(max_workers=BCRYPT_WORKERS)
+                else:
+                    _ejecutor = ThreadPoolExecutor(
+                        max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt"
+                    )
+    return _ejecutor
+
+
+def _enviar(fn, *args):
+    if not _cupos.acquire(blocking=False):
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Servidor ocupado, intenta de nuevo en unos segundos",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        futuro = _obtener_ejecutor().submit(fn, *args)
+    except BaseException:
+        _cupos.release()
+        raise
+    futuro.add_done_callback(lambda _: _cupos.release())
+    return futuro
+
+
+def cerrar_ejecutor():
+    """Apaga el pool (al detener la app)."""
+    global _ejecutor
+    with _ejecutor_lock:
+        if _ejecutor is not None:
+            _ejecutor.shutdown(wait=False, cancel_futures=True)
+            _ejecutor = None
+
+
+def _esperar(operacion: str, futuro):
+    inicio = time.perf_counter()
+    try:
+        return futuro.result()
+    finally:
+        medir_bcrypt(operacion, time.perf_counter() - inicio)
+
+
+async def _esperar_async(operacion: str, futuro):
+    inicio = time.perf_counter()
+    try:
+        return await asyncio.wrap_future(futuro)
+    finally:
+        medir_bcrypt(operacion, time.perf_counter() - inicio)
+
+
+# ---------------- API ----------------
+def hash_password(password: str) -> str:
+    """Encripta una contraseña usando bcrypt en el pool dedicado."""
+    return _esperar("hash", _enviar(_hash, password))
+
+
+def verify_password(password: str, hashed_password: str) -> bool:
+    """Verifica una contraseña contra su hash en el pool dedicado."""
+    return _esperar("verify", _enviar(_verificar, password, hashed_password))
+
+
+async def hash_password_async(password: str) -> str:
+    """Versión para endpoints async: no bloquea el event loop."""
+    return await _esperar_async("hash", _enviar(_hash, password))
+
+
+async def verify_password_async(password: str, hashed_password: str) -> bool:
+    return await _esperar_async("verify", _enviar(_verificar, password, hashed_password))
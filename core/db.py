@@ -1,7 +1,13 @@
 # core/db.py
 import os
+import time
 from sqlmodel import SQLModel, create_engine, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import exc
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
 from dotenv import load_dotenv
+from core.metricas import Histograma
 
 # Cargar variables de entorno desde .env
 load_dotenv()
@@ -11,15 +17,134 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise ValueError("No se encontró la variable de entorno DATABASE_URL")
 
+# Modo async: los routers de lectura usan AsyncSession (psycopg async)
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() in ("1", "true", "si")
+
+# ---------------- POOL DE CONEXIONES ----------------
+DB_ECHO = os.getenv("DB_ECHO", "false").lower() in ("1", "true", "si")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "si")
+# Tiempo máximo por sentencia en Postgres (0 = sin límite)
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "0"))
+
+
+class _MedirEspera:
+    """Mide cuánto espera cada request por una conexión del pool."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.espera = Histograma()
+        self.timeouts = 0
+
+    def connect(self):
+        inicio = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.espera.observar(time.perf_counter() - inicio)
+
+    def recreate(self):
+        nuevo = super().recreate()
+        nuevo.espera, nuevo.timeouts = self.espera, self.timeouts
+        return nuevo
+
+
+class PoolInstrumentado(_MedirEspera, QueuePool):
+    pass
+
+
+class PoolAsyncInstrumentado(_MedirEspera, AsyncAdaptedQueuePool):
+    pass
+
+
+def _opciones_motor(url: str, pool_class) -> dict:
+    opciones = {"echo": DB_ECHO}
+    if url.startswith("sqlite") and ":memory:" in url:
+        return opciones
+
+    opciones.update(
+        poolclass=pool_class,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+    if url.startswith("postgres") and DB_STATEMENT_TIMEOUT_MS > 0:
+        opciones["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return opciones
+
+
 # Crear el motor de conexión
-engine = create_engine(DATABASE_URL, echo=True)
+engine = create_engine(DATABASE_URL, **_opciones_motor(DATABASE_URL, PoolInstrumentado))
+
+
+def url_async(url: str) -> str:
+    """Convierte la URL síncrona a su driver async equivalente."""
+    for prefijo in ("postgresql+psycopg2://", "postgresql://", "postgres://"):
+        if url.startswith(prefijo):
+            return "postgresql+psycopg://" + url[len(prefijo):]
+    if url.startswith("sqlite://"):
+        return "sqlite+aiosqlite://" + url[len("sqlite://"):]
+    return url
+
+
+# Motor async (solo si DB_ASYNC está activo)
+async_engine = (
+    create_async_engine(url_async(DATABASE_URL), **_opciones_motor(DATABASE_URL, PoolAsyncInstrumentado))
+    if DB_ASYNC else None
+)
+
+
+def estadisticas_pool() -> dict:
+    """Estado de los pools (conexiones en uso, overflow, espera)."""
+    motores = {"sync": engine}
+    if async_engine is not None:
+        motores["async"] = async_engine.sync_engine
+
+    resultado = {}
+    for nombre, motor in motores.items():
+        pool = motor.pool
+        datos = {"clase": type(pool).__name__, "estado": pool.status()}
+        if isinstance(pool, QueuePool):
+            datos.update(
+                tamano=pool.size(),
+                en_uso=pool.checkedout(),
+                disponibles=pool.checkedin(),
+                overflow=pool.overflow(),
+                max_overflow=DB_MAX_OVERFLOW,
+            )
+        if isinstance(pool, _MedirEspera):
+            datos.update(timeouts=pool.timeouts, espera_segundos=pool.espera.resumen())
+        resultado[nombre] = datos
+    return resultado
+
 
 def create_db_and_tables():
-    """Crea todas las tablas si no existen."""
+    """Crea todas las tablas si no existen y aplica las migraciones pendientes."""
     from models.models import Usuario, Spa, Servicio, Material, Resena
-    SQLModel.metadata.create_all(engine)
+    from core.migraciones import aplicar_migraciones
+    aplicar_migraciones(engine, SQLModel.metadata)
 
 def get_session():
     """Devuelve una sesión de base de datos para usar con FastAPI."""
     with Session(engine) as session:
         yield session
+
+async def get_async_session():
+    """Sesión async para los routers async (requiere DB_ASYNC=true)."""
+    if async_engine is None:
+        raise RuntimeError("DB_ASYNC no está activo")
+    async with AsyncSession(async_engine, expire_on_commit=False) as session:
+        yield session
+
+async def dispose_engines():
+    """Cierra las conexiones del motor async (al detener la app)."""
+    if async_engine is not None:
+        await async_engine.dispose()
@@ -0,0 +1,99 @@
+# core/exportacion.py
+"""
+Exportación del catálogo (spas activos con servicios, precios, materiales y
+calificación) como NDJSON o CSV, generada por partes.
+
+Los spas se leen con yield_per (cursor del lado del servidor en Postgres) y,
+por cada partición, servicios y materiales se traen con una consulta cada uno.
+El worker nunca tiene más de EXPORT_PARTICION spas en memoria, sin importar
+el tamaño del catálogo.
+
+La sesión se abre dentro del generador: la de Depends(get_session) ya está
+cerrada cuando StreamingResponse empieza a iterar.
+"""
+import csv
+import io
+import json
+import os
+from typing import Iterator
+
+from sqlmodel import Session, select
+
+from core.db import engine
+from models.models import Material, Servicio, Spa, SpaMaterial, SpaServicio
+
+EXPORT_PARTICION = int(os.getenv("EXPORT_PARTICION", "500"))
+
+COLUMNAS_CSV = [
+    "id", "nombre", "direccion", "zona", "horario", "latitud", "longitud",
+    "calificacion_promedio", "total_resenas", "ultima_actualizacion",
+    "servicios", "materiales",
+]
+
+
+def _spas_por_particion(session: Session, particion: int) -> Iterator[list[dict]]:
+    """Listas de spas (dicts) de a 'particion', con servicios y materiales anidados."""
+    resultado = session.exec(
+        select(
+            Spa.id, Spa.nombre, Spa.direccion, Spa.zona, Spa.horario, Spa.latitud, Spa.longitud,
+            Spa.calificacion_promedio, Spa.total_resenas, Spa.ultima_actualizacion,
+        )
+        .where(Spa.activo == True)
+        .order_by(Spa.id)
+        .execution_options(yield_per=particion)
+    )
+    for filas in resultado.partitions():
+        spas = {
+            fila.id: {**fila._asdict(), "servicios": [], "materiales": []}
+            for fila in filas
+        }
+        ids = list(spas)
+
+        for spa_id, servicio_id, nombre, precio, duracion in session.exec(
+            select(SpaServicio.spa_id, Servicio.id, Servicio.nombre, SpaServicio.precio, SpaServicio.duracion)
+            .join(Servicio, Servicio.id == SpaServicio.servicio_id)
+            .where(SpaServicio.spa_id.in_(ids), SpaServicio.activo == True)
+            .order_by(SpaServicio.spa_id, Servicio.id)
+        ).all():
+            spas[spa_id]["servicios"].append(
+                {"servicio_id": servicio_id, "nombre": nombre, "precio": precio, "duracion": duracion}
+            )
+
+        for spa_id, material_id, nombre, tipo in session.exec(
+            select(SpaMaterial.spa_id, Material.id, Material.nombre, Material.tipo)
+            .join(Material, Material.id == SpaMaterial.material_id)
+            .where(SpaMaterial.spa_id.in_(ids), SpaMaterial.activo == True)
+            .order_by(SpaMaterial.spa_id, Material.id)
+        ).all():
+            spas[spa_id]["materiales"].append({"id": material_id, "nombre": nombre, "tipo": tipo})
+
+        yield list(spas.values())
+
+
+def exportar_ndjson(particion: int = EXPORT_PARTICION) -> Iterator[bytes]:
+    """Un objeto JSON por línea y por spa."""
+    with Session(engine) as session:
+        for spas in _spas_por_particion(session, particion):
+            yield "".join(
+                json.dumps(spa, ensure_ascii=False, default=str) + "\n" for spa in spas
+            ).encode("utf-8")
+
+
+def exportar_csv(particion: int = EXPORT_PARTICION) -> Iterator[bytes]:
+    """Una fila por spa; servicios y materiales van como JSON en su celda."""
+    buffer = io.StringIO()
+    escritor = csv.DictWriter(buffer, fieldnames=COLUMNAS_CSV)
+    escritor.writeheader()
+    with Session(engine) as session:
+        for spas in _spas_por_particion(session, particion):
+            for spa in spas:
+                escritor.writerow({
+                    **spa,
+                    "servicios": json.dumps(spa["servicios"], ensure_ascii=False),
+                    "materiales": json.dumps(spa["materiales"], ensure_ascii=False),
+                })
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")  # catálogo vacío: solo el encabezado
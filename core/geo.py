@@ -0,0 +1,263 @@
+# core/geo.py
+"""
+Índice espacial en memoria (grilla) para "spas cerca de mí".
+
+Cada spa activo con latitud/longitud cae en una celda de GEO_CELDA_GRADOS
+(0.01° ≈ 1.1 km). Para buscar los k más cercanos se recorren las celdas
+ocupadas en orden de su distancia mínima al punto y se corta cuando la
+siguiente celda ya no puede mejorar el k-ésimo encontrado. El costo depende
+de cuántas celdas tienen spas, no de lo lejos que esté el punto.
+
+La consulta trabaja sobre una instantánea inmutable de las celdas: el lock
+solo se toma para obtenerla, no durante la búsqueda. Las escrituras
+invalidan la instantánea y la siguiente consulta la vuelve a armar.
+
+Las búsquedas se limitan a GEO_RADIO_MAX_KM (0 = sin límite): un punto más
+lejos que eso de todos los spas devuelve una lista vacía sin recorrer nada.
+
+Igual que el índice de búsqueda (core/busqueda.py), se construye en la
+primera consulta, se actualiza por spa en cada escritura y se reconstruye
+cada GEO_TTL_SEGUNDOS: aparte y reemplazando de una vez, una sola petición
+a la vez, mientras las demás consultan el anterior. Las rutas async llaman
+a asegurar() en el threadpool y consultan con construir=False.
+"""
+import heapq
+import math
+import os
+import threading
+import time
+
+from sqlmodel import Session, select
+
+from core.db import engine
+from models.models import Spa
+
+GEO_CELDA_GRADOS = float(os.getenv("GEO_CELDA_GRADOS", "0.01"))
+GEO_TTL_SEGUNDOS = int(os.getenv("GEO_TTL_SEGUNDOS", "300"))
+GEO_RADIO_MAX_KM = float(os.getenv("GEO_RADIO_MAX_KM", "300"))
+
+RADIO_TIERRA_KM = 6371.0088
+
+
+def distancia_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Distancia haversine en km."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dp, dl = p2 - p1, math.radians(lon2 - lon1)
+    a = math.sin(dp / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(dl / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(math.sqrt(a))
+
+
+def _diferencia_lon(lon: float, desde: float, hasta: float) -> float:
+    """Grados de longitud (0-180) entre lon y el intervalo [desde, hasta], dando la vuelta en ±180."""
+    if desde <= lon <= hasta:
+        return 0.0
+    return min((desde - lon) % 360, (lon - hasta) % 360, 180.0)
+
+
+def distancia_minima_km(lat: float, lon: float, lat_min: float, lat_max: float,
+                        lon_min: float, lon_max: float) -> float:
+    """
+    Cota inferior de la distancia entre (lat, lon) y cualquier punto del
+    rectángulo. Sale de la haversine: hav(d) = hav(Δφ) + cos φ1 cos φ2 hav(Δλ),
+    con Δφ y Δλ mínimos y el coseno de la latitud más cercana al polo entre
+    el punto y el rectángulo (el de menor valor).
+    """
+    dlat = max(lat_min - lat, lat - lat_max, 0.0)
+    dlon = _diferencia_lon(lon, lon_min, lon_max)
+    cos_min = math.cos(math.radians(min(max(abs(lat), abs(lat_min), abs(lat_max)), 90.0)))
+    a = math.sin(math.radians(dlat) / 2) ** 2 + cos_min ** 2 * math.sin(math.radians(dlon) / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+class _Instantanea:
+    """Celdas ocupadas y caja que las contiene; no se modifica después de creada."""
+
+    def __init__(self, celdas: list[tuple[int, int, tuple]], limites: tuple[float, float, float, float] | None):
+        self.celdas = celdas      # [(i, j, ((spa_id, lat, lon), ...))]
+        self.limites = limites    # lat_min, lat_max, lon_min, lon_max
+
+
+class IndiceGeo:
+    def __init__(self, celda: float = GEO_CELDA_GRADOS, ttl: int = GEO_TTL_SEGUNDOS,
+                 radio_max_km: float = GEO_RADIO_MAX_KM):
+        self.celda = celda
+        self.ttl = ttl
+        self.radio_max_km = radio_max_km
+        self._lock = threading.Lock()
+        self._puntos: dict[int, tuple[float, float]] = {}
+        self._celdas: dict[tuple[int, int], set[int]] = {}
+        self._instantanea: _Instantanea | None = None
+        self._construido_en: float | None = None
+        # Solo una reconstrucción o actualización a la vez (ver _asegurar)
+        self._lock_reconstruccion = threading.Lock()
+
+    def _celda_de(self, lat: float, lon: float) -> tuple[int, int]:
+        return math.floor(lat / self.celda), math.floor(lon / self.celda)
+
+    # -------- mantenimiento (_quitar/_poner se llaman con el lock tomado) --------
+    def _quitar(self, spa_id: int):
+        punto = self._puntos.pop(spa_id, None)
+        if punto is None:
+            return
+        clave = self._celda_de(*punto)
+        ids = self._celdas.get(clave)
+        if ids:
+            ids.discard(spa_id)
+            if not ids:
+                del self._celdas[clave]
+        self._instantanea = None
+
+    def _poner(self, spa_id: int, lat: float, lon: float):
+        self._puntos[spa_id] = (lat, lon)
+        self._celdas.setdefault(self._celda_de(lat, lon), set()).add(spa_id)
+        self._instantanea = None
+
+    def _armar_instantanea(self) -> _Instantanea:
+        celdas = [
+            (i, j, tuple((spa_id, *self._puntos[spa_id]) for spa_id in ids))
+            for (i, j), ids in self._celdas.items()
+        ]
+        limites = None
+        if self._puntos:
+            lats = [lat for lat, _ in self._puntos.values()]
+            lons = [lon for _, lon in self._puntos.values()]
+            limites = (min(lats), max(lats), min(lons), max(lons))
+        return _Instantanea(celdas, limites)
+
+    def _obtener_instantanea(self) -> _Instantanea:
+        with self._lock:
+            if self._instantanea is None:
+                self._instantanea = self._armar_instantanea()
+            return self._instantanea
+
+    @staticmethod
+    def _consulta(spa_ids=None):
+        query = select(Spa.id, Spa.latitud, Spa.longitud).where(
+            Spa.activo == True,
+            Spa.latitud != None,
+            Spa.longitud != None,
+        )
+        if spa_ids is not None:
+            query = query.where(Spa.id.in_(spa_ids))
+        return query
+
+    def reconstruir(self, session: Session):
+        """Reconstruye el índice completo desde la base de datos."""
+        with self._lock_reconstruccion:
+            self._reconstruir(session)
+
+    def _reconstruir(self, session: Session):
+        # Se arma aparte y se reemplaza de una vez (las consultas no esperan)
+        puntos: dict[int, tuple[float, float]] = {}
+        celdas: dict[tuple[int, int], set[int]] = {}
+        for spa_id, lat, lon in session.exec(self._consulta()).all():
+            puntos[spa_id] = (lat, lon)
+            celdas.setdefault(self._celda_de(lat, lon), set()).add(spa_id)
+
+        with self._lock:
+            self._puntos, self._celdas = puntos, celdas
+            self._instantanea = None
+            self._construido_en = time.monotonic()
+
+    def _vencido(self) -> bool:
+        construido_en = self._construido_en
+        return construido_en is None or time.monotonic() - construido_en > self.ttl
+
+    def _asegurar(self, session: Session):
+        if not self._vencido():
+            return
+        if self._construido_en is None:
+            # Primera vez: no hay con qué responder, se espera al que construye
+            with self._lock_reconstruccion:
+                if self._construido_en is None:
+                    self._reconstruir(session)
+            return
+        # Vencido: si otro ya lo está reconstruyendo, se consulta el índice anterior
+        if self._lock_reconstruccion.acquire(blocking=False):
+            try:
+                if self._vencido():
+                    self._reconstruir(session)
+            finally:
+                self._lock_reconstruccion.release()
+
+    def asegurar(self):
+        """
+        Construye o renueva el índice con una sesión propia. Para las rutas
+        async: se llama con run_in_threadpool, nunca en el event loop.
+        """
+        if not self._vencido():
+            return
+        with Session(engine) as session:
+            self._asegurar(session)
+
+    def actualizar_spas(self, session: Session, spa_ids):
+        """Reubica los spas indicados (llamar después del commit, desde rutas sync)."""
+        spa_ids = [i for i in set(spa_ids) if i is not None]
+        if not spa_ids:
+            return
+        # Se espera a una reconstrucción en curso para que no deshaga el cambio
+        with self._lock_reconstruccion:
+            if self._construido_en is None:
+                return
+            filas = {spa_id: (lat, lon) for spa_id, lat, lon in session.exec(self._consulta(spa_ids)).all()}
+            with self._lock:
+                for spa_id in spa_ids:
+                    self._quitar(spa_id)
+                    if spa_id in filas:
+                        self._poner(spa_id, *filas[spa_id])
+
+    # -------- consulta --------
+    def cercanos(
+        self,
+        session: Session,
+        lat: float,
+        lon: float,
+        k: int = 10,
+        radio_km: float | None = None,
+        construir: bool = True,
+    ) -> list[tuple[int, float]]:
+        """
+        [(spa_id, distancia_km)] de los k spas más cercanos (opcionalmente dentro
+        de radio_km). Con construir=False no construye ni renueva el índice.
+        """
+        if construir:
+            self._asegurar(session)
+        instantanea = self._obtener_instantanea()
+        if instantanea.limites is None:
+            return []
+
+        radio = radio_km if radio_km is not None else math.inf
+        if self.radio_max_km > 0:
+            radio = min(radio, self.radio_max_km)
+        # Punto lejos de todos los spas: ni siquiera se miran las celdas
+        if distancia_minima_km(lat, lon, *instantanea.limites) > radio:
+            return []
+
+        # Celdas ocupadas ordenadas por la distancia mínima posible al punto
+        c = self.celda
+        pendientes = []
+        for i, j, puntos in instantanea.celdas:
+            cota = distancia_minima_km(lat, lon, i * c, (i + 1) * c, j * c, (j + 1) * c)
+            if cota <= radio:
+                pendientes.append((cota, i, j, puntos))
+        heapq.heapify(pendientes)
+
+        # Max-heap (distancia negada) con los k mejores hasta ahora
+        mejores: list[tuple[float, int]] = []
+        while pendientes:
+            cota, _, _, puntos = heapq.heappop(pendientes)
+            if len(mejores) == k and cota > -mejores[0][0]:
+                break
+            for spa_id, p_lat, p_lon in puntos:
+                d = distancia_km(lat, lon, p_lat, p_lon)
+                if d > radio:
+                    continue
+                if len(mejores) < k:
+                    heapq.heappush(mejores, (-d, spa_id))
+                elif d < -mejores[0][0]:
+                    heapq.heapreplace(mejores, (-d, spa_id))
+
+        return sorted(((spa_id, -d) for d, spa_id in mejores), key=lambda item: (item[1], item[0]))
+
+
+indice_geo = IndiceGeo()
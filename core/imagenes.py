@@ -0,0 +1,370 @@
+# core/imagenes.py
+"""
+Subida de imágenes de spas.
+
+- Se copia el archivo por bloques calculando su SHA-256, con tope de tamaño.
+  UploadFile llega cuando Starlette ya recibió el cuerpo completo: por eso el
+  middleware LimiteSubidas corta la subida antes, mientras se recibe.
+- El tipo se detecta por los primeros bytes (no por la extensión del nombre).
+- Con Pillow instalado se leen además las dimensiones: un archivo chico pero
+  muy comprimido puede declarar millones de píxeles (bomba de descompresión),
+  así que se rechaza todo lo que supere IMAGEN_MAX_PIXELES.
+- El archivo se guarda con el hash como nombre: la misma imagen subida dos
+  veces al mismo spa es el mismo archivo y el mismo SpaImage.
+- Las miniaturas (VARIANTES_ANCHOS) se generan en un pool en segundo plano,
+  así el request responde apenas se guarda el original.
+- GET /imagenes/... genera bajo demanda otros anchos (ANCHOS_PERMITIDOS).
+  Las variantes en disco forman una caché acotada a IMAGENES_CACHE_MAX_BYTES
+  que descarta las menos usadas (cada worker lleva su propia cuenta, así que
+  el tope es aproximado con varios workers).
+"""
+import hashlib
+import logging
+import os
+import re
+import tempfile
+import threading
+import warnings
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+IMAGENES_DIR = os.getenv("IMAGENES_DIR", "static/img/spas")
+IMAGENES_URL = "/static/img/spas"
+IMAGEN_MAX_BYTES = int(os.getenv("IMAGEN_MAX_BYTES", str(8 * 1024 * 1024)))
+# Tope de píxeles acorde a IMAGEN_MAX_BYTES (8 MB -> ~33 MP); Pillow lo usa como
+# Image.MAX_IMAGE_PIXELS al abrir subidas y al generar variantes
+IMAGEN_MAX_PIXELES = int(os.getenv("IMAGEN_MAX_PIXELES", str(IMAGEN_MAX_BYTES * 4)))
+IMAGENES_WORKERS = int(os.getenv("IMAGENES_WORKERS", "2"))
+VARIANTES_ANCHOS = (320, 768)
+TAMANO_BLOQUE = 64 * 1024
+
+# Anchos que se sirven; el pedido se redondea hacia arriba para acotar la caché
+ANCHOS_PERMITIDOS = (160, 320, 480, 768, 1024, 1600)
+IMAGENES_CACHE_MAX_BYTES = int(os.getenv("IMAGENES_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Nombre direccionado por contenido: "<sha256>.<ext>"
+_NOMBRE_HASH = re.compile(r"^[0-9a-f]{64}\.(jpg|png|gif|webp)$")
+
+
+# ---------------- DETECCIÓN DE TIPO ----------------
+def detectar_tipo(cabecera: bytes) -> str | None:
+    """Extensión según los 'magic bytes' del archivo, o None si no es imagen."""
+    if cabecera.startswith(b"\xff\xd8\xff"):
+        return "jpg"
+    if cabecera.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if cabecera[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if cabecera[:4] == b"RIFF" and cabecera[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+# ---------------- RUTAS ----------------
+def carpeta_spa(spa_id: int) -> str:
+    return os.path.join(IMAGENES_DIR, str(spa_id))
+
+
+def carpeta_variantes(spa_id: int) -> str:
+    return os.path.join(carpeta_spa(spa_id), "variantes")
+
+
+def ruta_variante(spa_id: int, nombre_original: str, ancho: int) -> str:
+    base = os.path.splitext(nombre_original)[0]
+    return os.path.join(carpeta_variantes(spa_id), f"{base}_{ancho}.webp")
+
+
+def es_direccionado_por_contenido(nombre: str) -> bool:
+    """True si el nombre es el hash del archivo (su contenido nunca cambia)."""
+    return bool(_NOMBRE_HASH.match(nombre))
+
+
+def ancho_permitido(ancho: int | None) -> int | None:
+    """Redondea al ancho permitido más cercano hacia arriba; None = original."""
+    if ancho is None:
+        return None
+    for permitido in ANCHOS_PERMITIDOS:
+        if ancho <= permitido:
+            return permitido
+    return None  # más grande que cualquier variante: se sirve el original
+
+
+# ---------------- PILLOW ----------------
+def _pillow():
+    """
+    Importa Pillow con el tope de IMAGEN_MAX_PIXELES. Por encima del tope
+    Pillow solo avisa (DecompressionBombWarning) hasta el doble, donde recién
+    lanza DecompressionBombError: el aviso se convierte en error.
+    """
+    from PIL import Image
+
+    Image.MAX_IMAGE_PIXELS = IMAGEN_MAX_PIXELES
+    warnings.filterwarnings("error", category=Image.DecompressionBombWarning)
+    return Image
+
+
+def validar_dimensiones(ruta: str):
+    """Lanza 415 si Pillow no reconoce la imagen y 400 si supera IMAGEN_MAX_PIXELES."""
+    try:
+        Image = _pillow()
+    except ImportError:  # sin Pillow solo se valida el tipo por los primeros bytes
+        return
+    from PIL import UnidentifiedImageError
+
+    try:
+        with Image.open(ruta):  # solo lee la cabecera, no decodifica
+            pass
+    except UnidentifiedImageError:
+        raise HTTPException(status_code=415, detail="El archivo no es una imagen JPEG, PNG, GIF o WebP válida")
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning):
+        raise HTTPException(
+            status_code=400,
+            detail=f"La imagen supera el máximo de {IMAGEN_MAX_PIXELES // 1_000_000} megapíxeles",
+        )
+
+
+# ---------------- TOPE DURANTE LA RECEPCIÓN ----------------
+# Margen para los encabezados y separadores del multipart alrededor del archivo
+MARGEN_MULTIPART = 64 * 1024
+_RUTA_SUBIDA = re.compile(r"^/spas/\d+/imagenes/?$")
+
+
+def _detalle_demasiado_grande() -> str:
+    return f"La imagen supera el máximo de {IMAGEN_MAX_BYTES // (1024 * 1024)} MB"
+
+
+class LimiteSubidas:
+    """
+    Middleware ASGI para POST /spas/{spa_id}/imagenes: con Content-Length mayor
+    que IMAGEN_MAX_BYTES (más el margen del multipart) responde 413 sin leer el
+    cuerpo; sin él, corta con 413 apenas lo recibido pasa ese tope.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or not _RUTA_SUBIDA.match(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        tope = IMAGEN_MAX_BYTES + MARGEN_MULTIPART
+        largo = dict(scope["headers"]).get(b"content-length", b"")
+        if largo.isdigit() and int(largo) > tope:
+            respuesta = JSONResponse({"detail": _detalle_demasiado_grande()}, status_code=413)
+            await respuesta(scope, receive, send)
+            return
+
+        recibidos = 0
+
+        async def recibir():
+            nonlocal recibidos
+            mensaje = await receive()
+            if mensaje["type"] == "http.request":
+                recibidos += len(mensaje.get("body", b""))
+                if recibidos > tope:
+                    # FastAPI deja pasar HTTPException al leer el cuerpo: responde 413
+                    raise HTTPException(status_code=413, detail=_detalle_demasiado_grande())
+            return mensaje
+
+        await self.app(scope, recibir, send)
+
+
+# ---------------- GUARDADO ----------------
+def guardar_imagen(archivo: UploadFile, spa_id: int) -> tuple[str, str, str]:
+    """
+    Copia el archivo a la carpeta del spa por bloques.
+    Devuelve (hash, ruta_en_disco, url_publica). Lanza 413 si supera
+    IMAGEN_MAX_BYTES, 415 si no es JPEG/PNG/GIF/WebP y 400 si declara más
+    de IMAGEN_MAX_PIXELES.
+
+    Este tope corre sobre el archivo ya recibido por Starlette; el que corta
+    la subida mientras llega es LimiteSubidas.
+    """
+    carpeta = carpeta_spa(spa_id)
+    os.makedirs(carpeta, exist_ok=True)
+
+    sha = hashlib.sha256()
+    total = 0
+    extension = None
+    descriptor, temporal = tempfile.mkstemp(dir=carpeta, suffix=".subiendo")
+    try:
+        with os.fdopen(descriptor, "wb") as destino:
+            while bloque := archivo.file.read(TAMANO_BLOQUE):
+                if extension is None:
+                    extension = detectar_tipo(bloque[:16])
+                    if extension is None:
+                        raise HTTPException(status_code=415, detail="El archivo no es una imagen JPEG, PNG, GIF o WebP")
+                total += len(bloque)
+                if total > IMAGEN_MAX_BYTES:
+                    raise HTTPException(status_code=413, detail=_detalle_demasiado_grande())
+                sha.update(bloque)
+                destino.write(bloque)
+
+        if extension is None:
+            raise HTTPException(status_code=400, detail="El archivo está vacío")
+        validar_dimensiones(temporal)
+
+        contenido_hash = sha.hexdigest()
+        nombre = f"{contenido_hash}.{extension}"
+        ruta = os.path.join(carpeta, nombre)
+        if os.path.exists(ruta):
+            os.remove(temporal)  # mismos bytes: ya está guardado
+        else:
+            os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+    return contenido_hash, ruta, f"{IMAGENES_URL}/{spa_id}/{nombre}"
+
+
+# ---------------- VARIANTES EN SEGUNDO PLANO ----------------
+def generar_variante(ruta_original: str, destino: str, ancho: int) -> str:
+    """Redimensiona a 'ancho' px (sin agrandar) y guarda como WebP."""
+    Image = _pillow()  # Pillow solo se necesita en los workers
+    from PIL import ImageOps
+
+    os.makedirs(os.path.dirname(destino), exist_ok=True)
+    try:
+        imagen = Image.open(ruta_original)
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning) as error:
+        # Subida antes del tope: se trata como imagen que no se puede procesar
+        raise OSError(f"{ruta_original} supera IMAGEN_MAX_PIXELES") from error
+    with imagen:
+        imagen = ImageOps.exif_transpose(imagen)
+        if imagen.width > ancho:
+            alto = round(imagen.height * ancho / imagen.width)
+            imagen = imagen.resize((ancho, alto), Image.LANCZOS)
+        if imagen.mode not in ("RGB", "RGBA"):
+            imagen = imagen.convert("RGBA" if "A" in imagen.getbands() else "RGB")
+        # Temporal único: dos requests pueden generar la misma variante a la vez
+        descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(destino), suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "wb") as salida:
+                imagen.save(salida, "WEBP", quality=80, method=4)
+            os.replace(temporal, destino)
+        except BaseException:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            raise
+    cache_variantes.registrar(destino)
+    return destino
+
+
+# ---------------- CACHÉ DE VARIANTES EN DISCO ----------------
+class CacheVariantes:
+    """
+    Lleva el tamaño total de las variantes en disco y borra las menos usadas
+    cuando se pasa de max_bytes. Al arrancar se cargan ordenadas por mtime.
+    """
+
+    def __init__(self, max_bytes: int = IMAGENES_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._archivos: OrderedDict[str, int] | None = None  # ruta -> bytes, del menos al más usado
+        self._total = 0
+        self.aciertos = 0
+        self.fallos = 0
+        self.descartes = 0
+
+    def _cargar(self):
+        """Se llama con el lock tomado."""
+        if self._archivos is not None:
+            return
+        encontrados = []
+        if os.path.isdir(IMAGENES_DIR):
+            for spa in os.scandir(IMAGENES_DIR):
+                carpeta = os.path.join(spa.path, "variantes")
+                if not spa.is_dir() or not os.path.isdir(carpeta):
+                    continue
+                for entrada in os.scandir(carpeta):
+                    if entrada.name.endswith(".webp"):
+                        info = entrada.stat()
+                        encontrados.append((info.st_mtime, entrada.path, info.st_size))
+        encontrados.sort()
+        self._archivos = OrderedDict((ruta, tamano) for _, ruta, tamano in encontrados)
+        self._total = sum(self._archivos.values())
+
+    def usar(self, ruta: str) -> bool:
+        """Marca la variante como recién usada. False si no existe en disco."""
+        with self._lock:
+            self._cargar()
+            if ruta in self._archivos and os.path.exists(ruta):
+                self._archivos.move_to_end(ruta)
+                self.aciertos += 1
+                return True
+            self.fallos += 1
+            return False
+
+    def registrar(self, ruta: str):
+        """Agrega una variante recién generada y descarta las más viejas si hace falta."""
+        tamano = os.path.getsize(ruta)
+        with self._lock:
+            self._cargar()
+            self._total += tamano - self._archivos.pop(ruta, 0)
+            self._archivos[ruta] = tamano
+            while self._total > self.max_bytes and len(self._archivos) > 1:
+                vieja, tamano_viejo = self._archivos.popitem(last=False)
+                self._total -= tamano_viejo
+                self.descartes += 1
+                try:
+                    os.remove(vieja)
+                except FileNotFoundError:
+                    pass
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            self._cargar()
+            return {
+                "archivos": len(self._archivos),
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "descartes": self.descartes,
+            }
+
+
+cache_variantes = CacheVariantes()
+
+
+def obtener_variante(spa_id: int, nombre: str, ancho: int) -> str:
+    """Ruta de la variante 'ancho' de la imagen; la genera si no está en caché."""
+    destino = ruta_variante(spa_id, nombre, ancho)
+    if cache_variantes.usar(destino):
+        return destino
+    if os.path.exists(destino):  # generada por otro worker o antes de reiniciar
+        cache_variantes.registrar(destino)
+        return destino
+    return generar_variante(os.path.join(carpeta_spa(spa_id), nombre), destino, ancho)
+
+
+def _generar_variantes(spa_id: int, ruta_original: str):
+    nombre = os.path.basename(ruta_original)
+    for ancho in VARIANTES_ANCHOS:
+        destino = ruta_variante(spa_id, nombre, ancho)
+        if os.path.exists(destino):
+            continue
+        try:
+            generar_variante(ruta_original, destino, ancho)
+        except Exception:
+            logger.exception("No se pudo generar la variante %spx de %s", ancho, ruta_original)
+
+
+_pool_variantes = ThreadPoolExecutor(max_workers=IMAGENES_WORKERS, thread_name_prefix="imagenes")
+
+
+def programar_variantes(spa_id: int, ruta_original: str):
+    """Encola la generación de miniaturas; no bloquea el request."""
+    _pool_variantes.submit(_generar_variantes, spa_id, ruta_original)
+
+
+def cerrar_pool_imagenes():
+    _pool_variantes.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,385 @@
+# core/importacion.py
+"""
+Importación masiva desde CSV o JSONL (CLI y POST /importar/).
+
+Cada fila lleva una columna 'registro' que indica qué es:
+
+    spa           nombre, direccion, zona, horario, latitud, longitud
+    servicio      nombre, descripcion, duracion_ref, precio_ref
+    material      nombre, tipo
+    spa_servicio  spa, servicio, precio, duracion
+    spa_material  spa, material
+    resena        spa, usuario (correo de un usuario existente), calificacion, comentario
+
+Las referencias van por nombre, así que el mismo archivo se puede importar
+varias veces: lo que ya está igual no se toca, lo que cambió se actualiza y
+lo nuevo se inserta. Las reseñas se identifican por (spa, usuario, comentario).
+
+El archivo se lee en streaming y se procesa por lotes de IMPORT_LOTE filas.
+Cada lote es una transacción con pocas consultas por tabla (SELECT ... IN y
+INSERT/UPDATE con executemany), en vez de varias consultas y un commit por
+fila. Dentro de un lote se cargan primero spas, servicios y materiales y
+después asociaciones y reseñas; también valen referencias de lotes anteriores.
+
+Uso: python -m core.importacion datos.csv [--formato csv|jsonl] [--lote 5000]
+"""
+import csv
+import json
+import os
+import time
+from collections import Counter
+from datetime import date
+from typing import Iterable, Iterator, TextIO
+
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import bindparam, insert, select, text, update
+from sqlalchemy.exc import SQLAlchemyError
+from sqlmodel import Session
+
+from core.asociaciones import ResultadoLote, upsert_spa_materiales, upsert_spa_servicios
+from core.calificaciones import SQL_RECALCULAR
+from core.versiones import incrementar_version
+from models.models import Material, Resena, Servicio, Spa, SpaMaterial, SpaServicio, Usuario
+from models.schemas import (
+    ImportResena, ImportSpaMaterial, ImportSpaServicio, MaterialCreate, ServicioCreate, SpaCreate,
+)
+
+IMPORT_LOTE = int(os.getenv("IMPORT_LOTE", "2000"))
+IMPORT_MAX_ERRORES = int(os.getenv("IMPORT_MAX_ERRORES", "1000"))
+
+# Tipo de registro -> esquema de validación (el orden es el de carga dentro de un lote)
+ESQUEMAS: dict[str, type[BaseModel]] = {
+    "spa": SpaCreate,
+    "servicio": ServicioCreate,
+    "material": MaterialCreate,
+    "spa_servicio": ImportSpaServicio,
+    "spa_material": ImportSpaMaterial,
+    "resena": ImportResena,
+}
+
+CAMPOS_SPA = ("direccion", "zona", "horario", "latitud", "longitud")
+CAMPOS_SERVICIO = ("descripcion", "duracion_ref", "precio_ref")
+CAMPOS_MATERIAL = ("tipo",)
+
+
+# ---------------- LECTURA ----------------
+def formato_de(nombre_archivo: str | None) -> str:
+    extension = os.path.splitext(nombre_archivo or "")[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    raise ValueError("Formato no reconocido: usa .csv o .jsonl")
+
+
+def leer_filas(texto: TextIO, formato: str) -> Iterator[tuple[int, dict | None, str | None]]:
+    """Genera (número de fila, datos, error) sin cargar el archivo completo."""
+    if formato == "csv":
+        lector = csv.DictReader(texto)
+        for fila in lector:
+            # En CSV una celda vacía es "sin valor"
+            datos = {k: (v.strip() or None) if isinstance(v, str) else v for k, v in fila.items() if k}
+            yield lector.line_num, datos, None
+    elif formato == "jsonl":
+        for numero, linea in enumerate(texto, start=1):
+            if not linea.strip():
+                continue
+            try:
+                datos = json.loads(linea)
+            except ValueError as exc:
+                yield numero, None, f"JSON inválido: {exc}"
+                continue
+            if not isinstance(datos, dict):
+                yield numero, None, "Cada línea debe ser un objeto JSON"
+                continue
+            yield numero, datos, None
+    else:
+        raise ValueError(f"Formato desconocido: {formato}")
+
+
+def _mensaje_validacion(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(p) for p in error['loc'])}: {error['msg']}" for error in exc.errors()
+    )
+
+
+# ---------------- IMPORTADOR ----------------
+class Importador:
+    def __init__(self, session: Session, lote: int = IMPORT_LOTE):
+        self.session = session
+        self.lote = lote
+        # nombre/correo -> id, para no volver a buscar lo ya resuelto
+        self._ids: dict[str, dict[str, int]] = {"spa": {}, "servicio": {}, "material": {}, "usuario": {}}
+        self.filas = 0
+        self.insertados: Counter = Counter()
+        self.actualizados: Counter = Counter()
+        self.sin_cambios: Counter = Counter()
+        self.errores: list[dict] = []
+        self.total_errores = 0
+
+    def _error(self, fila: int, mensaje: str):
+        self.total_errores += 1
+        if len(self.errores) < IMPORT_MAX_ERRORES:
+            self.errores.append({"fila": fila, "mensaje": mensaje})
+
+    def _validar(self, numero: int, datos: dict) -> tuple[str, int, dict] | None:
+        registro = str(datos.pop("registro", None) or "").strip().lower()
+        esquema = ESQUEMAS.get(registro)
+        if esquema is None:
+            self._error(numero, f"registro desconocido: '{registro}' (usa {', '.join(ESQUEMAS)})")
+            return None
+        try:
+            valido = esquema.model_validate(datos).model_dump()
+        except ValidationError as exc:
+            self._error(numero, _mensaje_validacion(exc))
+            return None
+        if registro == "servicio" and valido["precio_ref"] is not None and valido["precio_ref"] <= 0:
+            self._error(numero, "precio_ref: El precio debe ser mayor que 0")
+            return None
+        for clave in ("nombre", "spa", "servicio", "material"):
+            if clave in valido:
+                valido[clave] = valido[clave].strip()
+        return registro, numero, valido
+
+    def importar(self, filas: Iterable[tuple[int, dict | None, str | None]]) -> dict:
+        inicio = time.perf_counter()
+        lote: list[tuple[str, int, dict]] = []
+        for numero, datos, error in filas:
+            self.filas += 1
+            if error:
+                self._error(numero, error)
+                continue
+            valido = self._validar(numero, datos)
+            if valido:
+                lote.append(valido)
+            if len(lote) >= self.lote:
+                self._procesar_lote(lote)
+                lote = []
+        if lote:
+            self._procesar_lote(lote)
+
+        return {
+            "filas": self.filas,
+            "insertados": dict(self.insertados),
+            "actualizados": dict(self.actualizados),
+            "sin_cambios": dict(self.sin_cambios),
+            "errores": self.total_errores,
+            "detalle_errores": self.errores,
+            "segundos": round(time.perf_counter() - inicio, 3),
+        }
+
+    # -------- un lote = una transacción --------
+    def _procesar_lote(self, lote: list[tuple[str, int, dict]]):
+        por_registro: dict[str, list[tuple[int, dict]]] = {registro: [] for registro in ESQUEMAS}
+        for registro, numero, datos in lote:
+            por_registro[registro].append((numero, datos))
+
+        # Los contadores se confirman recién con el commit
+        conteo = {"insertados": Counter(), "actualizados": Counter(), "sin_cambios": Counter()}
+        errores_antes = (self.total_errores, len(self.errores))
+        afectados: set[int] = set()  # spas cuyo contenido visible cambió
+        try:
+            self._catalogo(Spa, "spa", CAMPOS_SPA, por_registro["spa"], conteo, afectados)
+            self._catalogo(Servicio, "servicio", CAMPOS_SERVICIO, por_registro["servicio"], conteo, afectados)
+            self._catalogo(Material, "material", CAMPOS_MATERIAL, por_registro["material"], conteo, afectados)
+            self._spa_servicios(por_registro["spa_servicio"], conteo, afectados)
+            self._spa_materiales(por_registro["spa_material"], conteo, afectados)
+            con_resenas = self._resenas(por_registro["resena"], conteo)
+
+            if con_resenas:
+                self.session.exec(
+                    text(SQL_RECALCULAR + " WHERE spa.id IN :ids").bindparams(bindparam("ids", expanding=True)),
+                    params={"ids": sorted(con_resenas)},
+                )
+            incrementar_version(self.session, afectados | con_resenas)
+            self.session.commit()
+        except SQLAlchemyError as exc:
+            self.session.rollback()
+            self._ids = {clave: {} for clave in self._ids}  # pueden tener ids revertidos
+            self.total_errores, cortar = errores_antes
+            del self.errores[cortar:]
+            motivo = str(getattr(exc, "orig", None) or exc).splitlines()[0]
+            for _, numero, _ in lote:
+                self._error(numero, f"lote revertido: {motivo}")
+            return
+
+        self.insertados.update(conteo["insertados"])
+        self.actualizados.update(conteo["actualizados"])
+        self.sin_cambios.update(conteo["sin_cambios"])
+
+    # -------- resolución de referencias --------
+    def _resolver(self, tipo: str, claves: set[str]) -> dict[str, int]:
+        cache = self._ids[tipo]
+        faltantes = [clave for clave in claves if clave not in cache]
+        if faltantes:
+            columna_id, columna_clave = {
+                "spa": (Spa.id, Spa.nombre),
+                "servicio": (Servicio.id, Servicio.nombre),
+                "material": (Material.id, Material.nombre),
+                "usuario": (Usuario.id, Usuario.correo),
+            }[tipo]
+            # Si hubiera nombres repetidos en la tabla se usa el de menor id
+            for id_, clave in self.session.exec(
+                select(columna_id, columna_clave).where(columna_clave.in_(faltantes)).order_by(columna_id)
+            ).all():
+                cache.setdefault(clave, id_)
+        return cache
+
+    # -------- spas, servicios, materiales (por nombre) --------
+    def _catalogo(self, modelo, tipo: str, campos: tuple[str, ...], filas, conteo, afectados: set[int]):
+        if not filas:
+            return
+        por_nombre = {datos["nombre"]: datos for _, datos in filas}  # la última fila gana
+
+        existentes = {}
+        for fila in self.session.exec(
+            select(modelo.id, modelo.nombre, *(getattr(modelo, c) for c in campos))
+            .where(modelo.nombre.in_(por_nombre))
+            .order_by(modelo.id)
+        ).all():
+            existentes.setdefault(fila.nombre, fila)
+
+        nuevos, cambios = [], []
+        for nombre, datos in por_nombre.items():
+            valores = {c: datos.get(c) for c in campos}
+            actual = existentes.get(nombre)
+            if actual is None:
+                nuevos.append({"nombre": nombre, **valores})
+            elif any(getattr(actual, c) != v for c, v in valores.items()):
+                cambios.append({"id": actual.id, **valores})
+            else:
+                conteo["sin_cambios"][tipo] += 1
+            if actual is not None:
+                self._ids[tipo][nombre] = actual.id
+
+        if tipo == "spa":
+            hoy = date.today()
+            for fila in nuevos + cambios:
+                fila["ultima_actualizacion"] = hoy
+
+        if cambios:
+            self.session.exec(update(modelo), params=cambios)
+            conteo["actualizados"][tipo] += len(cambios)
+            ids_cambiados = [fila["id"] for fila in cambios]
+            if tipo == "spa":
+                afectados.update(ids_cambiados)
+            else:
+                # El nombre/datos del servicio o material se ven en el detalle de cada spa
+                relacion = SpaServicio if tipo == "servicio" else SpaMaterial
+                columna = relacion.servicio_id if tipo == "servicio" else relacion.material_id
+                afectados.update(self.session.exec(
+                    select(relacion.spa_id).where(columna.in_(ids_cambiados)).distinct()
+                ).all())
+
+        if nuevos:
+            for id_, nombre in self.session.exec(
+                insert(modelo).returning(modelo.id, modelo.nombre), params=nuevos
+            ).all():
+                self._ids[tipo][nombre] = id_
+                if tipo == "spa":
+                    afectados.add(id_)
+            conteo["insertados"][tipo] += len(nuevos)
+
+    def _referencias(self, filas, tipo_destino: str, campo_destino: str):
+        """Resuelve (spa_id, destino_id) de cada fila; las que no existen quedan como error."""
+        spas = self._resolver("spa", {datos["spa"] for _, datos in filas})
+        destinos = self._resolver(tipo_destino, {str(datos[campo_destino]) for _, datos in filas})
+        resueltas = []
+        for numero, datos in filas:
+            spa_id = spas.get(datos["spa"])
+            destino_id = destinos.get(str(datos[campo_destino]))
+            if spa_id is None:
+                self._error(numero, f"spa '{datos['spa']}' no existe")
+            elif destino_id is None:
+                self._error(numero, f"{tipo_destino} '{datos[campo_destino]}' no existe")
+            else:
+                resueltas.append((spa_id, destino_id, datos))
+        return resueltas
+
+    # -------- asociaciones --------
+    def _spa_servicios(self, filas, conteo, afectados: set[int]):
+        if not filas:
+            return
+        pares = {(s, v): datos for s, v, datos in self._referencias(filas, "servicio", "servicio")}
+        self._contar(upsert_spa_servicios(self.session, pares), "spa_servicio", conteo, afectados)
+
+    def _spa_materiales(self, filas, conteo, afectados: set[int]):
+        if not filas:
+            return
+        pares = {(s, m) for s, m, _ in self._referencias(filas, "material", "material")}
+        self._contar(upsert_spa_materiales(self.session, pares), "spa_material", conteo, afectados)
+
+    @staticmethod
+    def _contar(resultado: ResultadoLote, tipo: str, conteo, afectados: set[int]):
+        for clave in ("insertados", "actualizados", "sin_cambios"):
+            if getattr(resultado, clave):
+                conteo[clave][tipo] += getattr(resultado, clave)
+        afectados.update(resultado.spas)
+
+    # -------- reseñas --------
+    def _resenas(self, filas, conteo) -> set[int]:
+        """Inserta/actualiza reseñas; devuelve los spas a los que hay que recalcular contadores."""
+        if not filas:
+            return set()
+        por_clave = {
+            (spa_id, usuario_id, datos["comentario"]): datos
+            for spa_id, usuario_id, datos in self._referencias(filas, "usuario", "usuario")
+        }
+        if not por_clave:
+            return set()
+        existentes = {}
+        for fila in self.session.exec(
+            select(Resena.id, Resena.spa_id, Resena.usuario_id, Resena.comentario, Resena.calificacion, Resena.activo)
+            .where(
+                Resena.spa_id.in_({s for s, _, _ in por_clave}),
+                Resena.usuario_id.in_({u for _, u, _ in por_clave}),
+            )
+            .order_by(Resena.id)
+        ).all():
+            existentes.setdefault((fila.spa_id, fila.usuario_id, fila.comentario), fila)
+
+        hoy = date.today()
+        nuevos, cambios, recalcular = [], [], set()
+        for (spa_id, usuario_id, comentario), datos in por_clave.items():
+            actual = existentes.get((spa_id, usuario_id, comentario))
+            if actual is None:
+                nuevos.append({
+                    "spa_id": spa_id, "usuario_id": usuario_id, "comentario": comentario,
+                    "calificacion": datos["calificacion"], "fecha_creacion": hoy, "activo": True,
+                })
+            elif actual.calificacion != datos["calificacion"] or not actual.activo:
+                cambios.append({"id": actual.id, "calificacion": datos["calificacion"], "activo": True})
+            else:
+                conteo["sin_cambios"]["resena"] += 1
+                continue
+            recalcular.add(spa_id)
+
+        if cambios:
+            self.session.exec(update(Resena), params=cambios)
+            conteo["actualizados"]["resena"] += len(cambios)
+        if nuevos:
+            self.session.exec(insert(Resena), params=nuevos)
+            conteo["insertados"]["resena"] += len(nuevos)
+        return recalcular
+
+
+def importar(session: Session, filas: Iterable[tuple[int, dict | None, str | None]], lote: int = IMPORT_LOTE) -> dict:
+    """Importa las filas (ver leer_filas) y devuelve el resumen con los errores por fila."""
+    return Importador(session, lote).importar(filas)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from core.db import engine
+
+    parser = argparse.ArgumentParser(description="Importación masiva de spas, servicios, materiales y reseñas")
+    parser.add_argument("archivo")
+    parser.add_argument("--formato", choices=["csv", "jsonl"])
+    parser.add_argument("--lote", type=int, default=IMPORT_LOTE)
+    args = parser.parse_args()
+
+    with open(args.archivo, encoding="utf-8-sig", newline="") as texto, Session(engine) as session:
+        resumen = importar(session, leer_filas(texto, args.formato or formato_de(args.archivo)), args.lote)
+    print(json.dumps(resumen, ensure_ascii=False, indent=2))
+    # Los índices en memoria de la API se ponen al día solos por TTL
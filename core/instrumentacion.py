@@ -0,0 +1,291 @@
+# core/instrumentacion.py
+"""
+Métricas por petición: latencia por ruta, tamaño de respuesta, cantidad de
+consultas SQL y tiempo en la base, y tiempo de bcrypt. Se exponen en formato
+Prometheus en /metrics (routers/metricas_router.py).
+
+- MiddlewareMetricas (ASGI) abre una MedicionPeticion por request y la deja
+  en un ContextVar; los endpoints sync corren en el threadpool con una copia
+  del contexto, así que ven el mismo objeto.
+- Los eventos before/after_cursor_execute de los motores de core.db suman
+  cada consulta a la medición del request en curso.
+- core.contrasenas informa el tiempo de cada hash/verificación.
+
+Las peticiones más lentas que METRICAS_PETICION_LENTA_MS y las consultas más
+lentas que METRICAS_CONSULTA_LENTA_MS se registran en el log con su SQL.
+
+contar_consultas() usa los mismos eventos para contar las sentencias de un
+bloque (pruebas y benchmarks), sin importar en qué hilo corran.
+
+Este módulo no importa core.db al cargarse: core.contrasenas lo usa y debe
+seguir sin depender de la base.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from core.metricas import (
+    CUBETAS_BYTES, CUBETAS_CONTEO, Contadores, Histograma, Histogramas,
+    exponer_histogramas, exponer_valores,
+)
+
+logger = logging.getLogger(__name__)
+
+METRICAS_PETICION_LENTA_MS = float(os.getenv("METRICAS_PETICION_LENTA_MS", "500"))
+METRICAS_CONSULTA_LENTA_MS = float(os.getenv("METRICAS_CONSULTA_LENTA_MS", "100"))
+# Largo máximo del SQL que se escribe en el log
+METRICAS_SQL_MAX = int(os.getenv("METRICAS_SQL_MAX", "2000"))
+
+ETIQUETAS_RUTA = ("method", "route")
+
+
+class MedicionPeticion:
+    def __init__(self, scope: dict):
+        self.scope = scope
+        self.consultas = 0
+        self.segundos_db = 0.0
+        self.segundos_bcrypt = 0.0
+        self.consulta_mas_lenta: tuple[float, str] | None = None  # (segundos, sql)
+
+    def ruta(self) -> str:
+        return ruta_de(self.scope)
+
+
+_medicion: ContextVar[MedicionPeticion | None] = ContextVar("medicion_peticion", default=None)
+
+# ---------------- MÉTRICAS ----------------
+duracion_peticiones = Histogramas()
+peticiones = Contadores()
+tamano_respuestas = Histogramas(CUBETAS_BYTES)
+consultas_por_peticion = Histogramas(CUBETAS_CONTEO)
+segundos_db_por_ruta = Contadores()
+peticiones_lentas = Contadores()
+duracion_consultas = Histograma()
+consultas_lentas = Contadores()
+duracion_bcrypt = Histogramas()
+
+
+def ruta_de(scope: dict) -> str:
+    """Plantilla de la ruta (/spas/{spa_id}), no la URL: evita una serie por id."""
+    ruta = scope.get("route")
+    if ruta is not None and getattr(ruta, "path", None):
+        return ruta.path
+    if scope.get("path", "").startswith("/static/"):
+        return "/static"
+    return "sin_ruta"
+
+
+def _sql_corto(sql: str) -> str:
+    sql = " ".join(sql.split())
+    return sql if len(sql) <= METRICAS_SQL_MAX else sql[:METRICAS_SQL_MAX] + "…"
+
+
+# ---------------- CONTEO DE CONSULTAS ----------------
+class ContadorConsultas:
+    """Sentencias SQL ejecutadas mientras el contador está activo."""
+
+    def __init__(self):
+        self.total = 0
+        self.sentencias: list[str] = []
+        self._lock = threading.Lock()
+
+    def sumar(self, statement: str):
+        with self._lock:
+            self.total += 1
+            self.sentencias.append(statement)
+
+
+_contadores: list[ContadorConsultas] = []
+
+
+@contextmanager
+def contar_consultas():
+    """Cuenta las sentencias de los motores de core.db dentro del bloque."""
+    instrumentar_motores()
+    contador = ContadorConsultas()
+    _contadores.append(contador)
+    try:
+        yield contador
+    finally:
+        _contadores.remove(contador)
+
+
+# ---------------- CONSULTAS SQL ----------------
+def _antes_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("inicio_consultas", []).append(time.perf_counter())
+    for contador in _contadores:
+        contador.sumar(statement)
+
+
+def _despues_de_consulta(conn, cursor, statement, parameters, context, executemany):
+    inicios = conn.info.get("inicio_consultas")
+    if not inicios:
+        return
+    segundos = time.perf_counter() - inicios.pop()
+    duracion_consultas.observar(segundos)
+
+    medicion = _medicion.get()
+    if medicion is not None:
+        medicion.consultas += 1
+        medicion.segundos_db += segundos
+        if medicion.consulta_mas_lenta is None or segundos > medicion.consulta_mas_lenta[0]:
+            medicion.consulta_mas_lenta = (segundos, statement)
+
+    if segundos * 1000 >= METRICAS_CONSULTA_LENTA_MS:
+        ruta = medicion.ruta() if medicion is not None else "fuera_de_peticion"
+        consultas_lentas.sumar((ruta,))
+        logger.warning("Consulta lenta (%.0f ms) en %s: %s", segundos * 1000, ruta, _sql_corto(statement))
+
+
+def _error_de_consulta(contexto_error):
+    # after_cursor_execute no se llama si la consulta falla
+    conexion = contexto_error.connection
+    if conexion is not None and conexion.info.get("inicio_consultas"):
+        conexion.info["inicio_consultas"].pop()
+
+
+_instrumentados: set[int] = set()
+
+
+def instrumentar_motores():
+    """Escucha los eventos de los motores de core.db (una sola vez por motor)."""
+    from sqlalchemy import event
+
+    from core.db import async_engine, engine
+
+    for motor in [engine] + ([async_engine.sync_engine] if async_engine is not None else []):
+        if id(motor) in _instrumentados:
+            continue
+        event.listen(motor, "before_cursor_execute", _antes_de_consulta)
+        event.listen(motor, "after_cursor_execute", _despues_de_consulta)
+        event.listen(motor, "handle_error", _error_de_consulta)
+        _instrumentados.add(id(motor))
+
+
+# ---------------- BCRYPT ----------------
+def medir_bcrypt(operacion: str, segundos: float):
+    """Lo llama core.contrasenas con la espera total (cola + cálculo)."""
+    duracion_bcrypt.observar((operacion,), segundos)
+    medicion = _medicion.get()
+    if medicion is not None:
+        medicion.segundos_bcrypt += segundos
+
+
+# ---------------- MIDDLEWARE ----------------
+def _registrar(medicion: MedicionPeticion, metodo: str, estado: int, tamano: int, segundos: float):
+    ruta = medicion.ruta()
+    etiquetas = (metodo, ruta)
+    duracion_peticiones.observar(etiquetas, segundos)
+    peticiones.sumar((metodo, ruta, str(estado)))
+    tamano_respuestas.observar(etiquetas, tamano)
+    consultas_por_peticion.observar(etiquetas, medicion.consultas)
+    segundos_db_por_ruta.sumar(etiquetas, medicion.segundos_db)
+
+    if segundos * 1000 >= METRICAS_PETICION_LENTA_MS:
+        peticiones_lentas.sumar(etiquetas)
+        mas_lenta = medicion.consulta_mas_lenta
+        logger.warning(
+            "Petición lenta %s %s -> %s: %.0f ms, %d consultas (%.0f ms en DB), bcrypt %.0f ms%s",
+            metodo, ruta, estado, segundos * 1000, medicion.consultas, medicion.segundos_db * 1000,
+            medicion.segundos_bcrypt * 1000,
+            f"; consulta más lenta ({mas_lenta[0] * 1000:.0f} ms): {_sql_corto(mas_lenta[1])}" if mas_lenta else "",
+        )
+
+
+class MiddlewareMetricas:
+    """Middleware ASGI puro: no envuelve el cuerpo, así no afecta al streaming."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        medicion = MedicionPeticion(scope)
+        token = _medicion.set(medicion)
+        inicio = time.perf_counter()
+        estado, tamano = 500, 0
+
+        async def enviar(mensaje):
+            nonlocal estado, tamano
+            if mensaje["type"] == "http.response.start":
+                estado = mensaje["status"]
+            elif mensaje["type"] == "http.response.body":
+                tamano += len(mensaje.get("body", b""))
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            _medicion.reset(token)
+            _registrar(medicion, scope["method"], estado, tamano, time.perf_counter() - inicio)
+
+
+# ---------------- EXPOSICIÓN ----------------
+def texto_prometheus() -> str:
+    """Todas las métricas en formato de texto de Prometheus (0.0.4)."""
+    from core.cache_respuestas import cache_respuestas
+    from core.db import async_engine, engine
+    from core.imagenes import cache_variantes
+
+    lineas = []
+    lineas += exponer_histogramas(
+        "http_request_duration_seconds", "Duración de las peticiones por ruta.",
+        ETIQUETAS_RUTA, duracion_peticiones.items())
+    lineas += exponer_valores(
+        "http_requests_total", "counter", "Peticiones por ruta y código de estado.",
+        ETIQUETAS_RUTA + ("status",), peticiones.valores())
+    lineas += exponer_histogramas(
+        "http_response_size_bytes", "Tamaño del cuerpo de la respuesta.",
+        ETIQUETAS_RUTA, tamano_respuestas.items())
+    lineas += exponer_valores(
+        "http_slow_requests_total", "counter",
+        f"Peticiones más lentas que {METRICAS_PETICION_LENTA_MS:.0f} ms.",
+        ETIQUETAS_RUTA, peticiones_lentas.valores())
+    lineas += exponer_histogramas(
+        "db_queries_per_request", "Consultas SQL por petición.",
+        ETIQUETAS_RUTA, consultas_por_peticion.items())
+    lineas += exponer_valores(
+        "db_time_seconds_total", "counter", "Tiempo total en la base por ruta.",
+        ETIQUETAS_RUTA, segundos_db_por_ruta.valores())
+    lineas += exponer_histogramas(
+        "db_query_duration_seconds", "Duración de cada consulta SQL.", (), [((), duracion_consultas)])
+    lineas += exponer_valores(
+        "db_slow_queries_total", "counter",
+        f"Consultas más lentas que {METRICAS_CONSULTA_LENTA_MS:.0f} ms.",
+        ("route",), consultas_lentas.valores())
+    lineas += exponer_histogramas(
+        "bcrypt_duration_seconds", "Espera por hash/verificación de contraseña (cola + cálculo).",
+        ("operation",), duracion_bcrypt.items())
+
+    # Pool de conexiones
+    motores = {"sync": engine}
+    if async_engine is not None:
+        motores["async"] = async_engine.sync_engine
+    en_uso, esperas = {}, []
+    for nombre, motor in motores.items():
+        pool = motor.pool
+        if hasattr(pool, "checkedout"):
+            en_uso[(nombre,)] = pool.checkedout()
+        if hasattr(pool, "espera"):
+            esperas.append(((nombre,), pool.espera))
+    lineas += exponer_valores("db_pool_connections_in_use", "gauge", "Conexiones prestadas.", ("engine",), en_uso)
+    lineas += exponer_histogramas("db_pool_wait_seconds", "Espera por una conexión del pool.", ("engine",), esperas)
+
+    # Cachés
+    aciertos, fallos = {}, {}
+    respuestas = cache_respuestas.estadisticas()
+    aciertos[("respuestas",)] = respuestas["aciertos"] + respuestas["aciertos_compartida"]
+    fallos[("respuestas",)] = respuestas["fallos"]
+    imagenes = cache_variantes.estadisticas()
+    aciertos[("imagenes",)] = imagenes["aciertos"]
+    fallos[("imagenes",)] = imagenes["fallos"]
+    lineas += exponer_valores("cache_hits_total", "counter", "Aciertos por caché.", ("cache",), aciertos)
+    lineas += exponer_valores("cache_misses_total", "counter", "Fallos por caché.", ("cache",), fallos)
+
+    return "\n".join(lineas) + "\n"
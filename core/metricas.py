@@ -0,0 +1,118 @@
+# core/metricas.py
+"""Primitivas de métricas en memoria (contadores e histogramas), sin dependencias."""
+import threading
+
+# Cubetas por defecto en segundos (estilo Prometheus)
+CUBETAS_SEGUNDOS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histograma:
+    """Histograma acumulado por cubetas, seguro entre hilos."""
+
+    def __init__(self, cubetas: tuple[float, ...] = CUBETAS_SEGUNDOS):
+        self.cubetas = tuple(sorted(cubetas))
+        self._conteos = [0] * (len(self.cubetas) + 1)  # la última es +Inf
+        self._suma = 0.0
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def observar(self, valor: float):
+        indice = len(self.cubetas)
+        for i, limite in enumerate(self.cubetas):
+            if valor <= limite:
+                indice = i
+                break
+        with self._lock:
+            self._conteos[indice] += 1
+            self._suma += valor
+            self._total += 1
+
+    def resumen(self) -> dict:
+        """Conteos acumulados por cubeta (le = less or equal), suma y total."""
+        with self._lock:
+            conteos = list(self._conteos)
+            suma, total = self._suma, self._total
+        acumulado, cubetas = 0, {}
+        for limite, conteo in zip(self.cubetas + (float("inf"),), conteos):
+            acumulado += conteo
+            cubetas["+Inf" if limite == float("inf") else str(limite)] = acumulado
+        return {"cubetas": cubetas, "suma": suma, "total": total}
+
+
+# Cubetas para tamaños (bytes) y conteos (consultas por petición)
+CUBETAS_BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+CUBETAS_CONTEO = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Contadores:
+    """Contadores por combinación de etiquetas (tupla de valores)."""
+
+    def __init__(self):
+        self._valores: dict[tuple, float] = {}
+        self._lock = threading.Lock()
+
+    def sumar(self, etiquetas: tuple, valor: float = 1):
+        with self._lock:
+            self._valores[etiquetas] = self._valores.get(etiquetas, 0) + valor
+
+    def valores(self) -> dict[tuple, float]:
+        with self._lock:
+            return dict(self._valores)
+
+
+class Histogramas:
+    """Un Histograma por combinación de etiquetas."""
+
+    def __init__(self, cubetas: tuple[float, ...] = CUBETAS_SEGUNDOS):
+        self.cubetas = cubetas
+        self._por_etiquetas: dict[tuple, Histograma] = {}
+        self._lock = threading.Lock()
+
+    def observar(self, etiquetas: tuple, valor: float):
+        histograma = self._por_etiquetas.get(etiquetas)
+        if histograma is None:
+            with self._lock:
+                histograma = self._por_etiquetas.setdefault(etiquetas, Histograma(self.cubetas))
+        histograma.observar(valor)
+
+    def items(self) -> list[tuple[tuple, Histograma]]:
+        with self._lock:
+            return list(self._por_etiquetas.items())
+
+
+# ---------------- FORMATO PROMETHEUS ----------------
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _etiquetas(nombres: tuple[str, ...], valores: tuple, extra: str = "") -> str:
+    partes = [f'{n}="{_escapar(v)}"' for n, v in zip(nombres, valores)]
+    if extra:
+        partes.append(extra)
+    return "{" + ",".join(partes) + "}" if partes else ""
+
+
+def _numero(valor: float) -> str:
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+def exponer_valores(nombre: str, tipo: str, ayuda: str, etiquetas: tuple[str, ...],
+                    valores: dict[tuple, float]) -> list[str]:
+    """Líneas de un counter o gauge: {(valores de etiquetas): valor}."""
+    lineas = [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo}"]
+    for clave, valor in sorted(valores.items()):
+        lineas.append(f"{nombre}{_etiquetas(etiquetas, clave)} {_numero(valor)}")
+    return lineas
+
+
+def exponer_histogramas(nombre: str, ayuda: str, etiquetas: tuple[str, ...],
+                        histogramas: list[tuple[tuple, Histograma]]) -> list[str]:
+    lineas = [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} histogram"]
+    for clave, histograma in sorted(histogramas, key=lambda item: item[0]):
+        resumen = histograma.resumen()
+        for limite, acumulado in resumen["cubetas"].items():
+            le = 'le="' + limite + '"'
+            lineas.append(f"{nombre}_bucket{_etiquetas(etiquetas, clave, le)} {acumulado}")
+        lineas.append(f"{nombre}_sum{_etiquetas(etiquetas, clave)} {_numero(resumen['suma'])}")
+        lineas.append(f"{nombre}_count{_etiquetas(etiquetas, clave)} {resumen['total']}")
+    return lineas
@@ -0,0 +1,188 @@
+# core/migraciones.py
+"""
+Migraciones versionadas del esquema.
+
+create_all solo crea tablas nuevas: no agrega columnas ni índices a tablas
+que ya existen en producción. Cada migración es una función idempotente que
+recibe una conexión; la versión aplicada se guarda en la tabla schema_version.
+
+Cada worker corre las migraciones al iniciar. Para que dos no migren a la
+vez, la creación de tablas y todas las migraciones pendientes van en una sola
+transacción que empieza tomando un lock de la base (pg_advisory_xact_lock en
+Postgres, BEGIN IMMEDIATE en SQLite): los demás workers esperan y después no
+encuentran nada pendiente. Si una migración falla, no queda aplicada ninguna
+de esa ejecución.
+"""
+import logging
+import os
+from contextlib import contextmanager
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+
+logger = logging.getLogger(__name__)
+
+# Clave del pg_advisory_xact_lock de las migraciones (cualquier entero fijo)
+CLAVE_BLOQUEO = 7_260_001
+# Cuánto espera un worker en SQLite a que otro termine de migrar
+MIGRACIONES_ESPERA_MS = int(os.getenv("MIGRACIONES_ESPERA_MS", "300000"))
+
+
+# ---------------- UTILIDADES ----------------
+def _columnas(conn: Connection, tabla: str) -> set[str]:
+    return {col["name"] for col in inspect(conn).get_columns(tabla)}
+
+
+def _agregar_columna(conn: Connection, tabla: str, columna: str, ddl: str):
+    """Agrega la columna solo si la tabla aún no la tiene."""
+    if columna not in _columnas(conn, tabla):
+        conn.execute(text(f"ALTER TABLE {tabla} ADD COLUMN {columna} {ddl}"))
+
+
+def _crear_indice_unico(conn: Connection, nombre: str, tabla: str, columnas: str):
+    """
+    Crea el índice único solo si no hay valores repetidos. Si los hay, se
+    detiene con la lista de ejemplos: borrar o fusionar datos no se hace
+    en automático.
+    """
+    repetidos = conn.execute(text(
+        f"SELECT {columnas}, COUNT(*) AS veces FROM {tabla}"
+        f" GROUP BY {columnas} HAVING COUNT(*) > 1 ORDER BY veces DESC LIMIT 10"
+    )).all()
+    if repetidos:
+        ejemplos = ", ".join(str(tuple(fila)) for fila in repetidos)
+        raise RuntimeError(
+            f"No se puede crear {nombre}: hay valores repetidos en {tabla} ({columnas}). "
+            f"Ejemplos (valores..., veces): {ejemplos}. Resolverlos y volver a iniciar."
+        )
+    conn.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {nombre} ON {tabla} ({columnas})"))
+
+
+# ---------------- MIGRACIONES ----------------
+def _m001_contadores_resenas(conn: Connection):
+    """Suma y total de reseñas activas por spa (promedio incremental)."""
+    _agregar_columna(conn, "spa", "total_resenas", "INTEGER NOT NULL DEFAULT 0")
+    _agregar_columna(conn, "spa", "suma_calificaciones", "INTEGER NOT NULL DEFAULT 0")
+
+    from core.calificaciones import SQL_RECALCULAR
+    conn.execute(text(SQL_RECALCULAR))
+
+
+def _m002_indices_facetas(conn: Connection):
+    """Índices usados por /spas/filtrar/."""
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_spaservicio_servicio_precio ON spaservicio (servicio_id, precio)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_spaservicio_spa_id ON spaservicio (spa_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_spamaterial_material_id ON spamaterial (material_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_spa_calificacion_promedio ON spa (calificacion_promedio)"))
+
+
+def _m003_coordenadas_spa(conn: Connection):
+    """Latitud y longitud para la búsqueda por cercanía."""
+    _agregar_columna(conn, "spa", "latitud", "DOUBLE PRECISION")
+    _agregar_columna(conn, "spa", "longitud", "DOUBLE PRECISION")
+
+
+def _m004_hash_imagenes(conn: Connection):
+    """Hash del contenido de cada imagen (deduplicación)."""
+    _agregar_columna(conn, "spaimage", "hash_contenido", "VARCHAR")
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_spaimage_hash_contenido ON spaimage (hash_contenido)"))
+
+
+def _m005_version_spa(conn: Connection):
+    """Contador de cambios por spa (ETag de las lecturas públicas)."""
+    _agregar_columna(conn, "spa", "version", "INTEGER NOT NULL DEFAULT 0")
+
+
+def _m006_indices_busquedas(conn: Connection):
+    """Índices y restricciones únicas de las columnas más consultadas."""
+    _crear_indice_unico(conn, "ix_usuario_correo", "usuario", "correo")
+    _crear_indice_unico(conn, "ix_spa_nombre", "spa", "nombre")
+    _crear_indice_unico(conn, "ix_spaservicio_spa_servicio", "spaservicio", "spa_id, servicio_id")
+    # El índice único empieza por spa_id: el simple sobra
+    conn.execute(text("DROP INDEX IF EXISTS ix_spaservicio_spa_id"))
+
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_spa_activo ON spa (activo)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_resena_spa_id_activo ON resena (spa_id, activo)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_resena_usuario_id ON resena (usuario_id)"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_spaimage_spa_id ON spaimage (spa_id)"))
+
+
+def _m007_imagen_unica_por_spa(conn: Connection):
+    """Los mismos bytes una sola vez por spa (subidas simultáneas de la misma imagen)."""
+    _crear_indice_unico(conn, "ix_spaimage_spa_hash", "spaimage", "spa_id, hash_contenido")
+    # El índice único empieza por spa_id: el simple sobra
+    conn.execute(text("DROP INDEX IF EXISTS ix_spaimage_spa_id"))
+
+
+# (versión, descripción, función) — agregar siempre al final
+MIGRACIONES = [
+    (1, "contadores de reseñas en spa", _m001_contadores_resenas),
+    (2, "índices para filtro por facetas", _m002_indices_facetas),
+    (3, "coordenadas de spa", _m003_coordenadas_spa),
+    (4, "hash de contenido en imágenes", _m004_hash_imagenes),
+    (5, "versión de spa para ETag", _m005_version_spa),
+    (6, "índices y restricciones únicas de búsquedas frecuentes", _m006_indices_busquedas),
+    (7, "imagen única por spa y hash", _m007_imagen_unica_por_spa),
+]
+
+
+# ---------------- EJECUCIÓN ----------------
+def version_actual(conn: Connection) -> int:
+    conn.execute(text("CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"))
+    version = conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar()
+    return version or 0
+
+
+@contextmanager
+def _bloqueo(conn: Connection):
+    """
+    Un solo proceso a la vez dentro de la transacción; el lock se suelta con
+    el commit o el rollback. Postgres: pg_advisory_xact_lock. SQLite: BEGIN
+    IMMEDIATE (lock de escritura), esperando hasta MIGRACIONES_ESPERA_MS.
+    """
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("SELECT pg_advisory_xact_lock(:clave)"), {"clave": CLAVE_BLOQUEO})
+        yield
+    elif conn.dialect.name == "sqlite":
+        espera_previa = conn.exec_driver_sql("PRAGMA busy_timeout").scalar()
+        conn.exec_driver_sql(f"PRAGMA busy_timeout = {MIGRACIONES_ESPERA_MS}")
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        try:
+            yield
+        finally:
+            conn.exec_driver_sql(f"PRAGMA busy_timeout = {int(espera_previa)}")
+    else:
+        yield
+
+
+def aplicar_migraciones(engine, metadata=None):
+    """
+    Crea las tablas de 'metadata' (si se pasa) y aplica, en orden, las
+    migraciones que aún no se han ejecutado. Todo va en una transacción con
+    el bloqueo de migraciones: la versión se lee después de tomarlo.
+    """
+    aplicadas = []
+    with engine.begin() as conn, _bloqueo(conn):
+        if metadata is not None:
+            metadata.create_all(conn)
+        actual = version_actual(conn)
+
+        for version, descripcion, migrar in MIGRACIONES:
+            if version <= actual:
+                continue
+            migrar(conn)
+            conn.execute(
+                text("INSERT INTO schema_version (version) VALUES (:v)"),
+                {"v": version},
+            )
+            aplicadas.append((version, descripcion))
+
+    for version, descripcion in aplicadas:
+        logger.info("Migración %s aplicada: %s", version, descripcion)
+
+
+if __name__ == "__main__":
+    from core.db import engine
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    aplicar_migraciones(engine)
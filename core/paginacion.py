@@ -0,0 +1,93 @@
+# core/paginacion.py
+import base64
+import bisect
+import json
+import math
+import os
+
+from fastapi import HTTPException, Query, Response
+from sqlmodel import Session
+
+# Tamaño de página por defecto y tope máximo (configurables por entorno)
+PAGINA_POR_DEFECTO = int(os.getenv("PAGINA_POR_DEFECTO", "50"))
+PAGINA_MAXIMA = int(os.getenv("PAGINA_MAXIMA", "200"))
+
+# Header donde se devuelve el cursor de la siguiente página.
+# El cuerpo sigue siendo una lista para no romper el frontend.
+HEADER_CURSOR = "X-Next-Cursor"
+
+
+def codificar_cursor(ultimo_id: int, **extra) -> str:
+    """Convierte el último id visto (y datos extra de orden) en un cursor opaco."""
+    crudo = json.dumps({"id": ultimo_id, **extra}).encode("utf-8")
+    return base64.urlsafe_b64encode(crudo).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> dict:
+    """Recupera el último id visto (y datos extra) desde un cursor opaco."""
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        datos["id"] = int(datos["id"])
+        return datos
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
+
+class Pagina:
+    """
+    Dependencia de paginación por cursor (keyset).
+    Uso: pagina: Pagina = Depends()
+    """
+
+    def __init__(
+        self,
+        response: Response,
+        cursor: str | None = Query(None, description="Cursor devuelto en X-Next-Cursor"),
+        limite: int = Query(PAGINA_POR_DEFECTO, ge=1, description=f"Máximo {PAGINA_MAXIMA}"),
+    ):
+        self.response = response
+        self.datos = decodificar_cursor(cursor) if cursor else None
+        self.despues_de = self.datos["id"] if self.datos else None
+        self.limite = min(limite, PAGINA_MAXIMA)
+
+
+def paginar(session: Session, query, columna_id, pagina: Pagina) -> list:
+    """
+    Ejecuta la consulta ordenada por columna_id, devolviendo a lo sumo
+    pagina.limite filas. Si hay más, deja el cursor en el header X-Next-Cursor.
+    """
+    if pagina.despues_de is not None:
+        query = query.where(columna_id > pagina.despues_de)
+
+    filas = session.exec(query.order_by(columna_id).limit(pagina.limite + 1)).all()
+
+    if len(filas) > pagina.limite:
+        filas = filas[:pagina.limite]
+        pagina.response.headers[HEADER_CURSOR] = codificar_cursor(filas[-1].id)
+
+    return filas
+
+
+def paginar_ranking(resultados: list[tuple[int, float]], pagina: Pagina) -> list[tuple[int, float]]:
+    """
+    Igual que paginar pero sobre resultados ya ordenados por (puntaje desc, id).
+    El cursor guarda el último (id, puntaje), así la página sigue siendo estable.
+    """
+    if pagina.datos is not None:
+        try:
+            puntaje = float(pagina.datos.get("p", 0.0))
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+        if not math.isfinite(puntaje):
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+        ultimo = (-puntaje, pagina.datos["id"])
+        claves = [(-puntaje, spa_id) for spa_id, puntaje in resultados]
+        resultados = resultados[bisect.bisect_right(claves, ultimo):]
+
+    if len(resultados) > pagina.limite:
+        resultados = resultados[:pagina.limite]
+        ultimo_id, ultimo_puntaje = resultados[-1]
+        pagina.response.headers[HEADER_CURSOR] = codificar_cursor(ultimo_id, p=ultimo_puntaje)
+
+    return resultados
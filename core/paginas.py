@@ -0,0 +1,129 @@
+# core/paginas.py
+"""
+Páginas HTML del frontend ya renderizadas y comprimidas.
+
+Las plantillas de las páginas no usan datos del request: todo lo dinámico
+lo trae el JavaScript desde la API. Por eso cada página se renderiza una
+sola vez, se guarda en memoria junto con sus versiones gzip y brotli (si el
+paquete brotli está instalado) y se sirve con ETag, Vary y Cache-Control.
+Una petición de página no toca Jinja ni comprime nada.
+
+Si cambia cualquier plantilla (mtime), las páginas se vuelven a armar. El
+directorio se revisa como mucho cada PAGINAS_REVISION_SEGUNDOS; con 0 no se
+revisa y las páginas quedan fijas hasta el próximo despliegue.
+
+responder() puede leer el directorio y volver a renderizar y comprimir: se
+llama desde rutas sync (threadpool), nunca directo en el event loop.
+
+Páginas que necesiten datos del usuario (perfil.html) no deben servirse por aquí.
+"""
+import gzip
+import hashlib
+import os
+import threading
+import time
+
+from fastapi import Request, Response
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from core.versiones import CACHE_PUBLICO, etag_coincide
+
+try:
+    import brotli
+except ImportError:  # opcional: sin brotli se ofrece solo gzip
+    brotli = None
+
+PAGINAS_DIR = os.getenv("PAGINAS_DIR", "templates")
+PAGINAS_REVISION_SEGUNDOS = float(os.getenv("PAGINAS_REVISION_SEGUNDOS", "2"))
+MEDIA_HTML = "text/html; charset=utf-8"
+
+
+class PaginaRenderizada:
+    def __init__(self, html: bytes):
+        huella = hashlib.sha1(html).hexdigest()[:20]
+        # Cada codificación es una representación distinta: ETag propio
+        self.variantes = {"identity": (html, f'"{huella}"')}
+        self.variantes["gzip"] = (gzip.compress(html, compresslevel=9, mtime=0), f'"{huella}-gz"')
+        if brotli is not None:
+            self.variantes["br"] = (brotli.compress(html, quality=11), f'"{huella}-br"')
+
+
+def codificacion_aceptada(accept_encoding: str | None, disponibles) -> str:
+    """Mejor codificación disponible que acepta el cliente (br > gzip > identity)."""
+    aceptadas = set()
+    for parte in (accept_encoding or "").lower().split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        if parametros.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        aceptadas.add(nombre.strip())
+    for codificacion in ("br", "gzip"):
+        if codificacion in disponibles and (codificacion in aceptadas or "*" in aceptadas):
+            return codificacion
+    return "identity"
+
+
+class PaginasEstaticas:
+    def __init__(self, directorio: str = PAGINAS_DIR, revision_segundos: float = PAGINAS_REVISION_SEGUNDOS):
+        self.directorio = directorio
+        self.revision_segundos = revision_segundos
+        self.entorno = Environment(
+            loader=FileSystemLoader(directorio),
+            autoescape=select_autoescape(["html"]),
+            auto_reload=False,
+        )
+        self._paginas: dict[str, PaginaRenderizada] = {}
+        self._firma = None
+        self._revisado = 0.0
+        self._lock = threading.Lock()
+
+    def _firma_actual(self):
+        """mtime y tamaño de todas las plantillas (un cambio en base.html afecta a todas)."""
+        firma = []
+        for nombre in sorted(os.listdir(self.directorio)):
+            if nombre.endswith(".html"):
+                info = os.stat(os.path.join(self.directorio, nombre))
+                firma.append((nombre, info.st_mtime_ns, info.st_size))
+        return tuple(firma)
+
+    def _revisar_cambios(self):
+        if self.revision_segundos <= 0 and self._firma is not None:
+            return
+        ahora = time.monotonic()
+        if self._firma is not None and ahora - self._revisado < self.revision_segundos:
+            return
+        firma = self._firma_actual()
+        with self._lock:
+            self._revisado = ahora
+            if firma != self._firma:
+                self._firma = firma
+                self._paginas = {}
+                self.entorno.cache.clear()
+
+    def obtener(self, plantilla: str) -> PaginaRenderizada:
+        self._revisar_cambios()
+        pagina = self._paginas.get(plantilla)
+        if pagina is None:
+            pagina = PaginaRenderizada(self.entorno.get_template(plantilla).render().encode("utf-8"))
+            with self._lock:
+                self._paginas[plantilla] = pagina
+        return pagina
+
+    def precalentar(self, plantillas):
+        """Renderiza y comprime las páginas al iniciar, no en la primera visita."""
+        for plantilla in plantillas:
+            self.obtener(plantilla)
+
+    def responder(self, request: Request, plantilla: str) -> Response:
+        pagina = self.obtener(plantilla)
+        codificacion = codificacion_aceptada(request.headers.get("accept-encoding"), pagina.variantes)
+        cuerpo, etag = pagina.variantes[codificacion]
+
+        encabezados = {"ETag": etag, "Cache-Control": CACHE_PUBLICO, "Vary": "Accept-Encoding"}
+        if etag_coincide(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=encabezados)
+        if codificacion != "identity":
+            encabezados["Content-Encoding"] = codificacion
+        return Response(content=cuerpo, media_type=MEDIA_HTML, headers=encabezados)
+
+
+paginas = PaginasEstaticas()
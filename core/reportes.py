@@ -0,0 +1,69 @@
+# core/reportes.py
+"""
+Rollup en memoria para /reportes.
+
+Las métricas por spa salen de los contadores que mantiene core.calificaciones
+(Spa.total_resenas / Spa.calificacion_promedio), así que refrescar cuesta
+O(número de spas) y no depende de cuántas reseñas haya. El rollup se marca
+como desactualizado en cada escritura de reseña y, además, expira por TTL
+para que otros workers vean los cambios.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from sqlmodel import Session, select
+
+from models.models import Spa
+
+REPORTES_TTL_SEGUNDOS = int(os.getenv("REPORTES_TTL_SEGUNDOS", "60"))
+
+
+class RollupReportes:
+    def __init__(self, ttl: int = REPORTES_TTL_SEGUNDOS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._filas: list[tuple[str, int, float]] = []
+        self._generado_en: datetime | None = None
+        self._generado_mono = 0.0
+        self._sucio = True
+
+    def marcar_desactualizado(self):
+        self._sucio = True
+
+    def _vigente(self) -> bool:
+        return (
+            not self._sucio
+            and self._generado_en is not None
+            and time.monotonic() - self._generado_mono < self.ttl
+        )
+
+    def obtener(self, session: Session) -> tuple[list[tuple[str, int, float]], datetime]:
+        """Devuelve (filas, generado_en), refrescando si hace falta."""
+        with self._lock:
+            if self._vigente():
+                return self._filas, self._generado_en
+            # Se limpia antes de leer: una escritura concurrente vuelve a marcarlo
+            self._sucio = False
+
+        # La consulta corre sin el lock: también se llama desde run_sync
+        # (AsyncSession), donde bloquear el hilo del event loop sería un deadlock
+        filas = [
+            (nombre, total, promedio)
+            for nombre, total, promedio in session.exec(
+                select(Spa.nombre, Spa.total_resenas, Spa.calificacion_promedio)
+                .where(Spa.total_resenas > 0)
+                .order_by(Spa.id)
+            ).all()
+        ]
+        generado_en = datetime.now(timezone.utc)
+
+        with self._lock:
+            self._filas = filas
+            self._generado_en = generado_en
+            self._generado_mono = time.monotonic()
+        return filas, generado_en
+
+
+rollup_reportes = RollupReportes()
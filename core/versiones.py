@@ -0,0 +1,82 @@
+# core/versiones.py
+"""
+GET condicional (ETag / 304) para las lecturas públicas de spas.
+
+Spa.version sube con cada escritura que cambia lo que se muestra del spa:
+datos del spa, sus servicios, materiales, reseñas e imágenes. El ETag se
+arma con esa versión, que se lee con una consulta mínima ANTES de cargar el
+detalle; si el cliente ya la tiene se responde 304 sin tocar el resto.
+"""
+import hashlib
+
+from fastapi import Request, Response
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from models.models import Spa
+
+# El cliente guarda la respuesta pero la revalida siempre con el ETag
+CACHE_PUBLICO = "public, no-cache"
+CACHE_PRIVADO = "private, no-cache"
+
+
+# ---------------- VERSIONES ----------------
+def incrementar_version(session: Session, spa_ids):
+    """
+    Sube Spa.version de los spas indicados con un UPDATE atómico.
+    No hace commit: se confirma junto con la escritura que lo causó.
+    """
+    spa_ids = sorted({i for i in spa_ids if i is not None})
+    if not spa_ids:
+        return
+    session.exec(
+        update(Spa)
+        .where(Spa.id.in_(spa_ids))
+        .values(version=Spa.version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def version_spa(session: Session, spa_id: int) -> int | None:
+    """Versión de un spa activo, o None si no existe o está inactivo."""
+    return session.exec(
+        select(Spa.version).where(Spa.id == spa_id, Spa.activo == True)
+    ).first()
+
+
+# ---------------- ETAGS ----------------
+def etag_spa(spa_id: int, version: int, recurso: str) -> str:
+    return f'"{recurso}-{spa_id}-v{version}"'
+
+
+def etag_de(*partes) -> str:
+    """ETag a partir de varias piezas (ids, versiones, cursor...)."""
+    crudo = "|".join(str(p) for p in partes).encode("utf-8")
+    return f'"{hashlib.sha1(crudo).hexdigest()}"'
+
+
+def etag_coincide(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in [e.strip().removeprefix("W/") for e in if_none_match.split(",")]
+
+
+def condicional(
+    request: Request,
+    response: Response,
+    etag: str,
+    cache_control: str = CACHE_PUBLICO,
+) -> Response | None:
+    """
+    Deja ETag y Cache-Control en la respuesta. Si el cliente envió ese mismo
+    ETag en If-None-Match devuelve la respuesta 304 que hay que retornar;
+    si no, None (y el endpoint sigue normalmente).
+    """
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
+    if etag_coincide(request.headers.get("if-none-match"), etag):
+        encabezados = {k: v for k, v in response.headers.items() if k != "content-length"}
+        return Response(status_code=304, headers=encabezados)
+    return None
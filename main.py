@@ -1,8 +1,11 @@
-from core.db import create_db_and_tables
+from core.db import create_db_and_tables, dispose_engines, DB_ASYNC
+from core.contrasenas import cerrar_ejecutor
+from core.imagenes import LimiteSubidas, cerrar_pool_imagenes
+from core.instrumentacion import MiddlewareMetricas, instrumentar_motores
+from core.paginas import paginas
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from fastapi.middleware.cors import CORSMiddleware
 
 from routers.auth_router import router as auth_router
@@ -12,9 +15,18 @@ from routers.material_router import router as material_router
 from routers.usuario_router import router as usuario_router
 from routers.reporte_router import router as reporte_router
 from routers.resena_router import router as resena_router
+from routers.monitoreo_router import router as monitoreo_router
+from routers.imagen_router import router as imagen_router
+from routers.importacion_router import router as importacion_router
+from routers.exportacion_router import router as exportacion_router
+from routers.metricas_router import router as metricas_router
 
 app = FastAPI()
 
+# SUBIDAS: corta las imágenes que superan IMAGEN_MAX_BYTES mientras se reciben
+# (se registra antes que CORS para que sus 413 también lleven los headers CORS)
+app.add_middleware(LimiteSubidas)
+
 # CORS CORRECTO
 app.add_middleware(
     CORSMiddleware,
@@ -25,19 +37,40 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Reporte-Generado"],
 )
 
+# MÉTRICAS: latencia, consultas SQL y bcrypt por request (se expone en /metrics)
+app.add_middleware(MiddlewareMetricas)
+instrumentar_motores()
+
 # STATIC
 app.mount("/static", StaticFiles(directory="static"), name="static")
 
-# TEMPLATES
-templates = Jinja2Templates(directory="templates")
+# PÁGINAS: ya renderizadas y comprimidas en memoria (core/paginas.py).
+# Las rutas son sync: la revisión de cambios (stat de las plantillas) y el
+# re-render/compresión cuando cambian corren en el threadpool, no en el loop.
+PAGINAS = [
+    "index.html", "login.html", "spas.html", "spa_detalle.html", "servicios.html",
+    "materiales.html", "usuarios.html", "reportes.html", "resenas.html",
+]
 
-@app.get("/spa_detalle")
+@app.get("/spa_detalle", response_class=HTMLResponse)
 def spa_detalle(request: Request):
-    return templates.TemplateResponse("spa_detalle.html", {"request": request})
+    return paginas.responder(request, "spa_detalle.html")
 
 # ROUTERS
+# Con DB_ASYNC=true, las lecturas de spas, reseñas y reportes las atienden
+# las versiones async; se registran primero para que tengan prioridad.
+if DB_ASYNC:
+    from routers.spa_router_async import router as spa_router_async
+    from routers.resena_router_async import router as resena_router_async
+    from routers.reporte_router_async import router as reporte_router_async
+
+    app.include_router(spa_router_async)
+    app.include_router(resena_router_async)
+    app.include_router(reporte_router_async)
+
 app.include_router(auth_router)
 app.include_router(spa_router)
 app.include_router(servicio_router)
@@ -45,45 +78,58 @@ app.include_router(material_router)
 app.include_router(usuario_router)
 app.include_router(reporte_router)
 app.include_router(resena_router)
+app.include_router(monitoreo_router)
+app.include_router(imagen_router)
+app.include_router(importacion_router)
+app.include_router(exportacion_router)
+app.include_router(metricas_router)
 
 # startup
 @app.on_event("startup")
 def on_startup():
     create_db_and_tables()
+    paginas.precalentar(PAGINAS)
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    cerrar_ejecutor()
+    cerrar_pool_imagenes()
+    await dispose_engines()
 
 # PÁGINAS FRONTEND
 @app.get("/", response_class=HTMLResponse)
 def home(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+    return paginas.responder(request, "index.html")
 
 @app.get("/login", response_class=HTMLResponse)
 def login_page(request: Request):
-    return templates.TemplateResponse("login.html", {"request": request})
+    return paginas.responder(request, "login.html")
 
 @app.get("/spas", response_class=HTMLResponse)
 def spa_page(request: Request):
-    return templates.TemplateResponse("spas.html", {"request": request})
+    return paginas.responder(request, "spas.html")
 
-@app.get("/spa/{spa_id}", response_class=HTMLResponse)
-def spa_detail(request: Request, spa_id: int):
-    return templates.TemplateResponse("spa_detail.html", {"request": request, "spa_id": spa_id})
+@app.get("/spa/{spa_id}")
+async def spa_detail(spa_id: int):
+    # El detalle lee el id de la query (static/js/spa_detalle.js)
+    return RedirectResponse(f"/spa_detalle?id={spa_id}")
 
 @app.get("/servicios", response_class=HTMLResponse)
 def servicios_page(request: Request):
-    return templates.TemplateResponse("servicios.html", {"request": request})
+    return paginas.responder(request, "servicios.html")
 
 @app.get("/materiales", response_class=HTMLResponse)
 def materiales_page(request: Request):
-    return templates.TemplateResponse("materiales.html", {"request": request})
+    return paginas.responder(request, "materiales.html")
 
 @app.get("/usuarios", response_class=HTMLResponse)
 def usuarios_page(request: Request):
-    return templates.TemplateResponse("usuarios.html", {"request": request})
+    return paginas.responder(request, "usuarios.html")
 
 @app.get("/reportes", response_class=HTMLResponse)
 def reportes_page(request: Request):
-    return templates.TemplateResponse("reportes.html", {"request": request})
+    return paginas.responder(request, "reportes.html")
 
 @app.get("/resenas", response_class=HTMLResponse)
 def resenas_page(request: Request):
-    return templates.TemplateResponse("resenas.html", {"request": request})
+    return paginas.responder(request, "resenas.html")
@@ -1,9 +1,17 @@
 # Proyecto_Belleza/models/models.py (versión recomendada)
 from typing import Optional, List
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Index
 from datetime import date
 
 class SpaServicio(SQLModel, table=True):
+    __table_args__ = (
+        # Filtro por facetas: "spas con el servicio X y precio <= Y"
+        Index("ix_spaservicio_servicio_precio", "servicio_id", "precio"),
+        # Un servicio una sola vez por spa; también sirve para "servicios del spa"
+        Index("ix_spaservicio_spa_servicio", "spa_id", "servicio_id", unique=True),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     spa_id: Optional[int] = Field(default=None, foreign_key="spa.id")
     servicio_id: Optional[int] = Field(default=None, foreign_key="servicio.id")
@@ -16,6 +24,10 @@ class SpaServicio(SQLModel, table=True):
 
 
 class SpaMaterial(SQLModel, table=True):
+    __table_args__ = (
+        Index("ix_spamaterial_material_id", "material_id"),
+    )
+
     spa_id: Optional[int] = Field(default=None, foreign_key="spa.id", primary_key=True)
     material_id: Optional[int] = Field(default=None, foreign_key="material.id", primary_key=True)
     activo: bool = True
@@ -27,7 +39,7 @@ class SpaMaterial(SQLModel, table=True):
 class Usuario(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     nombre: str
-    correo: str
+    correo: str = Field(unique=True, index=True)
     contrasena: str
     rol: str = Field(default="usuario") # 👈 Valor por defecto
     activo: bool = True
@@ -38,12 +50,17 @@ class Usuario(SQLModel, table=True):
 
 class Spa(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    nombre: str
+    nombre: str = Field(unique=True, index=True)
     direccion: str
     zona: str
     horario: Optional[str] = None
-    calificacion_promedio: float = 0.0
-    activo: bool = True
+    latitud: Optional[float] = None
+    longitud: Optional[float] = None
+    calificacion_promedio: float = Field(default=0.0, index=True)
+    total_resenas: int = 0          # reseñas activas (mantenido por core.calificaciones)
+    version: int = 0                # sube con cada cambio visible (ETag, core.versiones)
+    suma_calificaciones: int = 0    # suma de calificaciones activas
+    activo: bool = Field(default=True, index=True)
     ultima_actualizacion: Optional[date] = None
     desactualizado: bool = False
     imagenes: List["SpaImage"] = Relationship(back_populates="spa") # <-- ¡NECESARIO!
@@ -75,6 +92,11 @@ class Material(SQLModel, table=True):
 
 
 class Resena(SQLModel, table=True):
+    __table_args__ = (
+        # Reseñas activas de un spa (detalle, recálculo de calificaciones)
+        Index("ix_resena_spa_id_activo", "spa_id", "activo"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     calificacion: int
     comentario: str
@@ -82,7 +104,7 @@ class Resena(SQLModel, table=True):
     activo: bool = True
 
     spa_id: Optional[int] = Field(default=None, foreign_key="spa.id")
-    usuario_id: Optional[int] = Field(default=None, foreign_key="usuario.id")
+    usuario_id: Optional[int] = Field(default=None, foreign_key="usuario.id", index=True)
 
     spa: Optional[Spa] = Relationship(back_populates="resenas")
     usuario: Optional[Usuario] = Relationship(back_populates="resenas")
@@ -92,6 +114,8 @@ class SpaUpdate(SQLModel):
     direccion: str | None = None
     zona: str | None = None
     horario: str | None = None
+    latitud: float | None = None
+    longitud: float | None = None
 
 
 from sqlalchemy.ext.declarative import declarative_base
@@ -101,10 +125,16 @@ from sqlalchemy.orm import relationship
 Base = declarative_base()
 
 class SpaImage(SQLModel, table=True):
+    __table_args__ = (
+        # La misma imagen (mismo hash) una sola vez por spa; también sirve para "imágenes del spa"
+        Index("ix_spaimage_spa_hash", "spa_id", "hash_contenido", unique=True),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     spa_id: Optional[int] = Field(default=None, foreign_key="spa.id") # Clave foránea al Spa
     url: str # Ya que no usas Optional, debe ser una columna NOT NULL
     es_principal: bool = Field(default=False)
+    hash_contenido: Optional[str] = Field(default=None, index=True)  # SHA-256 del archivo
     
     # La relación inversa
     spa: Optional["Spa"] = Relationship(back_populates="imagenes")
\ No newline at end of file
@@ -14,6 +14,7 @@ class ImageCreate(ImageBase):
 class ImageOut(ImageBase):
     id: int
     spa_id: int 
+    hash_contenido: Optional[str] = None
     
     class Config:
         from_attributes = True # O orm_mode = True
@@ -45,6 +46,8 @@ class SpaCreate(BaseModel):
     direccion: str
     zona: str
     horario: str
+    latitud: Optional[float] = Field(None, ge=-90, le=90)
+    longitud: Optional[float] = Field(None, ge=-180, le=180)
 
 class SpaRead(BaseModel):
     id: int
@@ -52,7 +55,10 @@ class SpaRead(BaseModel):
     direccion: str
     zona: str
     horario: Optional[str] = None
+    latitud: Optional[float] = None
+    longitud: Optional[float] = None
     calificacion_promedio: float
+    total_resenas: int = 0
     activo: bool                   # ✔ NECESARIO
     ultima_actualizacion: Optional[date] = None
 
@@ -124,6 +130,8 @@ class SpaUpdate(BaseModel):
     direccion: Optional[str] = None
     zona: Optional[str] = None
     horario: Optional[str] = None   
+    latitud: Optional[float] = Field(None, ge=-90, le=90)
+    longitud: Optional[float] = Field(None, ge=-180, le=180)
 
     class Config:
         orm_mode = True
@@ -168,7 +176,10 @@ class SpaDetalleRead(BaseModel):
     direccion: str
     zona: str
     horario: Optional[str]
+    latitud: Optional[float] = None
+    longitud: Optional[float] = None
     calificacion_promedio: float
+    total_resenas: int = 0
     ultima_actualizacion: Optional[date]
 
     imagenes: List[ImageOut] = Field(default=[], description="Lista de imágenes asociadas al spa.") # pyright: ignore[reportUndefinedVariable]
@@ -184,3 +195,94 @@ class AsociarServicio(BaseModel):
     precio: float
     duracion: str
 
+
+# ---------- ASOCIACIONES POR LOTE ----------
+class AsociarServicioItem(BaseModel):
+    servicio_id: int
+    precio: float = Field(..., gt=0)
+    duracion: str
+
+
+class AsociarServiciosLote(BaseModel):
+    servicios: list[AsociarServicioItem] = Field(..., min_length=1, max_length=500)
+
+
+class DesasociarServiciosLote(BaseModel):
+    servicio_ids: list[int] = Field(..., min_length=1, max_length=500)
+
+
+class MaterialesLote(BaseModel):
+    material_ids: list[int] = Field(..., min_length=1, max_length=500)
+
+
+class ResultadoAsociacion(BaseModel):
+    insertados: int = 0
+    actualizados: int = 0
+    sin_cambios: int = 0
+    desactivados: int = 0
+
+
+
+# ---------- FILTRO POR FACETAS ----------
+class FacetaItem(BaseModel):
+    id: int
+    nombre: str
+    cantidad: int          # spas del resultado que tienen este servicio/material
+
+
+class FacetaCalificacion(BaseModel):
+    minimo: int            # calificación promedio >= minimo
+    cantidad: int
+
+
+class Facetas(BaseModel):
+    servicios: list[FacetaItem]
+    materiales: list[FacetaItem]
+    calificacion: list[FacetaCalificacion]
+
+
+class SpaFiltroRead(BaseModel):
+    total: int
+    spas: list[SpaRead]
+    facetas: Facetas
+
+
+# ---------- SPAS CERCANOS ----------
+class SpaCercanoRead(SpaRead):
+    distancia_km: float
+
+
+# ---------- IMPORTACIÓN MASIVA ----------
+# Filas de los registros que no tienen un *Create equivalente (referencias por nombre/correo)
+class ImportSpaServicio(BaseModel):
+    spa: str
+    servicio: str
+    precio: float = Field(..., gt=0)
+    duracion: str
+
+
+class ImportSpaMaterial(BaseModel):
+    spa: str
+    material: str
+
+
+class ImportResena(BaseModel):
+    spa: str
+    usuario: EmailStr                    # correo de un usuario existente
+    calificacion: int = Field(..., ge=1, le=5)
+    comentario: str
+
+
+class ErrorFila(BaseModel):
+    fila: int
+    mensaje: str
+
+
+class ResumenImportacion(BaseModel):
+    filas: int
+    insertados: dict[str, int]
+    actualizados: dict[str, int]
+    sin_cambios: dict[str, int]
+    errores: int
+    detalle_errores: list[ErrorFila]    # los primeros IMPORT_MAX_ERRORES
+    segundos: float
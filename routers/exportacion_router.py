@@ -0,0 +1,31 @@
+# routers/exportacion_router.py
+from datetime import date
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
+from core.auth import get_current_user
+from core.exportacion import exportar_csv, exportar_ndjson
+
+router = APIRouter(
+    prefix="/exportar",
+    tags=["Exportación"],
+    dependencies=[Depends(get_current_user)]
+)
+
+
+# -------------------- EXPORTAR CATÁLOGO --------------------
+@router.get("/spas")
+def exportar_spas(
+    formato: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+):
+    """
+    Todos los spas activos con servicios (precio y duración), materiales y
+    calificación promedio, en NDJSON (un spa por línea) o CSV.
+    Se envía por partes: sirve para catálogos grandes sin recorrer /spas/
+    y el detalle de cada spa.
+    """
+    nombre = f"spas_{date.today().isoformat()}.{'csv' if formato == 'csv' else 'ndjson'}"
+    encabezados = {"Content-Disposition": f'attachment; filename="{nombre}"'}
+    if formato == "csv":
+        return StreamingResponse(exportar_csv(), media_type="text/csv; charset=utf-8", headers=encabezados)
+    return StreamingResponse(exportar_ndjson(), media_type="application/x-ndjson", headers=encabezados)
@@ -0,0 +1,163 @@
+# routers/imagen_router.py
+import os
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from core.versiones import etag_coincide
+from core.imagenes import (
+    TAMANO_BLOQUE,
+    ancho_permitido,
+    carpeta_spa,
+    es_direccionado_por_contenido,
+    obtener_variante,
+)
+
+router = APIRouter(
+    prefix="/imagenes",
+    tags=["Imágenes"]
+)
+
+TIPOS = {
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "gif": "image/gif",
+    "webp": "image/webp",
+}
+
+# Un nombre con hash nunca cambia de contenido: se puede cachear para siempre
+CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+CACHE_NORMAL = "public, max-age=3600"
+
+
+def _rango(encabezado: str, tamano: int) -> tuple[int, int] | None:
+    """
+    Interpreta 'Range: bytes=inicio-fin' (un solo rango). Devuelve (inicio, fin)
+    inclusivo, None si el header no se puede usar (se responde el archivo entero)
+    o lanza 416 si el rango está fuera del archivo.
+    """
+    unidad, _, rangos = encabezado.partition("=")
+    if unidad.strip() != "bytes" or "," in rangos:
+        return None
+    inicio_txt, guion, fin_txt = rangos.strip().partition("-")
+    if not guion:
+        return None
+    try:
+        if inicio_txt == "":  # sufijo: los últimos N bytes
+            largo = int(fin_txt)
+            if largo <= 0:
+                raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{tamano}"})
+            return max(tamano - largo, 0), tamano - 1
+        inicio = int(inicio_txt)
+        fin = int(fin_txt) if fin_txt else tamano - 1
+    except ValueError:
+        return None
+    if inicio >= tamano:
+        raise HTTPException(status_code=416, headers={"Content-Range": f"bytes */{tamano}"})
+    if inicio > fin:
+        return None
+    return inicio, min(fin, tamano - 1)
+
+
+def _leer(archivo, inicio: int, largo: int):
+    with archivo:
+        archivo.seek(inicio)
+        while largo > 0:
+            bloque = archivo.read(min(TAMANO_BLOQUE, largo))
+            if not bloque:
+                break
+            largo -= len(bloque)
+            yield bloque
+
+
+def responder_archivo(request: Request, ruta: str, tipo: str, etag: str, cache_control: str):
+    """
+    Respuesta con ETag, 304 si el cliente ya la tiene y soporte de Range.
+    El archivo se abre acá: si la caché lo borra mientras se envía, el
+    descriptor abierto sigue siendo válido.
+    """
+    encabezados = {"ETag": etag, "Cache-Control": cache_control, "Accept-Ranges": "bytes"}
+    if etag_coincide(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=encabezados)
+
+    archivo = open(ruta, "rb")
+    tamano = os.fstat(archivo.fileno()).st_size
+    rango = None
+    if "range" in request.headers:
+        # If-Range: solo se respeta el rango si el cliente tiene esta misma versión
+        if_range = request.headers.get("if-range")
+        if if_range is None or if_range.strip() == etag:
+            try:
+                rango = _rango(request.headers["range"], tamano)
+            except HTTPException:
+                archivo.close()
+                raise
+
+    if rango is None:
+        encabezados["Content-Length"] = str(tamano)
+        return StreamingResponse(_leer(archivo, 0, tamano), media_type=tipo, headers=encabezados)
+
+    inicio, fin = rango
+    encabezados["Content-Range"] = f"bytes {inicio}-{fin}/{tamano}"
+    encabezados["Content-Length"] = str(fin - inicio + 1)
+    return StreamingResponse(
+        _leer(archivo, inicio, fin - inicio + 1), status_code=206, media_type=tipo, headers=encabezados
+    )
+
+
+# -------------------- SERVIR IMAGEN DE SPA --------------------
+@router.get("/spas/{spa_id}/{nombre}")
+def servir_imagen_spa(
+    request: Request,
+    spa_id: int,
+    nombre: str,
+    ancho: int | None = Query(None, ge=1, description="Ancho máximo en px; se devuelve una variante WebP"),
+):
+    """
+    Sirve la imagen original o una variante más liviana del ancho pedido
+    (redondeado a los anchos permitidos). La variante se genera en el primer
+    pedido y queda en la caché de disco.
+    """
+    extension = os.path.splitext(nombre)[1].lstrip(".").lower()
+    if nombre.startswith(".") or os.path.basename(nombre) != nombre or extension not in TIPOS:
+        raise HTTPException(status_code=404, detail="Imagen no encontrada")
+
+    original = os.path.join(carpeta_spa(spa_id), nombre)
+    ancho = ancho_permitido(ancho)
+    sufijo = f"-{ancho}" if ancho else ""
+
+    if es_direccionado_por_contenido(nombre):
+        # El ETag sale del nombre: un 304 no toca el disco
+        version = os.path.splitext(nombre)[0]
+        etag = f'"{version}{sufijo}"'
+        cache_control = CACHE_INMUTABLE
+        if etag_coincide(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+        if not os.path.isfile(original):
+            raise HTTPException(status_code=404, detail="Imagen no encontrada")
+    else:
+        # Imágenes subidas antes del hash: el ETag depende del archivo en disco
+        try:
+            info = os.stat(original)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Imagen no encontrada")
+        version = f"{info.st_mtime_ns:x}-{info.st_size:x}"
+        etag = f'"{version}{sufijo}"'
+        cache_control = CACHE_NORMAL
+
+    if ancho is None:
+        return responder_archivo(request, original, TIPOS[extension], etag, cache_control)
+
+    for intento in range(2):
+        try:
+            ruta = obtener_variante(spa_id, nombre, ancho)
+        except ImportError:
+            # Sin Pillow no hay variantes: se sirve el original
+            return responder_archivo(request, original, TIPOS[extension], f'"{version}"', cache_control)
+        except OSError:
+            raise HTTPException(status_code=422, detail="No se pudo procesar la imagen")
+        try:
+            return responder_archivo(request, ruta, "image/webp", etag, cache_control)
+        except FileNotFoundError:
+            continue  # la caché la descartó justo ahora: se genera de nuevo
+    raise HTTPException(status_code=503, detail="No se pudo servir la imagen, intenta de nuevo")
@@ -0,0 +1,52 @@
+# routers/importacion_router.py
+import io
+
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from sqlmodel import Session
+from core.auth import admin_principal_required
+from core.busqueda import indice_spas
+from core.db import get_session
+from core.geo import indice_geo
+from core.importacion import formato_de, importar, leer_filas
+from core.reportes import rollup_reportes
+from models.schemas import ResumenImportacion
+
+router = APIRouter(
+    prefix="/importar",
+    tags=["Importación"],
+    dependencies=[Depends(admin_principal_required)]
+)
+
+
+# -------------------- IMPORTACIÓN MASIVA --------------------
+@router.post("/", response_model=ResumenImportacion)
+def importar_archivo(
+    archivo: UploadFile = File(..., description="CSV o JSONL con la columna 'registro'"),
+    formato: str | None = Query(None, pattern="^(csv|jsonl)$", description="Por defecto, según la extensión"),
+    session: Session = Depends(get_session),
+):
+    """
+    Carga spas, servicios, materiales, asociaciones y reseñas por lotes.
+    Se puede repetir con el mismo archivo: solo se escribe lo que cambió.
+    Las filas con errores no detienen la importación; se devuelven en
+    'detalle_errores' con su número de fila.
+    """
+    if formato is None:
+        try:
+            formato = formato_de(archivo.filename)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+
+    texto = io.TextIOWrapper(archivo.file, encoding="utf-8-sig", newline="")
+    try:
+        resumen = importar(session, leer_filas(texto, formato))
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="El archivo debe estar en UTF-8")
+    finally:
+        texto.detach()
+
+    if resumen["insertados"] or resumen["actualizados"]:
+        indice_spas.reconstruir(session)
+        indice_geo.reconstruir(session)
+        rollup_reportes.marcar_desactualizado()
+    return resumen
@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from sqlmodel import Session, select
+from sqlalchemy.exc import IntegrityError
 from core.db import get_session
 from models.models import Material, Spa, SpaMaterial, Usuario
-from models.schemas import MaterialCreate, MaterialRead, MaterialUpdate
-from core.auth import get_current_user
+from models.schemas import MaterialCreate, MaterialRead, MaterialUpdate, MaterialesLote, ResultadoAsociacion
+from core.auth import get_current_user, spa_editable
+from core.paginacion import Pagina, paginar
+from core.busqueda import indice_spas, spas_con_material
+from core.versiones import condicional, etag_spa, incrementar_version, version_spa
+from core.cache_respuestas import cache_respuestas, respuesta_json, serializar
+from core.asociaciones import desactivar_spa_materiales, upsert_spa_materiales
 
 router = APIRouter(prefix="/materiales", tags=["Materiales"])
 
@@ -33,10 +39,11 @@ def crear_material(
 # -------------------- LISTAR --------------------
 @router.get("/", response_model=list[MaterialRead])
 def listar_materiales(
+    pagina: Pagina = Depends(),
     session: Session = Depends(get_session),
     current_user: Usuario = Depends(get_current_user)
 ):
-    return session.exec(select(Material)).all()
+    return paginar(session, select(Material), Material.id, pagina)
 
 
 # -------------------- ASOCIAR A SPA --------------------
@@ -66,15 +73,78 @@ def asociar_material_a_spa(
         )
     ).first()
 
-    if existe:
+    if existe and existe.activo:
         raise HTTPException(status_code=400, detail="El material ya está asociado al spa")
 
-    nueva = SpaMaterial(spa_id=spa_id, material_id=material_id)
+    if existe:
+        # Estaba desasociado (baja lógica): se reactiva, solo puede haber una fila por par
+        existe.activo = True
+        nueva = existe
+    else:
+        nueva = SpaMaterial(spa_id=spa_id, material_id=material_id)
     session.add(nueva)
-    session.commit()
+    incrementar_version(session, [spa_id])
+    try:
+        session.commit()
+    except IntegrityError:
+        # Otra petición lo asoció entre la verificación y el commit
+        session.rollback()
+        raise HTTPException(status_code=400, detail="El material ya está asociado al spa")
+    indice_spas.actualizar_spas(session, [spa_id])
     return {"message": "Material asociado correctamente"}
 
 
+# -------------------- ASOCIAR VARIOS A SPA (LOTE) --------------------
+@router.post("/asociar/{spa_id}", response_model=ResultadoAsociacion)
+def asociar_materiales_lote(
+    spa_id: int,
+    datos: MaterialesLote,
+    session: Session = Depends(get_session),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """Asocia muchos materiales en una sola transacción (los desactivados se reactivan)."""
+    spa_editable(session, spa_id, current_user)
+
+    ids = set(datos.material_ids)
+    encontrados = set(session.exec(select(Material.id).where(Material.id.in_(ids))).all())
+    if ids - encontrados:
+        raise HTTPException(status_code=404, detail=f"Materiales no encontrados: {sorted(ids - encontrados)}")
+
+    resultado = upsert_spa_materiales(session, {(spa_id, material_id) for material_id in ids})
+    if resultado.spas:
+        incrementar_version(session, [spa_id])
+    session.commit()
+    if resultado.spas:
+        indice_spas.actualizar_spas(session, [spa_id])
+
+    return ResultadoAsociacion(
+        insertados=resultado.insertados,
+        actualizados=resultado.actualizados,
+        sin_cambios=resultado.sin_cambios,
+    )
+
+
+# -------------------- QUITAR VARIOS DE SPA (LOTE) --------------------
+@router.post("/desasociar/{spa_id}", response_model=ResultadoAsociacion)
+def desasociar_materiales_lote(
+    spa_id: int,
+    datos: MaterialesLote,
+    session: Session = Depends(get_session),
+    current_user: Usuario = Depends(get_current_user)
+):
+    """Desactiva (baja lógica) los materiales indicados del spa."""
+    spa_editable(session, spa_id, current_user)
+
+    desactivados = desactivar_spa_materiales(session, spa_id, datos.material_ids)
+    if desactivados:
+        incrementar_version(session, [spa_id])
+    session.commit()
+    if desactivados:
+        indice_spas.actualizar_spas(session, [spa_id])
+
+    return ResultadoAsociacion(desactivados=desactivados)
+
+
 # -------------------- ACTUALIZAR --------------------
 @router.patch("/{material_id}", response_model=MaterialRead)
 def actualizar_material(
@@ -93,9 +163,12 @@ def actualizar_material(
     material.nombre = data.nombre or material.nombre
     material.tipo = data.tipo or material.tipo
 
+    spas_afectados = spas_con_material(session, material_id)
     session.add(material)
+    incrementar_version(session, spas_afectados)
     session.commit()
     session.refresh(material)
+    indice_spas.actualizar_spas(session, spas_afectados)
     return material
 
 
@@ -120,38 +193,49 @@ def eliminar_material(
 
     asociaciones = session.exec(
         select(SpaMaterial).where(SpaMaterial.material_id == material_id)
-    )
+    ).all()
+    spas_afectados = [rel.spa_id for rel in asociaciones]
     for rel in asociaciones:
         session.delete(rel)
 
     # Borrar material
     session.delete(material)
+    incrementar_version(session, spas_afectados)
     session.commit()
+    indice_spas.actualizar_spas(session, spas_afectados)
 
     return {"message": "Material eliminado definitivamente."}
 
+
+def materiales_de_spa(session: Session, spa_id: int) -> list[dict]:
+    # Un JOIN en vez de un session.get por relación
+    filas = session.exec(
+        select(Material.id, Material.nombre, Material.tipo)
+        .join(SpaMaterial, SpaMaterial.material_id == Material.id)
+        .where(SpaMaterial.spa_id == spa_id, SpaMaterial.activo == True)
+        .order_by(Material.id)
+    ).all()
+
+    return [{"id": id_, "nombre": nombre, "tipo": tipo} for id_, nombre, tipo in filas]
+
+
 # LISTAR MATERIALES POR SPA
 @router.get("/por_spa/{spa_id}")
 def materiales_por_spa(
     spa_id: int,
+    request: Request,
+    response: Response,
     session: Session = Depends(get_session)
 ):
-    spa = session.get(Spa, spa_id)
-    if not spa or not spa.activo:
+    version = version_spa(session, spa_id)
+    if version is None:
         raise HTTPException(status_code=404, detail="Spa no encontrado")
-
-    relaciones = session.exec(
-        select(SpaMaterial).where(SpaMaterial.spa_id == spa_id)
-    ).all()
-
-    materiales = []
-    for rel in relaciones:
-        mat = session.get(Material, rel.material_id)
-        if mat:
-            materiales.append({
-                "id": mat.id,
-                "nombre": mat.nombre,
-                "tipo": mat.tipo
-            })
-
-    return materiales
+    no_modificado = condicional(request, response, etag_spa(spa_id, version, "materiales"))
+    if no_modificado:
+        return no_modificado
+
+    contenido = cache_respuestas.obtener("materiales", spa_id, version)
+    if contenido is None:
+        contenido = serializar(materiales_de_spa(session, spa_id))
+        cache_respuestas.guardar("materiales", spa_id, version, contenido)
+    return respuesta_json(contenido, response)
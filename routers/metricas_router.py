@@ -0,0 +1,21 @@
+# routers/metricas_router.py
+import os
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+
+from core.instrumentacion import texto_prometheus
+
+# Si está definido, Prometheus debe enviar "Authorization: Bearer <token>"
+METRICAS_TOKEN = os.getenv("METRICAS_TOKEN")
+
+router = APIRouter(tags=["Monitoreo"])
+
+
+# -------------------- MÉTRICAS (PROMETHEUS) --------------------
+@router.get("/metrics", include_in_schema=False)
+def metricas(request: Request):
+    """Latencias por ruta, consultas y tiempo en DB, bcrypt, pool y cachés."""
+    if METRICAS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICAS_TOKEN}":
+        raise HTTPException(status_code=401, detail="No autorizado")
+    return PlainTextResponse(texto_prometheus(), media_type="text/plain; version=0.0.4; charset=utf-8")
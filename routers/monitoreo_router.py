@@ -0,0 +1,37 @@
+# routers/monitoreo_router.py
+from fastapi import APIRouter, Depends
+from core.auth import admin_principal_required
+from core.db import estadisticas_pool
+from core.imagenes import cache_variantes
+from core.cache_respuestas import cache_respuestas
+
+router = APIRouter(
+    prefix="/monitoreo",
+    tags=["Monitoreo"],
+    dependencies=[Depends(admin_principal_required)]
+)
+
+
+# -------------------- POOL DE CONEXIONES --------------------
+@router.get("/pool")
+def estado_pool():
+    """
+    Conexiones en uso, overflow y el histograma de espera por conexión.
+    Si 'en_uso' se queda en tamano + max_overflow y la espera crece,
+    el pool es chico para la cantidad de workers/hilos.
+    """
+    return estadisticas_pool()
+
+
+# -------------------- CACHÉ DE IMÁGENES --------------------
+@router.get("/imagenes")
+def estado_cache_imagenes():
+    """Variantes en disco, bytes usados frente al tope, aciertos y descartes."""
+    return cache_variantes.estadisticas()
+
+
+# -------------------- CACHÉ DE RESPUESTAS --------------------
+@router.get("/cache")
+def estado_cache_respuestas():
+    """Aciertos, fallos y descartes de la caché de detalle/servicios/materiales por spa."""
+    return cache_respuestas.estadisticas()
@@ -1,31 +1,34 @@
 # routers/reporte_router.py
-from fastapi import APIRouter, Depends
-from sqlmodel import Session, select, func
+from fastapi import APIRouter, Depends, Response
+from sqlmodel import Session
 from core.db import get_session
-from models.models import Spa, Resena
+from core.auth import get_current_user
+from core.reportes import rollup_reportes
 
 router = APIRouter(
     prefix="/reportes",
-    tags=["Reportes"]
+    tags=["Reportes"],
+    dependencies=[Depends(get_current_user)]
 )
 
+
+def _encabezados(response: Response, generado_en):
+    """Indica al cliente qué tan fresco es el rollup."""
+    response.headers["X-Reporte-Generado"] = generado_en.isoformat()
+    response.headers["Cache-Control"] = f"private, max-age={rollup_reportes.ttl}"
+
+
 @router.get("/resenas_por_spa")
-def resenas_por_spa(session: Session = Depends(get_session)):
-    resultados = session.exec(
-        select(Spa.nombre, func.count(Resena.id))
-        .join(Resena, Resena.spa_id == Spa.id)
-        .group_by(Spa.id)
-    ).all()
+def resenas_por_spa(response: Response, session: Session = Depends(get_session)):
+    filas, generado_en = rollup_reportes.obtener(session)
+    _encabezados(response, generado_en)
 
-    return [{"spa": nombre, "cantidad": total} for nombre, total in resultados]
+    return [{"spa": nombre, "cantidad": total} for nombre, total, _ in filas]
 
 
 @router.get("/promedio_por_spa")
-def promedio_por_spa(session: Session = Depends(get_session)):
-    resultados = session.exec(
-        select(Spa.nombre, func.avg(Resena.calificacion))
-        .join(Resena, Resena.spa_id == Spa.id)
-        .group_by(Spa.id)
-    ).all()
-
-    return [{"spa": nombre, "promedio": round(promedio, 2)} for nombre, promedio in resultados]
+def promedio_por_spa(response: Response, session: Session = Depends(get_session)):
+    filas, generado_en = rollup_reportes.obtener(session)
+    _encabezados(response, generado_en)
+
+    return [{"spa": nombre, "promedio": round(promedio, 2)} for nombre, _, promedio in filas]
@@ -0,0 +1,30 @@
+# routers/reporte_router_async.py
+"""Versión async de reporte_router (se monta con DB_ASYNC=true)."""
+from fastapi import APIRouter, Depends, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
+from core.db import get_async_session
+from core.auth import get_current_user_async
+from core.reportes import rollup_reportes
+from routers.reporte_router import _encabezados
+
+router = APIRouter(
+    prefix="/reportes",
+    tags=["Reportes"],
+    dependencies=[Depends(get_current_user_async)]
+)
+
+
+@router.get("/resenas_por_spa")
+async def resenas_por_spa(response: Response, session: AsyncSession = Depends(get_async_session)):
+    filas, generado_en = await session.run_sync(rollup_reportes.obtener)
+    _encabezados(response, generado_en)
+
+    return [{"spa": nombre, "cantidad": total} for nombre, total, _ in filas]
+
+
+@router.get("/promedio_por_spa")
+async def promedio_por_spa(response: Response, session: AsyncSession = Depends(get_async_session)):
+    filas, generado_en = await session.run_sync(rollup_reportes.obtener)
+    _encabezados(response, generado_en)
+
+    return [{"spa": nombre, "promedio": round(promedio, 2)} for nombre, _, promedio in filas]
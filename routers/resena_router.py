@@ -4,6 +4,9 @@ from core.db import get_session
 from models.models import Resena, Usuario, Spa
 from models.schemas import ResenaCreate, ResenaRead
 from core.auth import get_current_user
+from core.calificaciones import ajustar_calificacion
+from core.reportes import rollup_reportes
+from core.paginacion import Pagina, paginar
 
 router = APIRouter(prefix="/resenas", tags=["Reseñas"])
 
@@ -27,6 +30,50 @@ def anexar_nombres(resena: Resena, session: Session) -> ResenaRead:
     )
 
 
+# ------------------------------------------------
+# UTILIDAD: listar reseñas con nombres en una sola consulta
+# ------------------------------------------------
+def listar_con_nombres(session: Session, pagina: Pagina, *condiciones) -> list[ResenaRead]:
+    """
+    Igual que anexar_nombres pero para listados: resuelve spa_nombre y
+    usuario_nombre con un JOIN, así el listado es una sola consulta
+    sin importar cuántas reseñas haya. Pagina por cursor sobre Resena.id.
+    """
+    query = (
+        select(
+            Resena.id,
+            Resena.calificacion,
+            Resena.comentario,
+            Resena.fecha_creacion,
+            Resena.spa_id,
+            Spa.nombre,
+            Resena.usuario_id,
+            Usuario.nombre,
+        )
+        .outerjoin(Spa, Spa.id == Resena.spa_id)
+        .outerjoin(Usuario, Usuario.id == Resena.usuario_id)
+        .where(*condiciones)
+    )
+    filas = paginar(session, query, Resena.id, pagina)
+
+    return [
+        ResenaRead(
+            id=id_,
+            calificacion=calificacion,
+            comentario=comentario,
+            fecha_creacion=fecha_creacion,
+            spa_id=spa_id,
+            spa_nombre=spa_nombre,
+            usuario_id=usuario_id,
+            usuario_nombre=usuario_nombre,
+        )
+        for (
+            id_, calificacion, comentario, fecha_creacion,
+            spa_id, spa_nombre, usuario_id, usuario_nombre,
+        ) in filas
+    ]
+
+
 # ------------------------------------------------
 # CREAR RESEÑA
 # ------------------------------------------------
@@ -56,7 +103,9 @@ def crear_resena(
         activo=True,
     )
     session.add(nueva)
+    ajustar_calificacion(session, nueva.spa_id, nueva.calificacion, 1)
     session.commit()
+    rollup_reportes.marcar_desactualizado()
     session.refresh(nueva)
 
     return anexar_nombres(nueva, session)
@@ -68,6 +117,7 @@ def crear_resena(
 @router.get("/por_spa/{spa_id}", response_model=list[ResenaRead])
 def listar_resenas_por_spa(
     spa_id: int,
+    pagina: Pagina = Depends(),
     session: Session = Depends(get_session),
     current_user: Usuario = Depends(get_current_user)
 ):
@@ -76,13 +126,12 @@ def listar_resenas_por_spa(
     if not spa or not spa.activo:
         raise HTTPException(404, "Spa no encontrado o inactivo")
 
-    resenas = session.exec(
-        select(Resena)
-        .where(Resena.spa_id == spa_id)
-        .where(Resena.activo == True)
-    ).all()
-
-    return [anexar_nombres(r, session) for r in resenas]
+    return listar_con_nombres(
+        session,
+        pagina,
+        Resena.spa_id == spa_id,
+        Resena.activo == True,
+    )
 
 
 # ------------------------------------------------
@@ -90,17 +139,17 @@ def listar_resenas_por_spa(
 # ------------------------------------------------
 @router.get("/mias", response_model=list[ResenaRead])
 def listar_mis_resenas(
+    pagina: Pagina = Depends(),
     session: Session = Depends(get_session),
     current_user: Usuario = Depends(get_current_user)
 ):
 
-    resenas = session.exec(
-        select(Resena)
-        .where(Resena.usuario_id == current_user.id)
-        .where(Resena.activo == True)
-    ).all()
-
-    return [anexar_nombres(r, session) for r in resenas]
+    return listar_con_nombres(
+        session,
+        pagina,
+        Resena.usuario_id == current_user.id,
+        Resena.activo == True,
+    )
 
 
 # ------------------------------------------------
@@ -114,7 +163,10 @@ def actualizar_resena(
     current_user: Usuario = Depends(get_current_user)
 ):
 
-    resena = session.get(Resena, resena_id)
+    # FOR UPDATE: dos ediciones simultáneas no deben leer la misma calificación vieja
+    resena = session.exec(
+        select(Resena).where(Resena.id == resena_id).with_for_update()
+    ).first()
     if not resena or not resena.activo:
         raise HTTPException(404, "Reseña no encontrada o inactiva")
 
@@ -125,12 +177,29 @@ def actualizar_resena(
     if not (1 <= data.calificacion <= 5):
         raise HTTPException(400, "La calificación debe estar entre 1 y 5")
 
+    if data.spa_id != resena.spa_id:
+        spa_nuevo = session.get(Spa, data.spa_id)
+        if not spa_nuevo or not spa_nuevo.activo:
+            raise HTTPException(404, "Spa no encontrado o inactivo")
+
+        # Se mueve la reseña: restar del spa viejo y sumar al nuevo
+        # (en orden de id para no generar deadlocks entre ediciones cruzadas)
+        ajustes = {
+            resena.spa_id: (-resena.calificacion, -1),
+            data.spa_id: (data.calificacion, 1),
+        }
+        for spa_id in sorted(ajustes):
+            ajustar_calificacion(session, spa_id, *ajustes[spa_id])
+    else:
+        ajustar_calificacion(session, resena.spa_id, data.calificacion - resena.calificacion, 0)
+
     resena.comentario = data.comentario
     resena.calificacion = data.calificacion
     resena.spa_id = data.spa_id
 
     session.add(resena)
     session.commit()
+    rollup_reportes.marcar_desactualizado()
     session.refresh(resena)
 
     return anexar_nombres(resena, session)
@@ -146,7 +215,9 @@ def eliminar_resena(
     current_user: Usuario = Depends(get_current_user)
 ):
 
-    resena = session.get(Resena, resena_id)
+    resena = session.exec(
+        select(Resena).where(Resena.id == resena_id).with_for_update()
+    ).first()
     if not resena:
         raise HTTPException(404, "Reseña no encontrada")
 
@@ -154,9 +225,14 @@ def eliminar_resena(
     if current_user.rol == "usuario" and resena.usuario_id != current_user.id:
         raise HTTPException(403, "No puedes eliminar reseñas de otros usuarios")
 
+    # Solo descontar si estaba activa (borrar dos veces no resta dos veces)
+    if resena.activo:
+        ajustar_calificacion(session, resena.spa_id, -resena.calificacion, -1)
+
     resena.activo = False
     session.add(resena)
     session.commit()
+    rollup_reportes.marcar_desactualizado()
 
     return {"message": f"Reseña #{resena.id} fue desactivada correctamente."}
 
@@ -166,6 +242,7 @@ def eliminar_resena(
 # ------------------------------------------------
 @router.get("/todas_admin", response_model=list[ResenaRead])
 def listar_todas_admin(
+    pagina: Pagina = Depends(),
     session: Session = Depends(get_session),
     current_user: Usuario = Depends(get_current_user)
 ):
@@ -173,7 +250,4 @@ def listar_todas_admin(
     if current_user.rol not in ["admin", "admin_principal"]:
         raise HTTPException(403, "Solo administradores pueden ver todas las reseñas")
 
-    resenas = session.exec(select(Resena)).all()
-
-
-    return [anexar_nombres(r, session) for r in resenas]
+    return listar_con_nombres(session, pagina)
@@ -0,0 +1,69 @@
+# routers/resena_router_async.py
+"""Versión async de los listados de resena_router (se monta con DB_ASYNC=true)."""
+from fastapi import APIRouter, Depends, HTTPException
+from sqlmodel.ext.asyncio.session import AsyncSession
+from core.db import get_async_session
+from core.paginacion import Pagina
+from core.auth import get_current_user_async
+from models.models import Resena, Spa, Usuario
+from models.schemas import ResenaRead
+from routers.resena_router import listar_con_nombres
+
+router = APIRouter(prefix="/resenas", tags=["Reseñas"])
+
+
+# ------------------------------------------------
+# LISTAR RESEÑAS POR SPA (ADMIN / USUARIO)
+# ------------------------------------------------
+@router.get("/por_spa/{spa_id}", response_model=list[ResenaRead])
+async def listar_resenas_por_spa(
+    spa_id: int,
+    pagina: Pagina = Depends(),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Usuario = Depends(get_current_user_async)
+):
+
+    spa = await session.get(Spa, spa_id)
+    if not spa or not spa.activo:
+        raise HTTPException(404, "Spa no encontrado o inactivo")
+
+    return await session.run_sync(
+        listar_con_nombres,
+        pagina,
+        Resena.spa_id == spa_id,
+        Resena.activo == True,
+    )
+
+
+# ------------------------------------------------
+# LISTAR MIS RESEÑAS (USUARIO)
+# ------------------------------------------------
+@router.get("/mias", response_model=list[ResenaRead])
+async def listar_mis_resenas(
+    pagina: Pagina = Depends(),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Usuario = Depends(get_current_user_async)
+):
+
+    return await session.run_sync(
+        listar_con_nombres,
+        pagina,
+        Resena.usuario_id == current_user.id,
+        Resena.activo == True,
+    )
+
+
+# ------------------------------------------------
+# LISTAR TODAS LAS RESEÑAS (ADMIN)
+# ------------------------------------------------
+@router.get("/todas_admin", response_model=list[ResenaRead])
+async def listar_todas_admin(
+    pagina: Pagina = Depends(),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Usuario = Depends(get_current_user_async)
+):
+
+    if current_user.rol not in ["admin", "admin_principal"]:
+        raise HTTPException(403, "Solo administradores pueden ver todas las reseñas")
+
+    return await session.run_sync(listar_con_nombres, pagina)
@@ -1,11 +1,20 @@
 # routers/servicio_router.py
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlmodel import Session, select
+from sqlalchemy.exc import IntegrityError
 from core.db import get_session
-from core.auth import get_current_user
+from core.auth import get_current_user, spa_editable
+from core.paginacion import Pagina, paginar
+from core.busqueda import indice_spas, spas_con_servicio
+from core.versiones import CACHE_PRIVADO, condicional, etag_spa, incrementar_version, version_spa
+from core.cache_respuestas import cache_respuestas, respuesta_json, serializar
+from core.asociaciones import desactivar_spa_servicios, upsert_spa_servicios
 from models.models import Servicio, Spa, SpaServicio, Usuario
-from models.schemas import ServicioCreate, ServicioRead, AsociarServicio
+from models.schemas import (
+    ServicioCreate, ServicioRead, AsociarServicio, AsociarServiciosLote, DesasociarServiciosLote,
+    ResultadoAsociacion,
+)
 
 router = APIRouter(
     prefix="/servicios",
@@ -67,59 +76,140 @@ def asociar_servicio_a_spa(
         )
     ).first()
 
+    if existe and existe.activo:
+        raise HTTPException(status_code=400, detail="El servicio ya está asociado a este Spa.")
+
     if existe:
+        # Estaba desasociado (baja lógica): se reactiva, solo puede haber una fila por par
+        existe.precio, existe.duracion, existe.activo = datos.precio, datos.duracion, True
+        nueva_rel = existe
+    else:
+        nueva_rel = SpaServicio(
+            spa_id=spa_id,
+            servicio_id=servicio_id,
+            precio=datos.precio,
+            duracion=datos.duracion,
+            activo=True
+        )
+
+    session.add(nueva_rel)
+    incrementar_version(session, [spa_id])
+    try:
+        session.commit()
+    except IntegrityError:
+        # Otra petición lo asoció entre la verificación y el commit
+        session.rollback()
         raise HTTPException(status_code=400, detail="El servicio ya está asociado a este Spa.")
+    indice_spas.actualizar_spas(session, [spa_id])
+
+    return {"message": f"Servicio '{servicio.nombre}' asociado al Spa '{spa.nombre}' correctamente."}
+
 
-    nueva_rel = SpaServicio(
-        spa_id=spa_id,
-        servicio_id=servicio_id,
-        precio=datos.precio,
-        duracion=datos.duracion,
-        activo=True
+# ASOCIAR VARIOS SERVICIOS A UN SPA (LOTE)
+@router.post("/asociar/{spa_id}", response_model=ResultadoAsociacion)
+def asociar_servicios_lote(
+    spa_id: int,
+    datos: AsociarServiciosLote,
+    session: Session = Depends(get_session),
+    current_user: Usuario = Depends(get_current_user),
+):
+    """
+    Asocia o actualiza (precio y duración) muchos servicios en una sola
+    transacción. Los que ya estaban igual no se tocan; los desactivados
+    se reactivan.
+    """
+    spa_editable(session, spa_id, current_user)
+
+    pares = {}
+    for item in datos.servicios:
+        if (spa_id, item.servicio_id) in pares:
+            raise HTTPException(status_code=400, detail=f"El servicio {item.servicio_id} está repetido en el lote.")
+        pares[(spa_id, item.servicio_id)] = {"precio": item.precio, "duracion": item.duracion}
+
+    ids = {servicio_id for _, servicio_id in pares}
+    encontrados = set(session.exec(select(Servicio.id).where(Servicio.id.in_(ids))).all())
+    if ids - encontrados:
+        raise HTTPException(status_code=404, detail=f"Servicios no encontrados: {sorted(ids - encontrados)}")
+
+    resultado = upsert_spa_servicios(session, pares)
+    if resultado.spas:
+        incrementar_version(session, [spa_id])
+    session.commit()
+    if resultado.spas:
+        indice_spas.actualizar_spas(session, [spa_id])
+
+    return ResultadoAsociacion(
+        insertados=resultado.insertados,
+        actualizados=resultado.actualizados,
+        sin_cambios=resultado.sin_cambios,
     )
 
-    session.add(nueva_rel)
+
+# QUITAR VARIOS SERVICIOS DE UN SPA (LOTE)
+@router.post("/desasociar/{spa_id}", response_model=ResultadoAsociacion)
+def desasociar_servicios_lote(
+    spa_id: int,
+    datos: DesasociarServiciosLote,
+    session: Session = Depends(get_session),
+    current_user: Usuario = Depends(get_current_user),
+):
+    """Desactiva (baja lógica) los servicios indicados del spa."""
+    spa_editable(session, spa_id, current_user)
+
+    desactivados = desactivar_spa_servicios(session, spa_id, datos.servicio_ids)
+    if desactivados:
+        incrementar_version(session, [spa_id])
     session.commit()
+    if desactivados:
+        indice_spas.actualizar_spas(session, [spa_id])
 
-    return {"message": f"Servicio '{servicio.nombre}' asociado al Spa '{spa.nombre}' correctamente."}
+    return ResultadoAsociacion(desactivados=desactivados)
 
 # LISTAR TODOS LOS SERVICIOS (GLOBAL)
 @router.get("/", response_model=list[ServicioRead])
 def listar_servicios(
+    pagina: Pagina = Depends(),
     session: Session = Depends(get_session),
     current_user: Usuario = Depends(get_current_user),
 ):
-    servicios = session.exec(select(Servicio)).all()
-    return servicios
+    return paginar(session, select(Servicio), Servicio.id, pagina)
+
+
+def servicios_de_spa(session: Session, spa_id: int) -> list[dict]:
+    # Un JOIN en vez de un session.get por relación
+    filas = session.exec(
+        select(Servicio.nombre, Servicio.descripcion, SpaServicio.precio, SpaServicio.duracion)
+        .join(Servicio, Servicio.id == SpaServicio.servicio_id)
+        .where(SpaServicio.spa_id == spa_id, SpaServicio.activo == True)
+        .order_by(SpaServicio.id)
+    ).all()
+
+    return [
+        {"servicio": nombre, "descripcion": descripcion, "precio": precio, "duracion": duracion}
+        for nombre, descripcion, precio, duracion in filas
+    ]
 
 
 # LISTAR SERVICIOS POR SPA
 @router.get("/por_spa/{spa_id}")
 def listar_servicios_por_spa(
     spa_id: int,
+    request: Request,
+    response: Response,
     session: Session = Depends(get_session),
 ):
-    spa = session.get(Spa, spa_id)
-    if not spa or not spa.activo:
+    version = version_spa(session, spa_id)
+    if version is None:
         raise HTTPException(status_code=404, detail="Spa no encontrado o inactivo")
+    no_modificado = condicional(request, response, etag_spa(spa_id, version, "servicios"), CACHE_PRIVADO)
+    if no_modificado:
+        return no_modificado
 
-    relaciones = session.exec(
-        select(SpaServicio).where(SpaServicio.spa_id == spa_id)
-    ).all()
-
-    servicios_spa = []
-    for rel in relaciones:
-        servicio = session.get(Servicio, rel.servicio_id)
-        if servicio:
-            servicios_spa.append(
-                {
-                    "servicio": servicio.nombre,
-                    "descripcion": servicio.descripcion,
-                    "precio": rel.precio,
-                    "duracion": rel.duracion,
-                }
-            )
-    return servicios_spa
+    contenido = cache_respuestas.obtener("servicios", spa_id, version)
+    if contenido is None:
+        contenido = serializar(servicios_de_spa(session, spa_id))
+        cache_respuestas.guardar("servicios", spa_id, version, contenido)
+    return respuesta_json(contenido, response)
 
 
 # ACTUALIZAR SERVICIO
@@ -143,9 +233,12 @@ def actualizar_servicio(
     for campo, valor in data.dict(exclude_unset=True).items():
         setattr(servicio, campo, valor)
 
+    spas_afectados = spas_con_servicio(session, servicio_id)
     session.add(servicio)
+    incrementar_version(session, spas_afectados)
     session.commit()
     session.refresh(servicio)
+    indice_spas.actualizar_spas(session, spas_afectados)
     return servicio
 
 
@@ -167,12 +260,15 @@ def eliminar_servicio(
     relaciones = session.exec(
         select(SpaServicio).where(SpaServicio.servicio_id == servicio_id)
     ).all()
+    spas_afectados = [rel.spa_id for rel in relaciones]
 
     for rel in relaciones:
         session.delete(rel)
 
     # Ahora borrar el servicio
     session.delete(servicio)
+    incrementar_version(session, spas_afectados)
     session.commit()
+    indice_spas.actualizar_spas(session, spas_afectados)
 
     return {"message": f"Servicio '{servicio.nombre}' eliminado correctamente."}
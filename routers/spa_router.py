@@ -1,13 +1,20 @@
 # routers/spa_router.py
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status, UploadFile, File
 from sqlmodel import Session, select
+from sqlalchemy import case, exists, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
 from core.db import get_session
-from models.models import Spa, Usuario, SpaImage
-from models.schemas import SpaCreate, SpaRead, SpaUpdate, SpaDetalleRead, ImageOut
+from core.paginacion import HEADER_CURSOR, Pagina, paginar, paginar_ranking
+from core.busqueda import indice_spas
+from core.geo import indice_geo
+from core.imagenes import guardar_imagen, programar_variantes
+from core.versiones import condicional, etag_de, etag_spa, incrementar_version, version_spa
+from core.cache_respuestas import cache_respuestas, respuesta_json
+from models.models import Spa, Usuario, SpaImage, SpaServicio, SpaMaterial, Resena, Servicio, Material
+from models.schemas import SpaCreate, SpaRead, SpaUpdate, SpaDetalleRead, ImageOut, SpaFiltroRead, SpaCercanoRead
 from core.auth import get_current_user, admin_spa_required, admin_principal_required
 from datetime import date
-import os
-import shutil
 
 router = APIRouter(
     prefix="/spas",
@@ -15,6 +22,12 @@ router = APIRouter(
 )
 
 
+def reindexar_spas(session: Session, spa_ids: list[int]):
+    """Actualiza los índices en memoria (búsqueda y geo) después del commit."""
+    indice_spas.actualizar_spas(session, spa_ids)
+    indice_geo.actualizar_spas(session, spa_ids)
+
+
 # -------------------- CREAR SPA --------------------
 @router.post("/", response_model=SpaRead, status_code=status.HTTP_201_CREATED)
 def crear_spa(
@@ -32,109 +45,132 @@ def crear_spa(
         direccion=spa_data.direccion,
         zona=spa_data.zona,
         horario=spa_data.horario,
+        latitud=spa_data.latitud,
+        longitud=spa_data.longitud,
         ultima_actualizacion=date.today(),
         admin_spa_id=current_user.id if current_user.rol == "admin_spa" else None
     )
 
     session.add(nuevo_spa)
-    session.commit()
+    try:
+        session.commit()
+    except IntegrityError:
+        # Otro spa con el mismo nombre se creó entre la verificación y el commit
+        session.rollback()
+        raise HTTPException(status_code=400, detail="Ya existe un spa con ese nombre")
     session.refresh(nuevo_spa)
+    reindexar_spas(session, [nuevo_spa.id])
     return nuevo_spa
 
 
 # -------------------- LISTAR SPAS --------------------
-@router.get("/", response_model=list[SpaRead])
-def listar_spas(
-    incluir_inactivos: bool = False,
-    session: Session = Depends(get_session),
-    current_user: Usuario = Depends(get_current_user)
-):
-
+def consulta_spas_visibles(current_user: Usuario, incluir_inactivos: bool):
+    """Spas que puede ver el usuario según su rol."""
     if current_user.rol == "admin_principal":
         if incluir_inactivos:
-            spas = session.exec(select(Spa)).all()
-        else:
-            spas = session.exec(select(Spa).where(Spa.activo == True)).all()
-        return spas
+            return select(Spa)
+        return select(Spa).where(Spa.activo == True)
     
     if current_user.rol == "admin_spa":
-        spas = session.exec(select(Spa).where(
+        return select(Spa).where(
             (Spa.activo == True) | 
             (Spa.admin_spa_id == current_user.id)
-        )).all()
-        return spas
+        )
     
-    spas = session.exec(select(Spa).where(Spa.activo == True)).all()
-    return spas
-
+    return select(Spa).where(Spa.activo == True)
 
 
-# -------------------- VER SPA --------------------
-@router.get("/{spa_id}", response_model=SpaDetalleRead)
-def obtener_spa(
-    spa_id: int,
+@router.get("/", response_model=list[SpaRead])
+def listar_spas(
+    incluir_inactivos: bool = False,
+    pagina: Pagina = Depends(),
     session: Session = Depends(get_session),
+    current_user: Usuario = Depends(get_current_user)
 ):
-    spa = session.get(Spa, spa_id)
+    query = consulta_spas_visibles(current_user, incluir_inactivos)
+    return paginar(session, query, Spa.id, pagina)
 
-    if not spa or not spa.activo:
-        raise HTTPException(status_code=404, detail="Spa no encontrado o inactivo")
 
-    # Obtener servicios del spa con detalle
-    servicios = []
-    for assoc in spa.servicios_assoc:
-        if assoc.activo:
-            servicios.append({
-                "id": assoc.id,
-                "servicio_id": assoc.servicio.id,
-                "nombre": assoc.servicio.nombre,
-                "descripcion": assoc.servicio.descripcion,
-                "precio": assoc.precio,
-                "duracion": assoc.duracion,
-            })
-
-    # Obtener materiales
-    materiales = []
-    for assoc in spa.materiales_assoc:
-        if assoc.activo:
-            materiales.append({
-                "id": assoc.material.id,
-                "nombre": assoc.material.nombre,
-                "tipo": assoc.material.tipo
-            })
-    # Obtener reseñas
-    resenas = []
-    for r in spa.resenas:
-        if r.activo:
-            resenas.append({
-                "id": r.id,
-                "calificacion": r.calificacion,
-                "comentario": r.comentario,
-                "fecha_creacion": r.fecha_creacion,
-                "usuario_id": r.usuario_id,
-                "usuario_nombre": r.usuario.nombre if r.usuario else None,
-            })
-
-    imagenes = []
-    # Asume que 'spa.imagenes' es la relación que definiste en tu modelo Spa
-    # que contiene objetos con los atributos 'url' y 'es_principal'.
-    if hasattr(spa, 'imagenes'):
-        for img in spa.imagenes:
-            imagenes.append({
-                "id": img.id,         # <-- ¡NUEVO!
-                "spa_id": img.spa_id, # <-- ¡NUEVO!
-                "url": img.url,
-                "es_principal": img.es_principal,
-            })
-
-    # Devolver todo
+
+# -------------------- VER SPA --------------------
+def cargar_detalle_spa(session: Session, spa_id: int) -> dict | None:
+    """
+    Carga un spa activo con servicios, materiales, reseñas e imágenes.
+    Usa selectinload con los filtros de 'activo' en SQL, así el número de
+    consultas es fijo (una por colección) sin importar cuántas reseñas tenga.
+    """
+    spa = session.exec(
+        select(Spa)
+        .where(Spa.id == spa_id, Spa.activo == True)
+        .options(
+            selectinload(Spa.servicios_assoc.and_(SpaServicio.activo == True))
+            .joinedload(SpaServicio.servicio),
+            selectinload(Spa.materiales_assoc.and_(SpaMaterial.activo == True))
+            .joinedload(SpaMaterial.material),
+            selectinload(Spa.resenas.and_(Resena.activo == True))
+            .joinedload(Resena.usuario),
+            selectinload(Spa.imagenes),
+        )
+    ).first()
+
+    if not spa:
+        return None
+
+    servicios = [
+        {
+            "id": assoc.id,
+            "servicio_id": assoc.servicio.id,
+            "nombre": assoc.servicio.nombre,
+            "descripcion": assoc.servicio.descripcion,
+            "precio": assoc.precio,
+            "duracion": assoc.duracion,
+        }
+        for assoc in spa.servicios_assoc
+        if assoc.servicio
+    ]
+
+    materiales = [
+        {
+            "id": assoc.material.id,
+            "nombre": assoc.material.nombre,
+            "tipo": assoc.material.tipo,
+        }
+        for assoc in spa.materiales_assoc
+        if assoc.material
+    ]
+
+    resenas = [
+        {
+            "id": r.id,
+            "calificacion": r.calificacion,
+            "comentario": r.comentario,
+            "fecha_creacion": r.fecha_creacion,
+            "usuario_id": r.usuario_id,
+            "usuario_nombre": r.usuario.nombre if r.usuario else None,
+        }
+        for r in spa.resenas
+    ]
+
+    imagenes = [
+        {
+            "id": img.id,
+            "spa_id": img.spa_id,
+            "url": img.url,
+            "es_principal": img.es_principal,
+        }
+        for img in spa.imagenes
+    ]
+
     return {
         "id": spa.id,
         "nombre": spa.nombre,
         "direccion": spa.direccion,
         "zona": spa.zona,
         "horario": spa.horario,
+        "latitud": spa.latitud,
+        "longitud": spa.longitud,
         "calificacion_promedio": spa.calificacion_promedio,
+        "total_resenas": spa.total_resenas,
         "ultima_actualizacion": spa.ultima_actualizacion,
         "servicios": servicios,
         "materiales": materiales,
@@ -143,6 +179,40 @@ def obtener_spa(
     }
 
 
+def detalle_serializado(session: Session, spa_id: int, version: int) -> bytes | None:
+    """JSON del detalle desde la caché de respuestas, o armado y guardado si no está."""
+    contenido = cache_respuestas.obtener("spa", spa_id, version)
+    if contenido is None:
+        detalle = cargar_detalle_spa(session, spa_id)
+        if detalle is None:
+            return None
+        contenido = SpaDetalleRead.model_validate(detalle).model_dump_json().encode("utf-8")
+        cache_respuestas.guardar("spa", spa_id, version, contenido)
+    return contenido
+
+
+@router.get("/{spa_id}", response_model=SpaDetalleRead)
+def obtener_spa(
+    spa_id: int,
+    request: Request,
+    response: Response,
+    session: Session = Depends(get_session),
+):
+    # Primero solo la versión: si el cliente ya la tiene, 304 sin cargar el detalle
+    version = version_spa(session, spa_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Spa no encontrado o inactivo")
+    no_modificado = condicional(request, response, etag_spa(spa_id, version, "spa"))
+    if no_modificado:
+        return no_modificado
+
+    contenido = detalle_serializado(session, spa_id, version)
+    if contenido is None:
+        raise HTTPException(status_code=404, detail="Spa no encontrado o inactivo")
+
+    return respuesta_json(contenido, response)
+
+
 
 # -------------------- EDITAR SPA --------------------
 @router.patch("/{spa_id}", response_model=SpaRead)
@@ -160,13 +230,25 @@ def actualizar_spa(
     if current_user.rol == "admin_spa" and spa.admin_spa_id != current_user.id:
         raise HTTPException(status_code=403, detail="No autorizado para editar este spa")
 
-    for campo, valor in spa_data.dict(exclude_unset=True).items():
+    cambios = spa_data.dict(exclude_unset=True)
+    if "nombre" in cambios and cambios["nombre"] != spa.nombre:
+        otro = session.exec(select(Spa.id).where(Spa.nombre == cambios["nombre"])).first()
+        if otro is not None:
+            raise HTTPException(status_code=400, detail="Ya existe un spa con ese nombre")
+
+    for campo, valor in cambios.items():
         setattr(spa, campo, valor)
 
     spa.ultima_actualizacion = date.today()
+    incrementar_version(session, [spa.id])
 
-    session.commit()
+    try:
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        raise HTTPException(status_code=400, detail="Ya existe un spa con ese nombre")
     session.refresh(spa)
+    reindexar_spas(session, [spa.id])
     return spa
 
 # -------------------- DESACTIVAR SPA --------------------
@@ -181,31 +263,233 @@ def eliminar_spa(
         raise HTTPException(status_code=404, detail="Spa no encontrado")
 
     spa.activo = False
+    incrementar_version(session, [spa_id])
     session.commit()
+    reindexar_spas(session, [spa_id])
     return {"message": f"Spa '{spa.nombre}' fue desactivado correctamente."}
 
 
 # -------------------- BUSCAR SPA --------------------
+def buscar_spas(
+    session: Session,
+    q: str | None,
+    nombre: str | None,
+    zona: str | None,
+    pagina: Pagina,
+    construir_indice: bool = True,
+) -> list[Spa]:
+    """
+    Busca en el índice (core/busqueda.py) y carga solo los spas de la página.
+    La versión async asegura el índice antes y pasa construir_indice=False.
+    """
+    if not (q or nombre or zona):
+        return paginar(session, select(Spa).where(Spa.activo == True), Spa.id, pagina)
+
+    resultados = paginar_ranking(indice_spas.buscar(session, q, nombre, zona, construir_indice), pagina)
+    ids = [spa_id for spa_id, _ in resultados]
+    if not ids:
+        return []
+
+    spas = {
+        spa.id: spa
+        for spa in session.exec(
+            select(Spa).where(Spa.id.in_(ids), Spa.activo == True)
+        ).all()
+    }
+    return [spas[spa_id] for spa_id in ids if spa_id in spas]
+
+
+def etag_busqueda(spas: list[Spa], response: Response) -> str:
+    """ETag de una página de resultados: ids y versiones en orden + cursor siguiente."""
+    return etag_de(response.headers.get(HEADER_CURSOR, ""), *(f"{s.id}:{s.version}" for s in spas))
+
+
 @router.get("/buscar/", response_model=list[SpaRead])
 def buscar_spa(
+    request: Request,
+    q: str | None = None,
     nombre: str | None = None,
     zona: str | None = None,
+    pagina: Pagina = Depends(),
     session: Session = Depends(get_session),
 ):
     """
     Este endpoint es público (no requiere login).
     Perfecto para clientes.
+    - q: busca en nombre, zona, dirección, servicios y materiales.
+    - nombre / zona: restringen la búsqueda a ese campo.
+    No distingue mayúsculas ni tildes ("unas" encuentra "Uñas") y
+    ordena por relevancia.
+    Devuelve ETag: con If-None-Match igual se responde 304 sin cuerpo.
     """
+    spas = buscar_spas(session, q, nombre, zona, pagina)
+    no_modificado = condicional(request, pagina.response, etag_busqueda(spas, pagina.response))
+    if no_modificado:
+        return no_modificado
+    return spas
 
-    query = select(Spa).where(Spa.activo == True)
 
-    if nombre:
-        query = query.where(Spa.nombre.contains(nombre))
-    if zona:
-        query = query.where(Spa.zona.contains(zona))
+# -------------------- FILTRAR SPAS (FACETAS) --------------------
+def condiciones_filtro(
+    servicio_ids: list[int],
+    material_ids: list[int],
+    precio_min: float | None,
+    precio_max: float | None,
+    calificacion_min: float | None,
+) -> list:
+    """
+    Condiciones sobre Spa como EXISTS correlacionados, que Postgres resuelve
+    con los índices de spaservicio (servicio_id, precio) y spamaterial (material_id).
+    """
+    condiciones = [Spa.activo == True]
+
+    def servicio_existe(servicio_id: int | None):
+        sub = select(SpaServicio.id).where(
+            SpaServicio.spa_id == Spa.id,
+            SpaServicio.activo == True,
+        )
+        if servicio_id is not None:
+            sub = sub.where(SpaServicio.servicio_id == servicio_id)
+        if precio_min is not None:
+            sub = sub.where(SpaServicio.precio >= precio_min)
+        if precio_max is not None:
+            sub = sub.where(SpaServicio.precio <= precio_max)
+        return exists(sub)
+
+    # El rango de precio aplica a los servicios pedidos, o a cualquiera si no se pidió ninguno
+    for servicio_id in servicio_ids:
+        condiciones.append(servicio_existe(servicio_id))
+    if not servicio_ids and (precio_min is not None or precio_max is not None):
+        condiciones.append(servicio_existe(None))
+
+    for material_id in material_ids:
+        condiciones.append(exists(
+            select(SpaMaterial.spa_id).where(
+                SpaMaterial.spa_id == Spa.id,
+                SpaMaterial.material_id == material_id,
+                SpaMaterial.activo == True,
+            )
+        ))
+
+    if calificacion_min is not None:
+        condiciones.append(Spa.calificacion_promedio >= calificacion_min)
+
+    return condiciones
+
+
+def filtrar_spas(session: Session, condiciones: list, pagina: Pagina) -> dict:
+    """Página de spas que cumplen las condiciones + conteos por faceta (5 consultas)."""
+    coincidentes = select(Spa.id).where(*condiciones).scalar_subquery()
+
+    spas = paginar(session, select(Spa).where(*condiciones), Spa.id, pagina)
+    total = session.exec(select(func.count()).select_from(Spa).where(*condiciones)).one()
+
+    servicios = session.exec(
+        select(Servicio.id, Servicio.nombre, func.count(func.distinct(SpaServicio.spa_id)))
+        .join(SpaServicio, SpaServicio.servicio_id == Servicio.id)
+        .where(SpaServicio.activo == True, SpaServicio.spa_id.in_(coincidentes))
+        .group_by(Servicio.id, Servicio.nombre)
+        .order_by(Servicio.nombre)
+    ).all()
+
+    materiales = session.exec(
+        select(Material.id, Material.nombre, func.count(SpaMaterial.spa_id))
+        .join(SpaMaterial, SpaMaterial.material_id == Material.id)
+        .where(SpaMaterial.activo == True, SpaMaterial.spa_id.in_(coincidentes))
+        .group_by(Material.id, Material.nombre)
+        .order_by(Material.nombre)
+    ).all()
+
+    minimos = (4, 3, 2, 1)
+    por_calificacion = session.exec(
+        select(*[
+            func.coalesce(func.sum(case((Spa.calificacion_promedio >= minimo, 1), else_=0)), 0)
+            for minimo in minimos
+        ]).where(*condiciones)
+    ).one()
 
-    spas = session.exec(query).all()
-    return spas
+    return {
+        "total": total,
+        "spas": spas,
+        "facetas": {
+            "servicios": [
+                {"id": id_, "nombre": nombre, "cantidad": cantidad}
+                for id_, nombre, cantidad in servicios
+            ],
+            "materiales": [
+                {"id": id_, "nombre": nombre, "cantidad": cantidad}
+                for id_, nombre, cantidad in materiales
+            ],
+            "calificacion": [
+                {"minimo": minimo, "cantidad": cantidad}
+                for minimo, cantidad in zip(minimos, por_calificacion)
+            ],
+        },
+    }
+
+
+@router.get("/filtrar/", response_model=SpaFiltroRead)
+def filtrar_spa(
+    servicio_id: list[int] = Query([], description="Debe ofrecer todos estos servicios"),
+    material_id: list[int] = Query([], description="Debe usar todos estos materiales"),
+    precio_min: float | None = None,
+    precio_max: float | None = None,
+    calificacion_min: float | None = Query(None, ge=0, le=5),
+    pagina: Pagina = Depends(),
+    session: Session = Depends(get_session),
+):
+    """
+    Endpoint público: spas que cumplen todos los filtros, más los conteos
+    por servicio, material y calificación dentro del resultado.
+    Ejemplo: ?servicio_id=3&precio_max=60000&calificacion_min=4&material_id=7
+    """
+    condiciones = condiciones_filtro(servicio_id, material_id, precio_min, precio_max, calificacion_min)
+    return filtrar_spas(session, condiciones, pagina)
+
+
+# -------------------- SPAS CERCANOS --------------------
+def spas_cercanos(
+    session: Session,
+    lat: float,
+    lon: float,
+    k: int,
+    radio_km: float | None,
+    construir_indice: bool = True,
+) -> list[dict]:
+    """
+    Consulta el índice geo y carga solo los k spas encontrados.
+    La versión async asegura el índice antes y pasa construir_indice=False.
+    """
+    cercanos = indice_geo.cercanos(session, lat, lon, k, radio_km, construir_indice)
+    if not cercanos:
+        return []
+
+    spas = {
+        spa.id: spa
+        for spa in session.exec(
+            select(Spa).where(Spa.id.in_([spa_id for spa_id, _ in cercanos]), Spa.activo == True)
+        ).all()
+    }
+    return [
+        {**SpaRead.model_validate(spas[spa_id]).model_dump(), "distancia_km": round(distancia, 3)}
+        for spa_id, distancia in cercanos
+        if spa_id in spas
+    ]
+
+
+@router.get("/cercanos/", response_model=list[SpaCercanoRead])
+def listar_cercanos(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(10, ge=1, le=100),
+    radio_km: float | None = Query(None, gt=0),
+    session: Session = Depends(get_session),
+):
+    """
+    Endpoint público: los k spas activos más cercanos a (lat, lon),
+    ordenados por distancia. Con radio_km solo los que están dentro del radio.
+    """
+    return spas_cercanos(session, lat, lon, k, radio_km)
 
 
 # -------------------- RESTAURAR SPA --------------------
@@ -221,9 +505,11 @@ def restore_spa(
     
     spa.activo = True
     spa.ultima_actualizacion = date.today()
+    incrementar_version(session, [spa_id])
 
     session.commit()
     session.refresh(spa)
+    reindexar_spas(session, [spa_id])
 
     return {"message": f"Spa '{spa.nombre}' restaurado correctamente."}
 
@@ -248,37 +534,37 @@ def subir_imagen_spa(
     if current_user.rol not in ["admin_principal"] and spa.admin_spa_id != current_user.id:
         raise HTTPException(status_code=403, detail="No tienes permisos para modificar este Spa.")
 
-    # 2. Configuración y Guardado Físico del Archivo
-    UPLOAD_DIR = f"./static/img/spas/{spa_id}" # Ruta basada en el ID del Spa
-    os.makedirs(UPLOAD_DIR, exist_ok=True) # Crea la carpeta si no existe
+    # 2. Guardado por bloques con hash y validación de tipo/tamaño
+    contenido_hash, ruta, public_url = guardar_imagen(file, spa_id)
 
-    # Generar un nombre de archivo seguro y único
-    file_extension = file.filename.split('.')[-1] if '.' in file.filename else 'jpg'
-    safe_filename = f"{date.today().strftime('%Y%m%d')}_{file.filename.replace(' ', '_')}_{current_user.id}.{file_extension}"
-    file_path = os.path.join(UPLOAD_DIR, safe_filename)
-    
-    try:
-        # Guardar el archivo en el disco usando shutil
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer) 
-            
-        # Determinar la URL pública
-        # La URL debe ser relativa al directorio 'static' para que el frontend la use.
-        public_url = f"/static/img/spas/{spa_id}/{safe_filename}"
-
-    except Exception as e:
-        # Manejar errores de escritura de disco
-        raise HTTPException(status_code=500, detail=f"Error al guardar el archivo: {e}")
+    # Misma imagen ya subida a este spa: se devuelve la existente
+    consulta_existente = select(SpaImage).where(
+        SpaImage.spa_id == spa_id,
+        SpaImage.hash_contenido == contenido_hash,
+    )
+    existente = session.exec(consulta_existente).first()
+    if existente:
+        return existente
 
     # 3. Registrar la URL en la Base de Datos
     nueva_imagen = SpaImage(
         spa_id=spa_id,
         url=public_url,
-        es_principal=es_principal 
+        es_principal=es_principal,
+        hash_contenido=contenido_hash,
     )
 
-    session.add(nueva_imagen)
-    session.commit()
+    try:
+        session.add(nueva_imagen)
+        incrementar_version(session, [spa_id])  # su consulta ya hace flush del INSERT
+        session.commit()
+    except IntegrityError:
+        # Otra subida de los mismos bytes la registró primero (ix_spaimage_spa_hash)
+        session.rollback()
+        return session.exec(consulta_existente).one()
     session.refresh(nueva_imagen)
 
+    # 4. Miniaturas en segundo plano (el request no las espera)
+    programar_variantes(spa_id, ruta)
+
     return nueva_imagen
@@ -0,0 +1,111 @@
+# routers/spa_router_async.py
+"""
+Versión async de las lecturas de spa_router (se monta con DB_ASYNC=true).
+Reutiliza las consultas del router síncrono vía AsyncSession.run_sync, así
+la lógica vive en un solo lugar y el worker no bloquea hilos esperando a Postgres.
+
+run_sync corre en el event loop: los índices en memoria (búsqueda y geo) se
+construyen antes en el threadpool, porque construirlos espera a un lock.
+"""
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from core.busqueda import indice_spas
+from core.geo import indice_geo
+from core.db import get_async_session
+from core.paginacion import Pagina, paginar
+from core.auth import get_current_user_async
+from core.versiones import condicional, etag_spa, version_spa
+from core.cache_respuestas import respuesta_json
+from models.models import Spa, Usuario
+from models.schemas import SpaRead, SpaDetalleRead, SpaFiltroRead, SpaCercanoRead
+from routers.spa_router import (
+    detalle_serializado, consulta_spas_visibles, buscar_spas, condiciones_filtro, filtrar_spas,
+    spas_cercanos, etag_busqueda,
+)
+
+router = APIRouter(
+    prefix="/spas",
+    tags=["Spas"]
+)
+
+
+# -------------------- LISTAR SPAS --------------------
+@router.get("/", response_model=list[SpaRead])
+async def listar_spas(
+    incluir_inactivos: bool = False,
+    pagina: Pagina = Depends(),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: Usuario = Depends(get_current_user_async)
+):
+    query = consulta_spas_visibles(current_user, incluir_inactivos)
+    return await session.run_sync(paginar, query, Spa.id, pagina)
+
+
+# -------------------- VER SPA --------------------
+@router.get("/{spa_id}", response_model=SpaDetalleRead)
+async def obtener_spa(
+    spa_id: int,
+    request: Request,
+    response: Response,
+    session: AsyncSession = Depends(get_async_session),
+):
+    version = await session.run_sync(version_spa, spa_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Spa no encontrado o inactivo")
+    no_modificado = condicional(request, response, etag_spa(spa_id, version, "spa"))
+    if no_modificado:
+        return no_modificado
+
+    contenido = await session.run_sync(detalle_serializado, spa_id, version)
+    if contenido is None:
+        raise HTTPException(status_code=404, detail="Spa no encontrado o inactivo")
+
+    return respuesta_json(contenido, response)
+
+
+# -------------------- BUSCAR SPA --------------------
+@router.get("/buscar/", response_model=list[SpaRead])
+async def buscar_spa(
+    request: Request,
+    q: str | None = None,
+    nombre: str | None = None,
+    zona: str | None = None,
+    pagina: Pagina = Depends(),
+    session: AsyncSession = Depends(get_async_session),
+):
+    if q or nombre or zona:
+        await run_in_threadpool(indice_spas.asegurar)
+    spas = await session.run_sync(buscar_spas, q, nombre, zona, pagina, False)
+    no_modificado = condicional(request, pagina.response, etag_busqueda(spas, pagina.response))
+    if no_modificado:
+        return no_modificado
+    return spas
+
+
+# -------------------- FILTRAR SPAS (FACETAS) --------------------
+@router.get("/filtrar/", response_model=SpaFiltroRead)
+async def filtrar_spa(
+    servicio_id: list[int] = Query([]),
+    material_id: list[int] = Query([]),
+    precio_min: float | None = None,
+    precio_max: float | None = None,
+    calificacion_min: float | None = Query(None, ge=0, le=5),
+    pagina: Pagina = Depends(),
+    session: AsyncSession = Depends(get_async_session),
+):
+    condiciones = condiciones_filtro(servicio_id, material_id, precio_min, precio_max, calificacion_min)
+    return await session.run_sync(filtrar_spas, condiciones, pagina)
+
+
+# -------------------- SPAS CERCANOS --------------------
+@router.get("/cercanos/", response_model=list[SpaCercanoRead])
+async def listar_cercanos(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(10, ge=1, le=100),
+    radio_km: float | None = Query(None, gt=0),
+    session: AsyncSession = Depends(get_async_session),
+):
+    await run_in_threadpool(indice_geo.asegurar)
+    return await session.run_sync(spas_cercanos, lat, lon, k, radio_km, False)
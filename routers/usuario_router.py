@@ -1,9 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlmodel import Session, select
+from starlette.concurrency import run_in_threadpool
 from core.db import get_session
+from core.paginacion import Pagina, paginar
 from models.models import Usuario
 from models.schemas import UsuarioCreate, UsuarioRead
-from core.auth import hash_password, get_current_user, admin_principal_required
+from core.auth import (
+    crear_usuario, hash_password_async, get_current_user, admin_principal_required, invalidar_usuario,
+    usuario_por_correo,
+)
 import templates
 from fastapi.requests import Request
 
@@ -23,46 +28,36 @@ def perfil_usuario(request: Request, current_user: Usuario = Depends(get_current
 
 # -------------------- CREAR ADMINISTRADOR DE SPA --------------------
 @router.post("/crear_admin_spa", response_model=UsuarioRead)
-def crear_admin_spa(
+async def crear_admin_spa(
     usuario_data: UsuarioCreate,
     session: Session = Depends(get_session),
     current_user=Depends(admin_principal_required),
 ):
     """
     Solo el administrador principal puede crear administradores de spa.
+    Async como register: bcrypt se espera sin ocupar un hilo del threadpool.
     """
-    usuario_existente = session.exec(
-        select(Usuario).where(Usuario.correo == usuario_data.correo)
-    ).first()
+    usuario_existente = await run_in_threadpool(usuario_por_correo, session, usuario_data.correo)
     if usuario_existente:
         raise HTTPException(status_code=400, detail="El correo ya está registrado")
 
-    hashed_password = hash_password(usuario_data.contrasena)
-    nuevo_admin = Usuario(
-        nombre=usuario_data.nombre,
-        correo=usuario_data.correo,
-        contrasena=hashed_password,
-        rol="admin_spa",
-        activo=True,
+    hashed_password = await hash_password_async(usuario_data.contrasena)
+    return await run_in_threadpool(
+        crear_usuario, session, usuario_data.nombre, usuario_data.correo, hashed_password, "admin_spa"
     )
 
-    session.add(nuevo_admin)
-    session.commit()
-    session.refresh(nuevo_admin)
-    return nuevo_admin
-
 
 # -------------------- LISTAR USUARIOS --------------------
 @router.get("/", response_model=list[UsuarioRead])
 def listar_usuarios(
+    pagina: Pagina = Depends(),
     session: Session = Depends(get_session),
     current_user=Depends(admin_principal_required)
 ):
     """
     Lista todos los usuarios registrados (solo admin principal).
     """
-    usuarios = session.exec(select(Usuario)).all()
-    return usuarios
+    return paginar(session, select(Usuario), Usuario.id, pagina)
 
 
 # -------------------- OBTENER USUARIO POR ID --------------------
@@ -104,6 +99,7 @@ def desactivar_usuario(
     usuario.activo = False
     session.add(usuario)
     session.commit()
+    invalidar_usuario(usuario.id)
     return {"message": f"El usuario '{usuario.nombre}' ha sido desactivado correctamente."}
 
 # -------------------- REACTIVAR USUARIO --------------------
@@ -120,5 +116,6 @@ def activar_usuario(
     usuario.activo = True
     session.add(usuario)
     session.commit()
+    invalidar_usuario(usuario.id)
     return {"message": f"El usuario '{usuario.nombre}' ha sido activado correctamente."}
 
@@ -30,6 +30,22 @@
         return resp;
     };
 
+    // Listados paginados: sigue el header X-Next-Cursor y junta todas las páginas.
+    // Devuelve un Response con la lista completa (o el de la página que falló).
+    window.apiFetchTodos=async function(path,options={}) {
+        const sep=path.includes('?')?'&':'?';
+        const base=path+sep+'limite=200';
+        let todos=[];
+        let cursor=null;
+        do{
+            const resp=await window.apiFetch(cursor?base+'&cursor='+encodeURIComponent(cursor):base,Object.assign({},options));
+            if(!resp.ok) return resp;
+            todos=todos.concat(await resp.json());
+            cursor=resp.headers.get('X-Next-Cursor');
+        }while(cursor);
+        return new Response(JSON.stringify(todos),{status:200,headers:{'Content-Type':'application/json'}});
+    };
+
     // Nav: mostrar/ocultar botones de login/logout
     function updateNav(){
         const btnLogout=document.getElementById('btn-logout');
@@ -31,10 +31,10 @@ document.addEventListener("DOMContentLoaded", () => {
     }
   }
 
-  async function safeApiFetch(path, options = {}) {
-    // usa window.apiFetch tal cual lo tienes en app.js
+  async function safeApiFetch(path, options = {}, todas = false) {
+    // usa window.apiFetch tal cual lo tienes en app.js (apiFetchTodos para listados paginados)
     try {
-      const resp = await window.apiFetch(path, options);
+      const resp = await (todas ? window.apiFetchTodos : window.apiFetch)(path, options);
       return resp;
     } catch (err) {
       // window.apiFetch ya redirige en 401, pero capturamos el error para UX
@@ -50,8 +50,8 @@ document.addEventListener("DOMContentLoaded", () => {
     }
   }
 
-  async function apiJSON(path, options = {}) {
-    const resp = await safeApiFetch(path, options);
+  async function apiJSON(path, options = {}, todas = false) {
+    const resp = await safeApiFetch(path, options, todas);
     // si ya fue manejado por safeApiFetch y resp no existe, lanzar
     if (!resp) throw new Error("No response");
     if (!resp.ok) {
@@ -126,7 +126,7 @@ async function cargarMateriales() {
     showMessage("Cargando materiales...", "info");
 
     try {
-        const materiales = await apiJSON("/materiales/", { method: "GET" });
+        const materiales = await apiJSON("/materiales/", { method: "GET" }, true);
 
         // mostrar tabla
         renderTabla(materiales);
@@ -210,7 +210,7 @@ async function cargarMateriales() {
   async function iniciarEdicion(id) {
     try {
       // traer lista actual para tomar el objeto (simple)
-      const materiales = await apiJSON("/materiales/", { method: "GET" });
+      const materiales = await apiJSON("/materiales/", { method: "GET" }, true);
       const m = materiales.find(x => Number(x.id) === Number(id));
       if (!m) return showMessage("Material no encontrado", "error");
 
@@ -51,7 +51,7 @@
   // Carga la lista de spas para los selects
   async function cargarSpas() {
     try {
-        const res = await apiFetch("/spas/", { method: "GET" });
+        const res = await apiFetchTodos("/spas/", { method: "GET" });
 
         if (!res.ok) {
             console.error("Error cargando spas:", res.status);
@@ -94,7 +94,7 @@ const spas = await res.json();
   async function cargarResenasPorSpa(spaId) {
     resenasList.innerHTML = '<p>Cargando reseñas...</p>';
     try {
-      const resp = await apiFetch(`/resenas/por_spa/${spaId}`);
+      const resp = await apiFetchTodos(`/resenas/por_spa/${spaId}`);
       if (!resp.ok) {
         if (resp.status === 404) resenasList.innerHTML = '<p>Spa no encontrado o inactivo.</p>';
         else throw new Error('Error al cargar reseñas');
@@ -117,7 +117,7 @@ const spas = await res.json();
       return;
     }
     try {
-      const resp = await apiFetch('/resenas/mias');
+      const resp = await apiFetchTodos('/resenas/mias');
       if (!resp.ok) {
         if (resp.status === 401) misResenasList.innerHTML = '<p>No autorizado. Inicia sesión.</p>';
         else throw new Error('Error al cargar mis reseñas');
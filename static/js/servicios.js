@@ -16,7 +16,7 @@ document.addEventListener('DOMContentLoaded', () => {
   // ==================================
   async function cargarServicios() {
     try {
-      const resp = await window.apiFetch("/servicios/", { method: "GET" });
+      const resp = await window.apiFetchTodos("/servicios/", { method: "GET" });
       if (!resp.ok) throw new Error("Error cargando servicios");
 
       const servicios = await resp.json();
@@ -177,7 +177,7 @@ document.addEventListener('DOMContentLoaded', () => {
   // ==================================
   async function iniciarEdicion(id) {
     try {
-      const resp = await window.apiFetch("/servicios/", { method: "GET" });
+      const resp = await window.apiFetchTodos("/servicios/", { method: "GET" });
       if (!resp.ok) throw new Error("Error al obtener servicios");
 
       const servicios = await resp.json();
@@ -18,6 +18,14 @@ document.addEventListener("DOMContentLoaded", () => {
     configurarFormularioSubida(); 
 });
 
+// ================================
+// IMÁGENES REDUCIDAS: /imagenes/spas/{id}/{archivo}?ancho=
+// ================================
+function urlVariante(url, ancho) {
+    if (!url.startsWith("/static/img/spas/")) return url;
+    return url.replace("/static/img/spas/", "/imagenes/spas/") + `?ancho=${ancho}`;
+}
+
 // ================================
 // CARGA UN SOLO ENDPOINT: /spas/{id}
 // ================================
@@ -72,7 +80,10 @@ async function cargarSpaCompleto() {
         if (spa.imagenes && spa.imagenes.length > 0) {
             spa.imagenes.forEach(img_obj => { 
                 const img = document.createElement("img");
-                img.src = img_obj.url;
+                img.src = urlVariante(img_obj.url, 768);
+                img.srcset = `${urlVariante(img_obj.url, 320)} 320w, ${urlVariante(img_obj.url, 768)} 768w`;
+                img.sizes = "(max-width: 600px) 100vw, 768px";
+                img.loading = "lazy";
                 img.alt = `Imagen de ${spa.nombre}`;
                 img.className = "imagen-galeria-estilo"; 
                 contGaleria.appendChild(img);
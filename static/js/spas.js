@@ -9,7 +9,7 @@ async function cargarSpas(){
             url = "/spas/?incluir_inactivos=true";
         }
 
-        const res = await apiFetch(url, { method: "GET" });
+        const res = await apiFetchTodos(url, { method: "GET" });
 
         if(!res.ok){
             document.getElementById("spaList").innerHTML = `<p>Error cargando spas</p>`;
@@ -39,7 +39,7 @@ async function buscarSpas(){
     if(zona.length > 0) params.append("zona", zona);
 
     try{
-        const res = await apiFetch(`/spas/buscar/?${params.toString()}`, { method: "GET" });
+        const res = await apiFetchTodos(`/spas/buscar/?${params.toString()}`, { method: "GET" });
 
         if(!res.ok){
             document.getElementById("spaList").innerHTML = `<p>No se encontraron spas</p>`;
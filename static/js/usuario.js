@@ -1,5 +1,5 @@
 async function cargarUsuarios() {
-    const resp = await apiFetch("/usuarios/");
+    const resp = await apiFetchTodos("/usuarios/");
     const usuarios = await resp.json();
 
     const statsResp = await apiFetch("/usuarios/stats");
@@ -0,0 +1,32 @@
+# tests/conftest.py
+"""
+Configuración común de las pruebas (python -m pytest desde la raíz).
+
+core.db lee DATABASE_URL al importarse, así que se fija aquí antes de
+importar la app: una base SQLite temporal, o TEST_DATABASE_URL si está
+definida (debe ser una base vacía).
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_directorio = tempfile.TemporaryDirectory()
+
+os.environ["DATABASE_URL"] = os.getenv("TEST_DATABASE_URL") or f"sqlite:///{_directorio.name}/pruebas.sqlite"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+sys.path.insert(0, RAIZ)
+# main monta static/ y templates/ con rutas relativas
+os.chdir(RAIZ)
+
+
+@pytest.fixture(scope="session")
+def cliente():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as c:
+        yield c
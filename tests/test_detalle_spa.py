@@ -0,0 +1,66 @@
+# tests/test_detalle_spa.py
+"""GET /spas/{spa_id} hace las mismas consultas con pocas o muchas filas relacionadas."""
+from sqlalchemy import insert
+from sqlmodel import Session, select
+
+from benchmarks.presupuesto_consultas import medir_consultas
+from core.calificaciones import recalcular_calificaciones
+from core.db import engine
+from models.models import Material, Resena, Servicio, Spa, SpaImage, SpaMaterial, SpaServicio, Usuario
+
+
+def _agregar_filas(spa_id: int, desde: int, n: int):
+    """n reseñas (cada una de un usuario distinto), servicios, materiales e imágenes."""
+    with Session(engine) as session:
+        session.exec(insert(Usuario), params=[
+            {"nombre": f"Detalle {i}", "correo": f"detalle{i}@belleza.com", "contrasena": "x", "rol": "usuario"}
+            for i in range(desde, desde + n)
+        ])
+        session.exec(insert(Servicio), params=[{"nombre": f"Detalle servicio {i}"} for i in range(desde, desde + n)])
+        session.exec(insert(Material), params=[
+            {"nombre": f"Detalle material {i}", "tipo": "insumo"} for i in range(desde, desde + n)
+        ])
+        nombres = [f"Detalle {i}" for i in range(desde, desde + n)]
+        usuario_ids = session.exec(select(Usuario.id).where(Usuario.nombre.in_(nombres))).all()
+        servicio_ids = session.exec(
+            select(Servicio.id).where(Servicio.nombre.in_([f"Detalle servicio {i}" for i in range(desde, desde + n)]))
+        ).all()
+        material_ids = session.exec(
+            select(Material.id).where(Material.nombre.in_([f"Detalle material {i}" for i in range(desde, desde + n)]))
+        ).all()
+
+        session.exec(insert(Resena), params=[
+            {"spa_id": spa_id, "usuario_id": u, "calificacion": 5, "comentario": "ok"} for u in usuario_ids
+        ])
+        session.exec(insert(SpaServicio), params=[
+            {"spa_id": spa_id, "servicio_id": s, "precio": 1000, "duracion": "30 min"} for s in servicio_ids
+        ])
+        session.exec(insert(SpaMaterial), params=[{"spa_id": spa_id, "material_id": m} for m in material_ids])
+        session.exec(insert(SpaImage), params=[
+            {"spa_id": spa_id, "url": f"/static/img/spas/{spa_id}/{i}.jpg"} for i in range(desde, desde + n)
+        ])
+        recalcular_calificaciones(session, spa_id)
+        session.commit()
+
+
+def test_detalle_spa_consultas_constantes(cliente):
+    with Session(engine) as session:
+        spa = Spa(nombre="Detalle consultas", direccion="Calle 3", zona="Centro")
+        session.add(spa)
+        session.commit()
+        spa_id = spa.id
+
+    _agregar_filas(spa_id, 0, 2)
+    pocas, _, codigo = medir_consultas(cliente, "GET", f"/spas/{spa_id}")
+    assert codigo == 200
+
+    _agregar_filas(spa_id, 2, 40)
+    muchas, sentencias, codigo = medir_consultas(cliente, "GET", f"/spas/{spa_id}")
+    assert codigo == 200
+
+    detalle = cliente.get(f"/spas/{spa_id}").json()
+    assert len(detalle["resenas"]) == 42
+    assert len(detalle["servicios"]) == 42
+    assert len(detalle["materiales"]) == 42
+    assert len(detalle["imagenes"]) == 42
+    assert muchas == pocas, "\n".join(sentencias)
@@ -0,0 +1,52 @@
+# tests/test_explain_indices.py
+"""
+Las consultas frecuentes (benchmarks.explain_indices.CONSULTAS) usan su
+índice sobre una base sembrada con datos sintéticos.
+
+Corre siempre contra una SQLite temporal propia y, si TEST_POSTGRES_URL
+apunta a una base Postgres vacía, también contra ella (se borran las
+tablas al terminar). Sin esa variable la variante Postgres se omite.
+"""
+import os
+
+import pytest
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel, create_engine
+
+from benchmarks.datos_sinteticos import Escala, generar
+from benchmarks.explain_indices import CONSULTAS, revisar
+from core.migraciones import aplicar_migraciones
+
+ESCALA = Escala(usuarios=300, spas=150, servicios=20, materiales=10, resenas=3000)
+
+
+@pytest.fixture(scope="module", params=["sqlite", "postgresql"])
+def motor_sembrado(request, tmp_path_factory):
+    if request.param == "postgresql":
+        url = os.getenv("TEST_POSTGRES_URL")
+        if not url:
+            pytest.skip("TEST_POSTGRES_URL no está definida")
+    else:
+        url = f"sqlite:///{tmp_path_factory.mktemp('explain')}/explain.sqlite"
+
+    motor = create_engine(url)
+    aplicar_migraciones(motor, SQLModel.metadata)
+    with Session(motor) as session:
+        generar(session, ESCALA, semilla=7, informar=lambda _: None)
+    if request.param == "postgresql":
+        with motor.begin() as conn:
+            conn.execute(text("ANALYZE"))
+
+    yield motor
+
+    if request.param == "postgresql":
+        SQLModel.metadata.drop_all(motor)
+        with motor.begin() as conn:
+            conn.execute(text("DROP TABLE IF EXISTS schema_version"))
+    motor.dispose()
+
+
+@pytest.mark.parametrize("consulta", [c[0] for c in CONSULTAS])
+def test_consulta_usa_indice(motor_sembrado, consulta):
+    resultado = next(r for r in revisar(motor_sembrado) if r["consulta"] == consulta)
+    assert resultado["usa_indice"], f"{consulta}: se esperaba {resultado['indice']}, plan {resultado['plan']}"
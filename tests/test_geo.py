@@ -0,0 +1,48 @@
+# tests/test_geo.py
+"""Cuando el índice geo vence, una sola petición lo reconstruye y las demás consultan el anterior."""
+import threading
+import time
+
+from sqlmodel import Session
+
+from core.db import engine
+from core.geo import IndiceGeo
+from models.models import Spa
+
+
+def test_reconstruccion_vencida_una_sola_vez(cliente):
+    with Session(engine) as session:
+        spa = Spa(nombre="Geo vencido", direccion="Calle 4", zona="Centro", latitud=-33.45, longitud=-70.66)
+        session.add(spa)
+        session.commit()
+        spa_id = spa.id
+
+    indice = IndiceGeo(ttl=0)
+    with Session(engine) as session:
+        indice.reconstruir(session)
+
+    reconstrucciones = []
+    original = indice._reconstruir
+
+    def lenta(session):
+        reconstrucciones.append(threading.get_ident())
+        time.sleep(0.3)
+        original(session)
+
+    indice._reconstruir = lenta
+    barrera = threading.Barrier(8)
+    encontrados = []
+
+    def consultar():
+        with Session(engine) as session:
+            barrera.wait()
+            encontrados.append(indice.cercanos(session, -33.45, -70.66, k=1))
+
+    hilos = [threading.Thread(target=consultar) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert len(reconstrucciones) == 1
+    assert [resultado[0][0] for resultado in encontrados] == [spa_id] * 8
@@ -0,0 +1,127 @@
+# tests/test_imagenes.py
+"""
+guardar_imagen rechaza con 400 las imágenes que declaran demasiados píxeles,
+las subidas que pasan IMAGEN_MAX_BYTES se cortan mientras se reciben y dos
+subidas simultáneas de los mismos bytes quedan en un solo SpaImage.
+"""
+import io
+import os
+import threading
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from sqlmodel import Session, select
+
+from core import imagenes
+from core.auth import hash_password
+from core.db import engine
+from models.models import Spa, SpaImage, Usuario
+from routers import spa_router
+
+Image = pytest.importorskip("PIL.Image")
+
+
+def _png(ancho: int, alto: int) -> bytes:
+    salida = io.BytesIO()
+    Image.new("1", (ancho, alto)).save(salida, "PNG", optimize=True)
+    return salida.getvalue()
+
+
+@pytest.mark.parametrize("factor", [1.5, 3])  # aviso (entre 1x y 2x) y error (más de 2x) de Pillow
+def test_bomba_de_descompresion(tmp_path, monkeypatch, factor):
+    monkeypatch.setattr(imagenes, "IMAGENES_DIR", str(tmp_path))
+    monkeypatch.setattr(imagenes, "IMAGEN_MAX_PIXELES", 1_000_000)
+    lado = int((1_000_000 * factor) ** 0.5) + 1
+    contenido = _png(lado, lado)
+    assert len(contenido) < imagenes.IMAGEN_MAX_BYTES
+
+    with pytest.raises(HTTPException) as error:
+        imagenes.guardar_imagen(UploadFile(io.BytesIO(contenido), filename="bomba.png"), 1)
+    assert error.value.status_code == 400
+    assert os.listdir(tmp_path / "1") == []
+
+
+def test_imagen_dentro_del_tope(tmp_path, monkeypatch):
+    monkeypatch.setattr(imagenes, "IMAGENES_DIR", str(tmp_path))
+    monkeypatch.setattr(imagenes, "IMAGEN_MAX_PIXELES", 1_000_000)
+
+    _, ruta, _ = imagenes.guardar_imagen(UploadFile(io.BytesIO(_png(500, 500)), filename="ok.png"), 1)
+    assert os.path.exists(ruta)
+
+
+def test_subidas_simultaneas_misma_imagen(cliente, tmp_path, monkeypatch):
+    monkeypatch.setattr(imagenes, "IMAGENES_DIR", str(tmp_path))
+    monkeypatch.setattr(spa_router, "programar_variantes", lambda spa_id, ruta: None)
+    with Session(engine) as session:
+        session.add(Usuario(nombre="Imagenes admin", correo="imagenes_admin@belleza.com",
+                            contrasena=hash_password("clave123"), rol="admin_principal"))
+        spa = Spa(nombre="Imagenes simultaneas", direccion="Calle 5", zona="Centro")
+        session.add(spa)
+        session.commit()
+        spa_id = spa.id
+    respuesta = cliente.post("/auth/login", data={"username": "imagenes_admin@belleza.com", "password": "clave123"})
+    encabezados = {"Authorization": f"Bearer {respuesta.json()['access_token']}"}
+
+    # Las dos subidas guardan el archivo y recién entonces buscan el registro existente
+    barrera = threading.Barrier(2)
+    guardar = spa_router.guardar_imagen
+
+    def guardar_y_esperar(archivo, spa_id):
+        resultado = guardar(archivo, spa_id)
+        barrera.wait(timeout=10)
+        return resultado
+
+    monkeypatch.setattr(spa_router, "guardar_imagen", guardar_y_esperar)
+    contenido = _png(40, 40)
+    respuestas = []
+
+    def subir():
+        respuestas.append(cliente.post(
+            f"/spas/{spa_id}/imagenes",
+            files={"file": ("misma.png", contenido, "image/png")},
+            headers=encabezados,
+        ))
+
+    hilos = [threading.Thread(target=subir) for _ in range(2)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert [r.status_code for r in respuestas] == [200, 200]
+    assert respuestas[0].json()["id"] == respuestas[1].json()["id"]
+    with Session(engine) as session:
+        assert len(session.exec(select(SpaImage).where(SpaImage.spa_id == spa_id)).all()) == 1
+
+
+def _sin_guardar(archivo, spa_id):
+    raise AssertionError("la subida debía cortarse antes de llegar a la ruta")
+
+
+def test_subida_grande_rechazada_por_content_length(cliente, monkeypatch):
+    monkeypatch.setattr(imagenes, "IMAGEN_MAX_BYTES", 1024 * 1024)
+    monkeypatch.setattr(spa_router, "guardar_imagen", _sin_guardar)
+
+    respuesta = cliente.post(
+        "/spas/1/imagenes",
+        files={"file": ("grande.png", b"\x89PNG\r\n\x1a\n" + b"0" * (2 * 1024 * 1024), "image/png")},
+    )
+    assert respuesta.status_code == 413
+
+
+def test_subida_grande_cortada_mientras_llega(cliente, monkeypatch):
+    monkeypatch.setattr(imagenes, "IMAGEN_MAX_BYTES", 1024 * 1024)
+    monkeypatch.setattr(spa_router, "guardar_imagen", _sin_guardar)
+
+    def cuerpo():  # sin Content-Length: llega por partes
+        yield b"--limite\r\nContent-Disposition: form-data; name=\"file\"; filename=\"g.png\"\r\n\r\n"
+        for _ in range(64):
+            yield b"0" * (64 * 1024)
+        yield b"\r\n--limite--\r\n"
+
+    respuesta = cliente.post(
+        "/spas/1/imagenes",
+        content=cuerpo(),
+        headers={"Content-Type": "multipart/form-data; boundary=limite"},
+    )
+    assert respuesta.status_code == 413
@@ -0,0 +1,62 @@
+# tests/test_indices_async.py
+"""
+Con DB_ASYNC=true, varias búsquedas y consultas de cercanos concurrentes con
+los índices sin construir no cuelgan el worker (run_sync corre en el event loop).
+
+core.db decide el modo al importarse, así que la app async corre en un
+proceso aparte con su propia base; si se cuelga, el timeout hace fallar la prueba.
+"""
+import os
+import subprocess
+import sys
+import textwrap
+
+from tests.conftest import RAIZ
+
+SCRIPT = textwrap.dedent("""
+    import asyncio
+
+    import httpx
+    from sqlmodel import Session
+
+    import main
+    from core.db import create_db_and_tables, dispose_engines, engine
+    from models.models import Spa
+
+    create_db_and_tables()
+    with Session(engine) as session:
+        for i in range(50):
+            session.add(Spa(
+                nombre=f"Uñas {i}", direccion="Calle 1", zona="Centro",
+                latitud=-33.45 + i / 1000, longitud=-70.66,
+            ))
+        session.commit()
+
+    async def concurrentes():
+        transporte = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://prueba") as cliente:
+            respuestas = await asyncio.gather(*[
+                cliente.get(ruta)
+                for ruta in ["/spas/buscar/?q=unas", "/spas/cercanos/?lat=-33.45&lon=-70.66&k=5"]
+                for _ in range(4)
+            ])
+        await dispose_engines()
+        print([(r.status_code, len(r.json())) for r in respuestas])
+
+    asyncio.run(concurrentes())
+""")
+
+
+def test_consultas_concurrentes_con_indices_frios(tmp_path):
+    entorno = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tmp_path}/async.sqlite",
+        DB_ASYNC="true",
+        PYTHONPATH=RAIZ,
+    )
+    resultado = subprocess.run(
+        [sys.executable, "-c", SCRIPT],
+        cwd=RAIZ, env=entorno, capture_output=True, text=True, timeout=60,
+    )
+    assert resultado.returncode == 0, resultado.stderr
+    assert resultado.stdout.strip().splitlines()[-1] == str([(200, 50)] * 4 + [(200, 5)] * 4)
@@ -0,0 +1,30 @@
+# tests/test_migraciones.py
+"""Varios workers iniciando a la vez sobre la misma base la migran una sola vez y sin errores."""
+import os
+import sqlite3
+import subprocess
+import sys
+
+from core.migraciones import MIGRACIONES
+from tests.conftest import RAIZ
+
+WORKERS = 4
+
+
+def test_workers_simultaneos_migran_una_vez(tmp_path):
+    ruta = tmp_path / "migraciones.sqlite"
+    entorno = dict(os.environ, DATABASE_URL=f"sqlite:///{ruta}", PYTHONPATH=RAIZ)
+    procesos = [
+        subprocess.Popen(
+            [sys.executable, "-c", "from core.db import create_db_and_tables; create_db_and_tables()"],
+            cwd=RAIZ, env=entorno, stderr=subprocess.PIPE, text=True,
+        )
+        for _ in range(WORKERS)
+    ]
+    for proceso in procesos:
+        _, errores = proceso.communicate(timeout=120)
+        assert proceso.returncode == 0, errores
+
+    with sqlite3.connect(ruta) as conn:
+        versiones = conn.execute("SELECT version, COUNT(*) FROM schema_version GROUP BY version").fetchall()
+    assert versiones == [(version, 1) for version, _, _ in MIGRACIONES]
@@ -0,0 +1,17 @@
+# tests/test_presupuesto_consultas.py
+"""Presupuesto de consultas por endpoint (benchmarks.presupuesto_consultas): un N+1 falla aquí."""
+import pytest
+
+from benchmarks.presupuesto_consultas import PRESUPUESTOS, revisar
+
+
+@pytest.fixture(scope="module")
+def resultados(cliente):
+    return {r["endpoint"]: r for r in revisar(cliente)}
+
+
+@pytest.mark.parametrize("endpoint", [p.nombre for p in PRESUPUESTOS])
+def test_presupuesto_consultas(resultados, endpoint):
+    r = resultados[endpoint]
+    sentencias = "\n".join(" ".join(s.split()) for s in (r["sentencias"] or r["sentencias_frio"]))
+    assert r["ok"], f"{endpoint}: {'; '.join(r['problemas'])}\n{sentencias}"